@@ -1,7 +1,9 @@
 import pytest
+from werkzeug.security import generate_password_hash
 
 from app import create_app, db
 from app.modules.auth.models import User
+from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
 
 
 @pytest.fixture(scope="session")
@@ -51,6 +53,51 @@ def clean_database():
     db.create_all()
 
 
+def create_user(email, **fields):
+    """
+    Adds a user whose password is ``test_password`` and flushes it, leaving the commit to the caller.
+
+    Args:
+        email (str): User's email address; module-scoped fixtures need one of their own.
+        **fields: Any other User column.
+
+    Returns:
+        User: The flushed user.
+    """
+    user = User(email=email, password=generate_password_hash("test_password"), twofa_enabled=False, **fields)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def create_dataset(
+    user, title="Test dataset", description="Test", publication_type=PublicationType.OTHER, authors=(), **fields
+):
+    """
+    Adds a dataset with its DSMetaData and flushes both, leaving the commit to the caller.
+
+    Args:
+        user (User): Owner of the dataset.
+        title (str), description (str), publication_type (PublicationType): DSMetaData fields.
+        authors (iterable of Author): Authors of the metadata.
+        **fields: DataSet columns (``created_at``, ``is_latest``, ``ds_concept_id``, ...) go to the
+            dataset; any other keyword (``tags``, ``dataset_doi``, ...) goes to the DSMetaData.
+
+    Returns:
+        DataSet: The flushed dataset.
+    """
+    dataset_columns = DataSet.__table__.columns.keys()
+    dataset_fields = {key: fields.pop(key) for key in list(fields) if key in dataset_columns}
+    meta = DSMetaData(title=title, description=description, publication_type=publication_type, **fields)
+    meta.authors = list(authors)
+    db.session.add(meta)
+    db.session.flush()
+    dataset = DataSet(user_id=user.id, ds_meta_data_id=meta.id, **dataset_fields)
+    db.session.add(dataset)
+    db.session.flush()
+    return dataset
+
+
 def login(test_client, email, password):
     """
     Authenticates the user with the credentials provided.
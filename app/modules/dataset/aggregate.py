@@ -0,0 +1,120 @@
+# app/modules/dataset/aggregate.py
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence
+
+from app.modules.dataset.columnar import ColumnarFile
+from app.modules.hubfile.zonemaps import StatsAccumulator, month_keys
+
+FREQUENCIES = ("month", "year")
+AGGREGATIONS = ("mean", "min", "max", "sum", "count", "null_count")
+AGGREGATE_CACHE_SIZE = 256
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping, shared by the request threads of a worker process."""
+
+    def __init__(self, maxsize: int = AGGREGATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Files are immutable once their checksum is known, so entries never need invalidating
+aggregate_cache = LRUCache()
+
+
+def _period_label(key, freq: str) -> str:
+    return f"{key[0]:04d}-{key[1]:02d}" if freq == "month" else f"{key[0]:04d}"
+
+
+def aggregate_columnar(
+    columnar: ColumnarFile, freq: str, aggregations: Sequence[str], columns: Sequence[str]
+) -> Dict[str, object]:
+    """
+    Group the rows of a columnar sidecar by calendar month or year and aggregate
+    the requested columns (header names or required tokens). Columns not present
+    in the file are reported under ``missing``. Rows without a valid date are ignored.
+    Returns ``{"periods": [...], "series": {column: {agg: [...]}}, "missing": [...]}``.
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unsupported frequency '{freq}'")
+    unknown = [agg for agg in aggregations if agg not in AGGREGATIONS]
+    if unknown:
+        raise ValueError(f"Unsupported aggregation(s): {', '.join(unknown)}")
+
+    dates = columnar.dates()
+    if dates is None:
+        raise ValueError("The file has no date column")
+    keys = month_keys(dates)
+    if freq == "year":
+        keys = [(key[0],) if key else None for key in keys]
+    periods = sorted({key for key in keys if key is not None})
+    positions = {key: i for i, key in enumerate(periods)}
+    row_periods: List[Optional[int]] = [positions.get(key) if key else None for key in keys]
+
+    series = {}
+    missing = []
+    for requested in columns:
+        name = columnar.resolve_column(requested)
+        if name is None or name == columnar.date_column:
+            missing.append(requested)
+            continue
+        accumulators = [StatsAccumulator() for _ in periods]
+        for period, value in zip(row_periods, columnar.column(name)):
+            if period is not None:
+                accumulators[period].add(value)
+        series[requested] = {agg: [_pick(acc, agg) for acc in accumulators] for agg in aggregations}
+
+    return {"periods": [_period_label(key, freq) for key in periods], "series": series, "missing": missing}
+
+
+def _pick(acc: StatsAccumulator, agg: str):
+    if agg == "count":
+        return acc.count
+    if agg == "null_count":
+        return acc.null_count
+    if not acc.count:
+        return None
+    value = {"mean": acc.total / acc.count, "sum": acc.total, "min": acc.min_value, "max": acc.max_value}[agg]
+    # Values are stored as float32: report them with the precision they actually have
+    return float(f"{value:.7g}")
+
+
+def cached_aggregate(
+    checksum: str, open_columnar, freq: str, aggregations: Sequence[str], columns: Sequence[str]
+) -> Dict[str, object]:
+    """Return the aggregation of one file from the LRU, computing it with ``open_columnar()`` on a miss."""
+    key = (checksum, freq, tuple(aggregations), tuple(columns))
+    result = aggregate_cache.get(key)
+    if result is None:
+        with open_columnar() as columnar:
+            result = aggregate_columnar(columnar, freq, aggregations, columns)
+        aggregate_cache.put(key, result)
+    return result
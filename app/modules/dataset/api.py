@@ -13,7 +13,16 @@ dataset_fields = {
     "files": "files",
 }
 
-dataset_serializer = Serializer(dataset_fields, related_serializers={"files": file_serializer})
+# Relaciones que recorre cada campo; sólo se cargan (en bloque) las de los campos pedidos
+dataset_eager_loads = {
+    "name": ["ds_meta_data"],
+    "doi": ["ds_meta_data"],
+    "files": ["feature_models.files"],
+}
+
+dataset_serializer = Serializer(
+    dataset_fields, related_serializers={"files": file_serializer}, eager_loads=dataset_eager_loads
+)
 
 DataSetResource = create_resource(DataSet, dataset_serializer)
 
@@ -0,0 +1,168 @@
+# app/modules/dataset/archive.py
+import hashlib
+import io
+import logging
+import os
+import uuid
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# (arcname, absolute path, fingerprint used for the cache key)
+ArchiveEntry = Tuple[str, str, str]
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """
+    Write-only, non-seekable sink for ZipFile.
+    ZipFile falls back to data descriptors when it cannot seek, so every byte it
+    writes can be handed to the client as soon as it is produced.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._offset += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def collect_entries(directory: str, arc_root: str, checksums: Optional[dict] = None) -> List[ArchiveEntry]:
+    """
+    Walk ``directory`` and return the archive entries sorted by arcname.
+    The fingerprint of each entry is its Hubfile checksum when known, otherwise size and mtime.
+    """
+    checksums = checksums or {}
+    entries = []
+    if not os.path.isdir(directory):
+        return entries
+
+    for subdir, dirs, files in os.walk(directory):
+        for file in files:
+            full_path = os.path.join(subdir, file)
+            relative_path = os.path.relpath(full_path, directory)
+            checksum = checksums.get(relative_path)
+            if not checksum:
+                st = os.stat(full_path)
+                checksum = f"{st.st_size}:{st.st_mtime_ns}"
+            entries.append((os.path.join(arc_root, relative_path), full_path, checksum))
+
+    entries.sort(key=lambda e: e[0])
+    return entries
+
+
+def archive_key(entries: Iterable[ArchiveEntry]) -> str:
+    """Content address of an archive: hash of its (arcname, fingerprint) pairs."""
+    digest = hashlib.sha256()
+    for arcname, _, fingerprint in entries:
+        digest.update(arcname.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(fingerprint.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def iter_zip(entries: Iterable[ArchiveEntry], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``entries`` incrementally, never holding more than one chunk in memory."""
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, "w") as zipf:
+        for arcname, path, _ in entries:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname=arcname)
+            with open(path, "rb") as src, zipf.open(zinfo, "w", force_zip64=True) as dest:
+                for block in iter(lambda: src.read(chunk_size), b""):
+                    dest.write(block)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    data = buffer.drain()
+    if data:
+        yield data
+
+
+class ArchiveCache:
+    """
+    On-disk cache of finished dataset archives, keyed by ``archive_key``.
+    Recency is tracked with the file mtime (touched on every hit) and the least
+    recently used archives are evicted once the cache grows over ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.zip")
+
+    def lookup(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def stream(self, key: str, entries: List[ArchiveEntry]) -> Iterator[bytes]:
+        """Stream a fresh archive to the caller while writing it into the cache."""
+        os.makedirs(self.directory, exist_ok=True)
+        part_path = os.path.join(self.directory, f"{key}.{uuid.uuid4().hex}.part")
+        completed = False
+        try:
+            with open(part_path, "wb") as part:
+                for data in iter_zip(entries):
+                    part.write(data)
+                    yield data
+            os.replace(part_path, self.path_for(key))
+            completed = True
+        finally:
+            if not completed and os.path.exists(part_path):
+                os.remove(part_path)
+
+        self.evict()
+
+    def evict(self) -> None:
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith(".zip")]
+        except FileNotFoundError:
+            return
+
+        archives = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            archives.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in archives)
+        for _, size, path in sorted(archives):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                logger.info(f"Evicted cached archive {path} ({size} bytes)")
+            except FileNotFoundError:
+                continue
@@ -0,0 +1,114 @@
+# app/modules/dataset/blobstore.py
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """
+    Content-addressed store for uploaded files, keyed by their SHA-256 (``Hubfile.checksum``).
+
+    Files under ``uploads/user_X/dataset_Y/`` are hardlinks to a blob, so every
+    version of a dataset shares one physical copy of each unchanged file. The
+    filesystem link count doubles as the reference count: a blob whose only
+    remaining link is the store entry itself is unreferenced and can be collected.
+    Blobs are immutable; files are always replaced, never rewritten in place.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def blob_path(self, checksum: str) -> str:
+        return os.path.join(self.root, checksum[:2], checksum)
+
+    def has(self, checksum: str) -> bool:
+        return os.path.isfile(self.blob_path(checksum))
+
+    def refcount(self, checksum: str) -> int:
+        try:
+            return os.stat(self.blob_path(checksum)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def ingest(self, src_path: str, checksum: str, move: bool = True) -> str:
+        """
+        Add ``src_path`` to the store under ``checksum``.
+        When the blob already exists the source is only dropped (``move=True``) or left untouched.
+        Otherwise the source is moved (or hardlinked, with ``move=False``) into the store.
+        """
+        blob = self.blob_path(checksum)
+        if os.path.isfile(blob):
+            if move:
+                os.remove(src_path)
+            return blob
+
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp_blob = f"{blob}.{uuid.uuid4().hex}.tmp"
+        if move:
+            shutil.move(src_path, tmp_blob)
+        else:
+            try:
+                os.link(src_path, tmp_blob)
+            except OSError:
+                shutil.copy2(src_path, tmp_blob)
+        os.replace(tmp_blob, blob)
+        return blob
+
+    def link(self, checksum: str, dest_path: str) -> str:
+        """Materialize the blob at ``dest_path`` as a hardlink, replacing any existing file."""
+        blob = self.blob_path(checksum)
+        tmp_dest = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(blob, tmp_dest)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            # Hardlinks unsupported (e.g. different filesystem): fall back to a private copy
+            logger.warning(f"Could not hardlink blob {checksum} into {dest_path}, copying instead")
+            shutil.copy2(blob, tmp_dest)
+        os.replace(tmp_dest, dest_path)
+        return dest_path
+
+    def release(self, path: str, checksum: Optional[str] = None) -> bool:
+        """
+        Remove a per-dataset file and, if it was the last reference, its blob.
+        Returns True when the blob itself was deleted.
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        if checksum and self.has(checksum) and self.refcount(checksum) == 0:
+            os.remove(self.blob_path(checksum))
+            return True
+        return False
+
+    def collect_garbage(self, min_age: float = 0, on_remove: Optional[Callable[[str], None]] = None) -> int:
+        """
+        Delete every blob that is no longer linked from any dataset. Returns the number removed.
+        Blobs whose links changed in the last ``min_age`` seconds are kept: a blob that was just
+        ingested has no dataset link until ``link`` runs. ``on_remove`` receives each removed checksum.
+        """
+        removed = 0
+        if not os.path.isdir(self.root):
+            return removed
+        cutoff = time.time() - min_age
+        for subdir, dirs, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(subdir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                # ctime cambia con cada link/rename, así que también cubre los blobs recién ingeridos
+                if stat.st_nlink <= 1 and stat.st_ctime <= cutoff:
+                    os.remove(path)
+                    removed += 1
+                    if on_remove is not None:
+                        on_remove(name)
+        return removed
@@ -0,0 +1,211 @@
+# app/modules/dataset/chunked_upload.py
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+from app.modules.dataset.services import CHECKSUM_CHUNK_SIZE, write_checksum
+
+SESSIONS_DIR = ".chunked"
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+META_SUFFIX = ".json"
+UPLOAD_MAX_BYTES = 5 * 1024**3
+UPLOAD_MAX_PENDING_BYTES = 10 * 1024**3
+UPLOAD_SESSION_TTL_SECONDS = 86400
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping or adjacent half-open ``[start, stop)`` ranges."""
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+class ChunkedUpload:
+    """
+    Resumable upload session stored in the user's temp folder.
+
+    The target file is preallocated at its final size and every chunk is written
+    with ``pwrite`` at its own offset, so chunks may arrive in any order and in
+    parallel. Received ranges are appended to a small log (one ``O_APPEND`` write
+    per chunk), which keeps concurrent chunk requests from racing on shared state.
+    """
+
+    def __init__(self, temp_folder: str, upload_id: str, filename: str, size: int, checksum: Optional[str] = None):
+        self.temp_folder = temp_folder
+        self.upload_id = upload_id
+        self.filename = filename
+        self.size = size
+        self.checksum = checksum
+
+    @property
+    def base_path(self) -> str:
+        return os.path.join(self.temp_folder, SESSIONS_DIR, self.upload_id)
+
+    @property
+    def part_path(self) -> str:
+        return self.base_path + ".part"
+
+    @property
+    def ranges_path(self) -> str:
+        return self.base_path + ".ranges"
+
+    @property
+    def meta_path(self) -> str:
+        return self.base_path + META_SUFFIX
+
+    @classmethod
+    def create(cls, temp_folder: str, filename: str, size: int, checksum: Optional[str] = None) -> "ChunkedUpload":
+        if size < 0:
+            raise ValueError("File size must be a non-negative integer")
+        if checksum and not re.fullmatch(r"[0-9a-fA-F]{64}", checksum):
+            raise ValueError("Checksum must be a SHA-256 hex digest")
+
+        upload = cls(temp_folder, uuid.uuid4().hex, filename, size, checksum.lower() if checksum else None)
+        os.makedirs(os.path.dirname(upload.base_path), exist_ok=True)
+
+        try:
+            fd = os.open(upload.part_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                if size:
+                    if hasattr(os, "posix_fallocate"):
+                        os.posix_fallocate(fd, 0, size)
+                    else:
+                        os.ftruncate(fd, size)
+            finally:
+                os.close(fd)
+        except OSError:
+            # Sin espacio (ENOSPC / EFBIG / EDQUOT): no dejar un .part a medio reservar
+            upload.discard()
+            raise
+
+        open(upload.ranges_path, "w").close()
+        with open(upload.meta_path, "w") as fh:
+            json.dump({"filename": filename, "size": size, "checksum": upload.checksum}, fh)
+        return upload
+
+    @classmethod
+    def load(cls, temp_folder: str, upload_id: str, max_age: Optional[float] = None) -> Optional["ChunkedUpload"]:
+        """The session ``upload_id``, or None if it does not exist or has been idle for ``max_age`` seconds."""
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            return None
+        meta_path = os.path.join(temp_folder, SESSIONS_DIR, upload_id + META_SUFFIX)
+        try:
+            with open(meta_path, "r") as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        upload = cls(temp_folder, upload_id, meta["filename"], meta["size"], meta.get("checksum"))
+        if max_age is not None and upload.idle_seconds() > max_age:
+            upload.discard()
+            return None
+        return upload
+
+    @classmethod
+    def open_sessions(cls, temp_folder: str, max_age: Optional[float] = None) -> List["ChunkedUpload"]:
+        """Sessions of a temp folder; with ``max_age``, idle ones are discarded and left out."""
+        directory = os.path.join(temp_folder, SESSIONS_DIR)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+        sessions = []
+        for name in sorted(names):
+            if name.endswith(META_SUFFIX):
+                upload = cls.load(temp_folder, name[: -len(META_SUFFIX)], max_age)
+                if upload is not None:
+                    sessions.append(upload)
+        return sessions
+
+    def idle_seconds(self) -> float:
+        """Seconds since the session was created or last received a chunk."""
+        mtimes = []
+        for path in (self.meta_path, self.ranges_path):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                continue
+        return time.time() - max(mtimes) if mtimes else 0.0
+
+    def write_chunk(self, start: int, stop: int, stream) -> int:
+        """Write the ``[start, stop)`` byte range read from ``stream``. Returns the bytes written."""
+        if start < 0 or stop > self.size or start >= stop:
+            raise ValueError(f"Invalid byte range {start}-{stop} for a file of {self.size} bytes")
+
+        fd = os.open(self.part_path, os.O_WRONLY)
+        try:
+            offset = start
+            while offset < stop:
+                data = stream.read(min(CHECKSUM_CHUNK_SIZE, stop - offset))
+                if not data:
+                    break
+                offset += os.pwrite(fd, data, offset)
+        finally:
+            os.close(fd)
+
+        if offset != stop:
+            raise ValueError(f"Incomplete chunk: expected {stop - start} bytes, received {offset - start}")
+
+        fd = os.open(self.ranges_path, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, f"{start} {stop}\n".encode())
+        finally:
+            os.close(fd)
+        return stop - start
+
+    def received_ranges(self) -> List[Tuple[int, int]]:
+        ranges = []
+        with open(self.ranges_path, "r") as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) == 2:
+                    ranges.append((int(parts[0]), int(parts[1])))
+        return merge_ranges(ranges)
+
+    def is_complete(self) -> bool:
+        if self.size == 0:
+            return True
+        return self.received_ranges() == [(0, self.size)]
+
+    def finalize(self, dest_path: str) -> Tuple[str, int]:
+        """Verify the assembled file and move it to ``dest_path``. Returns ``(checksum, size)``."""
+        if not self.is_complete():
+            raise ValueError("Upload is not complete: some byte ranges are missing")
+
+        digest = hashlib.sha256()
+        with open(self.part_path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(CHECKSUM_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        hash_hex = digest.hexdigest()
+
+        if self.checksum and hash_hex != self.checksum:
+            self.discard()
+            raise ValueError("Checksum mismatch: the upload session has been discarded, please upload again")
+
+        os.replace(self.part_path, dest_path)
+        write_checksum(dest_path, hash_hex, self.size)
+        self.discard()
+        return hash_hex, self.size
+
+    def discard(self) -> None:
+        for path in (self.part_path, self.ranges_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def to_dict(self) -> dict:
+        received = self.received_ranges()
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "size": self.size,
+            "received": [[start, stop] for start, stop in received],
+            "received_bytes": sum(stop - start for start, stop in received),
+            "complete": self.size == 0 or received == [(0, self.size)],
+        }
@@ -0,0 +1,309 @@
+# app/modules/dataset/columnar.py
+import csv
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import uuid
+from array import array
+from datetime import date
+from itertools import islice
+from typing import Dict, List, Optional
+
+from app.modules.dataset.validator import (
+    MISSING_VALUES,
+    REQUIRED_COLUMNS,
+    ROW_BATCH_SIZE,
+    _find_date_column,
+    _match_required_in_headers,
+    _read_csv_headers_try,
+    _sniff_delimiter,
+    parse_date,
+)
+
+# File layout (all integers little-endian):
+#   magic (8 bytes) | header length (uint32) | JSON header | padding | column 0 | padding | column 1 | ...
+# Column offsets in the header are relative to the first aligned byte after it.
+# Every column starts on a COLUMN_ALIGNMENT boundary so it can be mapped as a
+# typed array straight from the page cache (``memoryview.cast`` or ``numpy.frombuffer``).
+MAGIC = b"WCOLUMN1"
+FORMAT_VERSION = 1
+SIDECAR_SUFFIX = ".wcol"
+COLUMN_ALIGNMENT = 64
+DATE_DTYPE = "<i8"
+VALUE_DTYPE = "<f4"
+# Sentinel stored in the date column for unparseable dates
+MISSING_DATE = -(2**63)
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_TYPECODES = {DATE_DTYPE: "q", VALUE_DTYPE: "f"}
+_ITEMSIZES = {DATE_DTYPE: 8, VALUE_DTYPE: 4}
+_NAN = float("nan")
+
+
+def to_epoch_days(value: date) -> int:
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def from_epoch_days(days: int) -> Optional[date]:
+    if days == MISSING_DATE:
+        return None
+    return date.fromordinal(days + _EPOCH_ORDINAL)
+
+
+def to_float32(value: float) -> float:
+    """
+    ``value`` as stored in a float32 column (40.1 -> 40.099998474121094), so constants compared
+    against the mapped values or the zone maps computed from them round the same way.
+    """
+    try:
+        return struct.unpack("f", struct.pack("f", value))[0]
+    except OverflowError:
+        return math.copysign(math.inf, value)
+
+
+def _align(offset: int) -> int:
+    return (offset + COLUMN_ALIGNMENT - 1) // COLUMN_ALIGNMENT * COLUMN_ALIGNMENT
+
+
+def _parse_value(raw: str) -> float:
+    value = raw.strip()
+    if value.lower() in MISSING_VALUES:
+        return _NAN
+    try:
+        return float(value)
+    except ValueError:
+        return _NAN
+
+
+def _field_map(headers: List[str]) -> Dict[int, str]:
+    """Map column index -> required token (e.g. 'BASEL_temp_mean' -> '_temp_mean'), first match wins."""
+    fields = {}
+    for req in REQUIRED_COLUMNS:
+        matches = _match_required_in_headers(req, headers)
+        for i, h in enumerate(headers):
+            if h in matches and i not in fields:
+                fields[i] = req
+                break
+    return fields
+
+
+def write_sidecar(
+    csv_path: str, dest_path: str, source_checksum: Optional[str] = None, batch_size: int = ROW_BATCH_SIZE
+) -> dict:
+    """
+    Convert ``csv_path`` into a columnar sidecar at ``dest_path`` and return its header.
+    The date column becomes int64 epoch days, every other column float32 with NaN
+    for missing or non-numeric cells. Rows are streamed in batches and each column
+    is spilled to its own temporary file, so memory stays bounded for any file size.
+    """
+    headers = _read_csv_headers_try(csv_path)
+    date_idx = _find_date_column(headers)
+    fields = _field_map(headers)
+    dtypes = [DATE_DTYPE if i == date_idx else VALUE_DTYPE for i in range(len(headers))]
+
+    spills = [tempfile.TemporaryFile() for _ in headers]
+    rows = 0
+    try:
+        with open(csv_path, "r", encoding="utf-8", errors="replace", newline="") as fh:
+            reader = csv.reader(fh, delimiter=_sniff_delimiter(csv_path))
+            next(reader, None)
+            while True:
+                raw_batch = list(islice(reader, batch_size))
+                if not raw_batch:
+                    break
+                batch = [row for row in raw_batch if any(cell.strip() for cell in row)]
+                if not batch:
+                    continue
+                # Short rows are padded with missing values so every column keeps the same length
+                batch = [row + [""] * (len(headers) - len(row)) for row in batch]
+                columns = list(zip(*batch))
+                for i, spill in enumerate(spills):
+                    if dtypes[i] == DATE_DTYPE:
+                        values = array("q", (_epoch_or_missing(raw) for raw in columns[i]))
+                    else:
+                        values = array("f", (_parse_value(raw) for raw in columns[i]))
+                    if sys.byteorder != "little":
+                        values.byteswap()
+                    values.tofile(spill)
+                rows += len(batch)
+
+        header = {
+            "version": FORMAT_VERSION,
+            "rows": rows,
+            "source": os.path.basename(csv_path),
+            "source_checksum": source_checksum,
+            "date_column": headers[date_idx] if date_idx is not None else None,
+            "columns": [],
+        }
+        # Column offsets are relative to the data section, which starts at the first
+        # aligned position after the header
+        offset = 0
+        for i, name in enumerate(headers):
+            nbytes = rows * _ITEMSIZES[dtypes[i]]
+            header["columns"].append(
+                {"name": name, "field": fields.get(i), "dtype": dtypes[i], "offset": offset, "nbytes": nbytes}
+            )
+            offset = _align(offset + nbytes)
+        encoded = json.dumps(header).encode("utf-8")
+        data_start = _data_start(len(encoded))
+
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as out:
+                out.write(MAGIC)
+                out.write(struct.pack("<I", len(encoded)))
+                out.write(encoded)
+                for column, spill in zip(header["columns"], spills):
+                    out.write(b"\0" * (data_start + column["offset"] - out.tell()))
+                    spill.seek(0)
+                    shutil.copyfileobj(spill, out)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return header
+    finally:
+        for spill in spills:
+            spill.close()
+
+
+def _data_start(header_length: int) -> int:
+    return _align(len(MAGIC) + 4 + header_length)
+
+
+def _epoch_or_missing(raw: str) -> int:
+    parsed = parse_date(raw)
+    return to_epoch_days(parsed) if parsed is not None else MISSING_DATE
+
+
+class ColumnarFile:
+    """
+    Read-only, memory-mapped view of a columnar sidecar.
+
+    ``column()`` returns a zero-copy ``memoryview`` over the mapped bytes (typecode
+    ``q`` for dates, ``f`` for measurements), so scanning one column only pages in
+    that column. The views are released when the file is closed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a columnar sidecar")
+            (length,) = struct.unpack("<I", fh.read(4))
+            self.header = json.loads(fh.read(length).decode("utf-8"))
+            self._data_start = _data_start(length)
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._columns = {column["name"]: column for column in self.header["columns"]}
+        self._views = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def rows(self) -> int:
+        return self.header["rows"]
+
+    @property
+    def columns(self) -> List[str]:
+        return [column["name"] for column in self.header["columns"]]
+
+    @property
+    def date_column(self) -> Optional[str]:
+        return self.header.get("date_column")
+
+    def field_column(self, field: str) -> Optional[str]:
+        """Return the CSV header mapped to a required token such as ``_temp_max``."""
+        for column in self.header["columns"]:
+            if column["field"] == field:
+                return column["name"]
+        return None
+
+    def resolve_column(self, name: str) -> Optional[str]:
+        """Accept a CSV header name or a required token and return the header name, if present."""
+        if name in self._columns:
+            return name
+        return self.field_column(name)
+
+    def column(self, name: str):
+        meta = self._columns[name]
+        typecode = _TYPECODES[meta["dtype"]]
+        if not meta["nbytes"]:
+            return memoryview(array(typecode))
+        start = self._data_start + meta["offset"]
+        if sys.byteorder != "little":
+            values = array(typecode, self._mmap[start : start + meta["nbytes"]])
+            values.byteswap()
+            return memoryview(values)
+        view = memoryview(self._mmap)[start : start + meta["nbytes"]].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def dates(self):
+        return self.column(self.date_column) if self.date_column else None
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class ColumnarStore:
+    """
+    Sidecars live outside the dataset folders, keyed by the CSV checksum, so every
+    dataset version sharing a file (see ``BlobStore``) also shares its sidecar and
+    the sidecar never ends up inside the download ZIP. The date index of each CSV
+    (see ``dateindex``) is stored next to it.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, checksum: str) -> str:
+        return os.path.join(self.root, checksum[:2], checksum + SIDECAR_SUFFIX)
+
+    def index_path_for(self, checksum: str) -> str:
+        from app.modules.dataset.dateindex import INDEX_SUFFIX
+
+        return os.path.join(self.root, checksum[:2], checksum + INDEX_SUFFIX)
+
+    def has(self, checksum: str) -> bool:
+        return os.path.isfile(self.path_for(checksum))
+
+    def ensure(self, csv_path: str, checksum: str) -> str:
+        path = self.path_for(checksum)
+        if not os.path.isfile(path):
+            write_sidecar(csv_path, path, source_checksum=checksum)
+        return path
+
+    def ensure_index(self, csv_path: str, checksum: str) -> str:
+        from app.modules.dataset.dateindex import build_date_index
+
+        path = self.index_path_for(checksum)
+        if not os.path.isfile(path):
+            build_date_index(csv_path, path)
+        return path
+
+    def discard(self, checksum: str) -> None:
+        for path in (self.path_for(checksum), self.index_path_for(checksum)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def open(self, checksum: str) -> Optional[ColumnarFile]:
+        path = self.path_for(checksum)
+        if not os.path.isfile(path):
+            return None
+        return ColumnarFile(path)
@@ -0,0 +1,176 @@
+# app/modules/dataset/dateindex.py
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Iterator, List, Optional
+
+from app.modules.dataset.columnar import MISSING_DATE, _align, to_epoch_days
+from app.modules.dataset.validator import _find_date_column, _read_csv_headers_try, _sniff_delimiter, parse_date
+
+# File layout, same conventions as the columnar sidecar:
+#   magic | header length (uint32) | JSON header | padding | days (int64 * rows) | offsets (int64 * (rows + 1))
+# ``offsets[i]`` is the byte position of data row ``i`` in the CSV and ``offsets[rows]`` its end,
+# so any date range maps to one contiguous byte range of the original file.
+MAGIC = b"WDATEIX1"
+INDEX_SUFFIX = ".didx"
+
+
+def _parse_line(line: bytes, delimiter: str) -> List[str]:
+    text = line.decode("utf-8", errors="replace").splitlines()
+    return next(csv.reader(text[:1], delimiter=delimiter), [])
+
+
+def build_date_index(csv_path: str, dest_path: str) -> dict:
+    """
+    Scan ``csv_path`` once and write its date index to ``dest_path``. Returns the index header.
+    Weather CSVs hold one record per line, so row offsets are line offsets; blank
+    lines are skipped. Files whose dates are not sorted are flagged and queried by scan.
+    """
+    headers = _read_csv_headers_try(csv_path)
+    delimiter = _sniff_delimiter(csv_path)
+    date_idx = _find_date_column(headers)
+
+    days = array("q")
+    offsets = array("q")
+    with open(csv_path, "rb") as fh:
+        fh.readline()
+        while True:
+            position = fh.tell()
+            line = fh.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            day = MISSING_DATE
+            if date_idx is not None:
+                row = _parse_line(line, delimiter)
+                parsed = parse_date(row[date_idx]) if date_idx < len(row) else None
+                if parsed is not None:
+                    day = to_epoch_days(parsed)
+            days.append(day)
+            offsets.append(position)
+        offsets.append(fh.tell())
+
+    is_sorted = (
+        date_idx is not None and MISSING_DATE not in days and all(days[i] <= days[i + 1] for i in range(len(days) - 1))
+    )
+    header = {
+        "rows": len(days),
+        "sorted": is_sorted,
+        "date_column": headers[date_idx] if date_idx is not None else None,
+        "headers": headers,
+        "delimiter": delimiter,
+    }
+    encoded = json.dumps(header).encode("utf-8")
+    if sys.byteorder != "little":
+        days.byteswap()
+        offsets.byteswap()
+
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(MAGIC)
+            out.write(struct.pack("<I", len(encoded)))
+            out.write(encoded)
+            out.write(b"\0" * (_align(out.tell()) - out.tell()))
+            days.tofile(out)
+            offsets.tofile(out)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return header
+
+
+class DateIndex:
+    """
+    Memory-mapped date index of a CSV: sorted epoch days and the byte offset of each row.
+    A date range is resolved with two binary searches, then only that slice of the
+    CSV is read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a date index")
+            (length,) = struct.unpack("<I", fh.read(4))
+            self.header = json.loads(fh.read(length).decode("utf-8"))
+            data_start = _align(len(MAGIC) + 4 + length)
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        rows = self.header["rows"]
+        days_slice = slice(data_start, data_start + rows * 8)
+        offsets_slice = slice(data_start + rows * 8, data_start + (2 * rows + 1) * 8)
+        if sys.byteorder == "little":
+            self._view = memoryview(self._mmap)
+            self.days = self._view[days_slice].cast("q")
+            self.offsets = self._view[offsets_slice].cast("q")
+        else:
+            self._view = None
+            self.days = array("q", self._mmap[days_slice])
+            self.offsets = array("q", self._mmap[offsets_slice])
+            self.days.byteswap()
+            self.offsets.byteswap()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def rows(self) -> int:
+        return self.header["rows"]
+
+    @property
+    def headers(self) -> List[str]:
+        return self.header["headers"]
+
+    @property
+    def date_column(self) -> Optional[str]:
+        return self.header["date_column"]
+
+    def row_range(self, start: Optional[date] = None, end: Optional[date] = None):
+        """Return the data rows whose date falls in ``[start, end]`` (both inclusive, either open)."""
+        if start is None and end is None:
+            return range(self.rows)
+        lo = to_epoch_days(start) if start is not None else None
+        hi = to_epoch_days(end) if end is not None else None
+        if self.header["sorted"]:
+            first = bisect_left(self.days, lo) if lo is not None else 0
+            last = bisect_right(self.days, hi) if hi is not None else self.rows
+            return range(first, max(first, last))
+        return [
+            i
+            for i, day in enumerate(self.days)
+            if day != MISSING_DATE and (lo is None or day >= lo) and (hi is None or day <= hi)
+        ]
+
+    def iter_rows(self, csv_path: str, rows) -> Iterator[List[str]]:
+        """Yield the parsed CSV rows listed in ``rows``, seeking only when rows are not contiguous."""
+        delimiter = self.header["delimiter"]
+        with open(csv_path, "rb") as fh:
+            for i in rows:
+                if fh.tell() != self.offsets[i]:
+                    fh.seek(self.offsets[i])
+                yield _parse_line(fh.read(self.offsets[i + 1] - self.offsets[i]), delimiter)
+
+    def close(self):
+        if self._view is not None:
+            self.days.release()
+            self.offsets.release()
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
@@ -0,0 +1,76 @@
+"""
+HyperLogLog sketches for approximate distinct counts (unique visitors of a dataset or file).
+
+A sketch is ``2**PRECISION`` one-byte registers (4 KB, much less once compressed for storage);
+sketches of different days merge with a register-wise max, so the unique visitors of any date
+range are estimated from the daily sketches alone. The standard error is ``1.04 / sqrt(4096)``,
+about 1.6%; small counts use linear counting and are close to exact.
+"""
+
+import hashlib
+import math
+import zlib
+from typing import Iterable, Optional
+
+PRECISION = 12
+NUM_REGISTERS = 1 << PRECISION
+_HASH_BITS = 64
+_ALPHA = 0.7213 / (1 + 1.079 / NUM_REGISTERS)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, registers: Optional[bytes] = None):
+        if registers is not None and len(registers) != NUM_REGISTERS:
+            raise ValueError(f"A sketch has {NUM_REGISTERS} registers, got {len(registers)}")
+        self.registers = bytearray(registers) if registers is not None else bytearray(NUM_REGISTERS)
+
+    def add(self, value: str) -> None:
+        hashed = _hash(value)
+        index = hashed >> (_HASH_BITS - PRECISION)
+        remainder = hashed & ((1 << (_HASH_BITS - PRECISION)) - 1)
+        # Posición del primer bit a 1 en los bits restantes (1 si el primero ya lo es)
+        rank = (_HASH_BITS - PRECISION) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]) -> "HyperLogLog":
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """In-place union with ``other``."""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        zeros = self.registers.count(0)
+        if zeros == NUM_REGISTERS:
+            return 0
+        estimate = _ALPHA * NUM_REGISTERS * NUM_REGISTERS / sum(2.0**-register for register in self.registers)
+        if estimate <= 2.5 * NUM_REGISTERS and zeros:
+            estimate = NUM_REGISTERS * math.log(NUM_REGISTERS / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(bytes(self.registers), 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(zlib.decompress(data))
+
+    @classmethod
+    def union(cls, sketches: Iterable["HyperLogLog"]) -> "HyperLogLog":
+        merged = cls()
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+
+def visitor_key(user_id: Optional[int], cookie: Optional[str]) -> str:
+    """A signed-in user is one visitor across browsers; anonymous visitors are told apart by cookie."""
+    return f"u:{user_id}" if user_id is not None else f"c:{cookie}"
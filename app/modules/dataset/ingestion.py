@@ -0,0 +1,334 @@
+"""
+Buffered ingestion of view and download records.
+
+The routes only queue a ``RecordEvent``; a background thread writes the queued events in
+batches (one existence query and one bulk ``INSERT`` per kind of record). Until they are
+written, events are also appended to a per-process spool file, which is replayed by the
+next process that starts after a crash or restart.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+
+from app.modules.dataset.models import DSDownloadRecord, DSViewRecord
+from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
+
+logger = logging.getLogger(__name__)
+
+DATASET_VIEW = "dataset_view"
+DATASET_DOWNLOAD = "dataset_download"
+FILE_VIEW = "file_view"
+FILE_DOWNLOAD = "file_download"
+
+RECORDS_QUEUE_SIZE = 10000
+RECORDS_BATCH_SIZE = 500
+RECORDS_FLUSH_SECONDS = 2.0
+
+SPOOL_PREFIX = "records-"
+SPOOL_SUFFIX = ".ndjson"
+
+
+class RecordTable(NamedTuple):
+    model: type
+    object_column: str
+    cookie_column: str
+    date_column: str
+    counter: str
+
+
+# Tabla de cada tipo de registro y contador de portada (PlatformCounter) que incrementa
+RECORD_TABLES = {
+    DATASET_VIEW: RecordTable(DSViewRecord, "dataset_id", "view_cookie", "view_date", "dataset_views"),
+    DATASET_DOWNLOAD: RecordTable(
+        DSDownloadRecord, "dataset_id", "download_cookie", "download_date", "dataset_downloads"
+    ),
+    FILE_VIEW: RecordTable(HubfileViewRecord, "file_id", "view_cookie", "view_date", "file_views"),
+    FILE_DOWNLOAD: RecordTable(HubfileDownloadRecord, "file_id", "download_cookie", "download_date", "file_downloads"),
+}
+
+
+class RecordEvent(NamedTuple):
+    kind: str
+    user_id: Optional[int]
+    object_id: int
+    cookie: str
+    at: datetime
+
+    @property
+    def key(self) -> Tuple[str, Optional[int], int, str]:
+        """Records are unique per (user, object, cookie), as the routes always checked."""
+        return self.kind, self.user_id, self.object_id, self.cookie
+
+    def to_line(self) -> str:
+        return json.dumps([self.kind, self.user_id, self.object_id, self.cookie, self.at.isoformat()]) + "\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> "RecordEvent":
+        kind, user_id, object_id, cookie, at = json.loads(line)
+        if kind not in RECORD_TABLES:
+            raise ValueError(f"Unknown record kind {kind!r}")
+        return cls(kind, user_id, object_id, cookie, datetime.fromisoformat(at))
+
+
+def write_records(events: Iterable[RecordEvent]) -> int:
+    """
+    Inserts the events that are not recorded yet, one existence query and one bulk insert
+    per kind, and bumps the matching platform counters in the same transaction.
+    """
+    from app import db
+    from app.modules.dataset.repositories import RecordIngestionRepository
+    from app.modules.public.repositories import PlatformCounterRepository
+
+    by_kind: Dict[str, Dict[tuple, RecordEvent]] = defaultdict(dict)
+    for event in events:
+        by_kind[event.kind].setdefault(event.key, event)
+
+    repository = RecordIngestionRepository()
+    counters = PlatformCounterRepository()
+    written = 0
+    try:
+        for kind, pending in by_kind.items():
+            table = RECORD_TABLES[kind]
+            existing = repository.existing_keys(table, [event for event in pending.values()])
+            rows = [
+                {
+                    "user_id": event.user_id,
+                    table.object_column: event.object_id,
+                    table.cookie_column: event.cookie,
+                    table.date_column: event.at,
+                }
+                for event in pending.values()
+                if (event.user_id, event.object_id, event.cookie) not in existing
+            ]
+            if rows:
+                repository.insert_many(table, rows)
+                # El INSERT masivo no pasa por los eventos de la sesión que mantienen los contadores
+                counters.increment(table.counter, len(rows))
+                written += len(rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return written
+
+
+class RecordBuffer:
+    """
+    Process-wide bounded buffer of record events, de-duplicated by (kind, user, object, cookie).
+
+    With ``RECORDS_ASYNC`` disabled (tests) events are written inline. Otherwise they are
+    spooled and written by a daemon thread every ``RECORDS_FLUSH_SECONDS`` or as soon as
+    ``RECORDS_BATCH_SIZE`` are pending; when ``RECORDS_QUEUE_SIZE`` are pending new events
+    are dropped (and logged) rather than slowing the request down.
+    """
+
+    def __init__(self):
+        self._pending: Dict[tuple, RecordEvent] = {}
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._spool = None
+        self._spool_path: Optional[str] = None
+        self._atexit_registered = False
+        self.dropped = 0
+
+    def _config(self, key, default=None):
+        if self._app is not None:
+            return self._app.config.get(key, default)
+        return current_app.config.get(key, default)
+
+    def _spool_dir(self) -> Optional[str]:
+        path = self._config("RECORDS_SPOOL_DIR")
+        if path is None:
+            path = os.path.join(os.getenv("WORKING_DIR", ""), "uploads", "record_spool")
+        return path or None
+
+    def submit(self, kind: str, user_id: Optional[int], object_id: int, cookie: str) -> None:
+        event = RecordEvent(kind, user_id, object_id, cookie, datetime.now(timezone.utc))
+        if not current_app.config.get("RECORDS_ASYNC", True):
+            write_records([event])
+            return
+
+        with self._lock:
+            self._start(current_app._get_current_object())
+            if event.key in self._pending:
+                return
+            if len(self._pending) >= self._config("RECORDS_QUEUE_SIZE", RECORDS_QUEUE_SIZE):
+                self.dropped += 1
+                logger.warning(f"Record buffer full, dropping {kind} of {object_id} ({self.dropped} dropped)")
+                return
+            self._pending[event.key] = event
+            self._append_to_spool(event)
+            if len(self._pending) >= self._config("RECORDS_BATCH_SIZE", RECORDS_BATCH_SIZE):
+                self._wakeup.set()
+
+    def pending(self) -> List[RecordEvent]:
+        with self._lock:
+            return list(self._pending.values())
+
+    def flush(self) -> int:
+        """Writes everything pending; on failure the events are kept (and stay spooled) for the next flush."""
+        with self._lock:
+            if self._app is None:
+                return 0
+            batch = list(self._pending.values())
+            self._pending.clear()
+        if not batch:
+            return 0
+
+        from app import db
+
+        batch_size = self._config("RECORDS_BATCH_SIZE", RECORDS_BATCH_SIZE)
+        written = 0
+        with self._app.app_context():
+            try:
+                for start in range(0, len(batch), batch_size):
+                    written += write_records(batch[start : start + batch_size])
+            except Exception as exc:
+                logger.exception(f"Failed writing {len(batch)} buffered records: {exc}")
+                with self._lock:
+                    # Los ya escritos se descartan en el siguiente intento por la consulta de existencia
+                    self._pending = {**{event.key: event for event in batch}, **self._pending}
+                return written
+            finally:
+                db.session.remove()
+
+        with self._lock:
+            self._rewrite_spool()
+        return written
+
+    def _start(self, app) -> None:
+        if self._app is not None:
+            return
+        self._app = app
+        self._open_spool()
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+        if self._config("RECORDS_FLUSH_SECONDS", RECORDS_FLUSH_SECONDS) > 0:
+            self._thread = threading.Thread(target=self._run, name="record-ingestion", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self._config("RECORDS_FLUSH_SECONDS", RECORDS_FLUSH_SECONDS))
+            self._wakeup.clear()
+            try:
+                self.flush()
+                self._roll_up()
+            except Exception as exc:  # pragma: no cover - el hilo nunca debe morir
+                logger.exception(f"Record ingestion loop failed: {exc}")
+
+    def _roll_up(self) -> None:
+        """
+        The daily rollups are refreshed from this thread too, every ``ROLLUP_INTERVAL_SECONDS``,
+        and unreferenced blobs are collected every ``BLOB_GC_INTERVAL_SECONDS``.
+        """
+        from app import db
+        from app.modules.dataset.services import DataSetService, RecordRollupService
+
+        with self._app.app_context():
+            try:
+                RecordRollupService().run_if_due()
+                DataSetService().collect_garbage_if_due()
+            finally:
+                db.session.remove()
+
+    # Spool
+
+    def _open_spool(self) -> None:
+        directory = self._spool_dir()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._spool_path = os.path.join(directory, f"{SPOOL_PREFIX}{os.getpid()}{SPOOL_SUFFIX}")
+        for path in self._orphan_spools(directory):
+            self._replay(path)
+        self._rewrite_spool()
+
+    def _orphan_spools(self, directory: str) -> List[str]:
+        """Spools left behind by processes that are no longer running (including a previous run with our pid)."""
+        orphans = []
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith(SPOOL_PREFIX) and name.endswith(SPOOL_SUFFIX)):
+                continue
+            pid = name[len(SPOOL_PREFIX) : -len(SPOOL_SUFFIX)]
+            if not pid.isdigit() or (int(pid) != os.getpid() and _is_running(int(pid))):
+                continue
+            path = os.path.join(directory, name)
+            claimed = f"{path}.{os.getpid()}.replay"
+            try:
+                # Solo un proceso consigue renombrarlo; los demás lo ignoran
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            orphans.append(claimed)
+        return orphans
+
+    def _replay(self, path: str) -> None:
+        replayed = 0
+        with open(path, "r", encoding="utf-8") as spool:
+            for line in spool:
+                try:
+                    event = RecordEvent.from_line(line)
+                except (ValueError, TypeError):
+                    continue
+                if event.key not in self._pending:
+                    self._pending[event.key] = event
+                    replayed += 1
+        os.remove(path)
+        logger.info(f"Replayed {replayed} buffered records from {path}")
+
+    def _append_to_spool(self, event: RecordEvent) -> None:
+        if self._spool is None:
+            return
+        try:
+            self._spool.write(event.to_line())
+            self._spool.flush()
+        except OSError as exc:
+            logger.warning(f"Could not spool record: {exc}")
+
+    def _rewrite_spool(self) -> None:
+        """Leaves in the spool exactly the events still pending."""
+        if self._spool_path is None:
+            return
+        if self._spool is not None:
+            self._spool.close()
+        tmp_path = self._spool_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as spool:
+            spool.writelines(event.to_line() for event in self._pending.values())
+        os.replace(tmp_path, self._spool_path)
+        self._spool = open(self._spool_path, "a", encoding="utf-8")
+
+    def reset(self) -> None:
+        """Forgets the pending events and the app; used by tests."""
+        with self._lock:
+            self._pending.clear()
+            if self._spool is not None:
+                self._spool.close()
+            self._spool = None
+            self._spool_path = None
+            self._app = None
+            self.dropped = 0
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+record_buffer = RecordBuffer()
@@ -1,8 +1,12 @@
+import unicodedata
 from datetime import datetime
 from enum import Enum
 
 from flask import request
 from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, attributes
 
 from app import db
 
@@ -36,6 +40,52 @@ class DSMetrics(db.Model):
         return f"DSMetrics<models={self.number_of_models}, features={self.number_of_features}>"
 
 
+TAG_MAX_LENGTH = 120
+
+
+def normalize_tag(value: str) -> str:
+    """
+    Lower case, single spaced and without accents, so two names are equal exactly when
+    the accent- and case-insensitive collation of ``tag.name`` says they are.
+    """
+    decomposed = unicodedata.normalize("NFKD", " ".join(value.split()).lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return unicodedata.normalize("NFC", stripped)[:TAG_MAX_LENGTH]
+
+
+def split_tags(value) -> list:
+    """Normalised, de-duplicated tags of a comma separated string (or a list of tags), in order."""
+    if not value:
+        return []
+    parts = value.split(",") if isinstance(value, str) else value
+    names = []
+    for part in parts:
+        name = normalize_tag(part) if isinstance(part, str) else ""
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+ds_meta_data_tag = db.Table(
+    "ds_meta_data_tag",
+    db.Column("ds_meta_data_id", db.Integer, db.ForeignKey("ds_meta_data.id"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id"), primary_key=True),
+    # La PK sirve para "tags de un dataset"; este índice para "datasets con un tag"
+    db.Index("ix_ds_meta_data_tag_tag_id", "tag_id", "ds_meta_data_id"),
+)
+
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(TAG_MAX_LENGTH), nullable=False, unique=True)
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name}
+
+    def __repr__(self):
+        return f"Tag<{self.name}>"
+
+
 class DSMetaData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     deposition_id = db.Column(db.Integer)
@@ -45,9 +95,59 @@ class DSMetaData(db.Model):
     publication_doi = db.Column(db.String(120))
     dataset_doi = db.Column(db.String(120))
     tags = db.Column(db.String(120))
+    # Última modificación del registro (publicación o edición); lo usa el endpoint de harvesting
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     ds_metrics_id = db.Column(db.Integer, db.ForeignKey("ds_metrics.id"))
     ds_metrics = db.relationship("DSMetrics", uselist=False, backref="ds_meta_data", cascade="all, delete")
     authors = db.relationship("Author", backref="ds_meta_data", lazy=True, cascade="all, delete")
+    # Normalised copy of ``tags``, kept in sync on flush (see ``_sync_normalized_tags``)
+    normalized_tags = db.relationship("Tag", secondary=ds_meta_data_tag, lazy=True, backref="ds_meta_data")
+
+
+def _existing_tags(session, names, lock=False) -> dict:
+    query = session.query(Tag).filter(Tag.name.in_(names))
+    if lock:
+        # Lectura con bloqueo: ve las filas confirmadas por otra transacción después de nuestra instantánea
+        query = query.with_for_update(read=True)
+    return {normalize_tag(tag.name): tag for tag in query}
+
+
+def _insert_tags(session, names) -> None:
+    """Inserts each name in its own savepoint; a name created concurrently by another request is skipped."""
+    connection = session.connection()
+    for name in names:
+        try:
+            with connection.begin_nested():
+                connection.execute(Tag.__table__.insert().values(name=name))
+        except IntegrityError:
+            continue
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_normalized_tags(session, flush_context, instances):
+    """
+    ``DSMetaData.tags`` stays the editable comma separated string; whenever it is set on a
+    new or modified metadata row, its ``Tag`` rows are resolved (created if needed) here.
+    """
+    pending = [
+        obj
+        for obj in session.new.union(session.dirty)
+        if isinstance(obj, DSMetaData) and (obj in session.new or attributes.get_history(obj, "tags").has_changes())
+    ]
+    if not pending:
+        return
+
+    names = list(dict.fromkeys(name for obj in pending for name in split_tags(obj.tags)))
+    known = {}
+    if names:
+        with session.no_autoflush:
+            known = _existing_tags(session, names)
+            missing = [name for name in names if name not in known]
+            if missing:
+                _insert_tags(session, missing)
+                known = _existing_tags(session, names, lock=True)
+    for obj in pending:
+        obj.normalized_tags = [known[name] for name in split_tags(obj.tags)]
 
 
 class DataSetConcept(db.Model):
@@ -65,6 +165,9 @@ class DataSetConcept(db.Model):
 
 
 class DataSet(db.Model):
+    # Paginación por clave (created_at, id) de las últimas versiones en explore
+    __table_args__ = (db.Index("ix_data_set_latest_created", "is_latest", "created_at", "id"),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
@@ -185,6 +288,79 @@ class DOIMapping(db.Model):
     dataset_doi_new = db.Column(db.String(120))
 
 
+class DataSetSignature(db.Model):
+    """MinHash signature of a dataset's columns, stations, tags and authors (see ``similarity.py``)."""
+
+    __tablename__ = "ds_signature"
+    data_set_id = db.Column(db.Integer, db.ForeignKey("data_set.id"), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)
+    feature_count = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    data_set = db.relationship("DataSet", backref=db.backref("signature", uselist=False, cascade="all, delete-orphan"))
+    buckets = db.relationship("DataSetSignatureBucket", lazy=True, cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<DataSetSignature data_set_id={self.data_set_id} features={self.feature_count}>"
+
+
+class DataSetSignatureBucket(db.Model):
+    """One LSH band of a signature; datasets sharing a ``(band, bucket)`` are similar candidates."""
+
+    __tablename__ = "ds_signature_bucket"
+    __table_args__ = (db.Index("ix_ds_signature_bucket_band_bucket", "band", "bucket"),)
+    id = db.Column(db.Integer, primary_key=True)
+    data_set_id = db.Column(db.Integer, db.ForeignKey("ds_signature.data_set_id"), nullable=False, index=True)
+    band = db.Column(db.SmallInteger, nullable=False)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
+
+class RecordDailyRollup(db.Model):
+    """
+    Views or downloads of one dataset or file on one day, aggregated from the raw record
+    tables by ``RecordRollupService``; ``kind`` is one of the ``ingestion.RECORD_TABLES`` keys.
+    """
+
+    __tablename__ = "record_daily_rollup"
+    # Trending: todas las filas de un tipo en los últimos N días
+    __table_args__ = (db.Index("ix_record_daily_rollup_kind_day", "kind", "day", "object_id"),)
+    kind = db.Column(db.String(32), primary_key=True)
+    object_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RecordDailyRollup {self.kind} {self.object_id} {self.day}={self.count}>"
+
+
+class RecordDailySketch(db.Model):
+    """HyperLogLog sketch (``hyperloglog.py``) of the distinct visitors behind a ``RecordDailyRollup``."""
+
+    __tablename__ = "record_daily_sketch"
+    kind = db.Column(db.String(32), primary_key=True)
+    object_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    registers = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f"<RecordDailySketch {self.kind} {self.object_id} {self.day}>"
+
+
+class RecordRollupState(db.Model):
+    """
+    High-water mark of each raw record table: rows with a greater id are not rolled up yet.
+    ``observed_record_id`` is the greatest id seen at ``observed_at``; the mark only moves up
+    to it once every insert that could hold a lower id has had time to commit.
+    """
+
+    __tablename__ = "record_rollup_state"
+    kind = db.Column(db.String(32), primary_key=True)
+    last_record_id = db.Column(db.Integer, nullable=False, default=0)
+    observed_record_id = db.Column(db.Integer, nullable=False, default=0)
+    observed_at = db.Column(db.DateTime)
+    rolled_up_at = db.Column(db.DateTime)
+
+
 class DSMetaDataEditLog(db.Model):
     """Tracks minor edits to dataset metadata that don't generate a new version."""
 
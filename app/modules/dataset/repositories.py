@@ -1,21 +1,33 @@
 import logging
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 
 from flask_login import current_user
-from sqlalchemy import desc, func
+from sqlalchemy import and_, desc, func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, contains_eager, selectinload
 
+from app import db
+from app.modules.dataset.hyperloglog import HyperLogLog
 from app.modules.dataset.models import (
     Author,
     DataSet,
     DatasetComment,
     DataSetConcept,
+    DataSetSignature,
+    DataSetSignatureBucket,
     DOIMapping,
     DSDownloadRecord,
     DSMetaData,
     DSMetaDataEditLog,
     DSViewRecord,
+    RecordDailyRollup,
+    RecordDailySketch,
+    RecordRollupState,
+    Tag,
+    split_tags,
 )
+from app.modules.featuremodel.models import FeatureModel
 from core.repositories.BaseRepository import BaseRepository
 
 logger = logging.getLogger(__name__)
@@ -35,6 +47,154 @@ class DSDownloadRecordRepository(BaseRepository):
         return max_id if max_id is not None else 0
 
 
+class RecordIngestionRepository:
+    """Batch reads and writes of the view / download record tables (see ``ingestion.RECORD_TABLES``)."""
+
+    def __init__(self):
+        self.session = db.session
+
+    def existing_keys(self, table, events) -> set:
+        """``(user_id, object_id, cookie)`` of ``events`` that are already recorded, in one query."""
+        if not events:
+            return set()
+        model = table.model
+        object_column = getattr(model, table.object_column)
+        cookie_column = getattr(model, table.cookie_column)
+        rows = (
+            self.session.query(model.user_id, object_column, cookie_column)
+            .filter(
+                cookie_column.in_({event.cookie for event in events}),
+                object_column.in_({event.object_id for event in events}),
+            )
+            .all()
+        )
+        return {tuple(row) for row in rows}
+
+    def insert_many(self, table, rows: list) -> None:
+        self.session.execute(insert(table.model), rows)
+
+
+def _as_date(value) -> date:
+    # SQLite devuelve date() como texto; MySQL / MariaDB como date
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value.date() if isinstance(value, datetime) else value
+
+
+class RecordRollupRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(RecordDailyRollup)
+
+    def lock_state(self, kind: str) -> RecordRollupState:
+        """Rollup state of ``kind``, locked until the end of the transaction so runs never overlap."""
+        query = self.session.query(RecordRollupState).filter_by(kind=kind).with_for_update()
+        state = query.first()
+        if state is None:
+            # La migración crea las filas; sin ellas, dos primeras ejecuciones compiten por insertarla
+            try:
+                with self.session.begin_nested():
+                    self.session.add(RecordRollupState(kind=kind, last_record_id=0, observed_record_id=0))
+            except IntegrityError:
+                pass
+            state = query.one()
+        return state
+
+    def states(self) -> dict:
+        return {state.kind: state for state in self.session.query(RecordRollupState)}
+
+    def max_record_id(self, table) -> int:
+        return self.session.query(func.max(table.model.id)).scalar() or 0
+
+    def aggregate(self, table, after_id: int, upto_id: int) -> list:
+        """
+        ``(object_id, day, user_id, cookie, count)`` of the records with ``after_id < id <= upto_id``,
+        grouped in SQL by object, day and visitor.
+        """
+        model = table.model
+        object_column = getattr(model, table.object_column)
+        cookie_column = getattr(model, table.cookie_column)
+        day = func.date(getattr(model, table.date_column))
+        rows = (
+            self.session.query(object_column, day, model.user_id, cookie_column, func.count(model.id))
+            .filter(model.id > after_id, model.id <= upto_id, object_column.isnot(None))
+            .group_by(object_column, day, model.user_id, cookie_column)
+            .all()
+        )
+        return [
+            (object_id, _as_date(day_value), user_id, cookie, count)
+            for object_id, day_value, user_id, cookie, count in rows
+            if day_value
+        ]
+
+    def merge(self, kind: str, rows: list) -> None:
+        """Adds ``(object_id, day, count)`` to the rollup rows of ``kind``, creating missing ones."""
+        if not rows:
+            return
+        existing = {
+            (rollup.object_id, rollup.day): rollup
+            for rollup in self.model.query.filter(
+                self.model.kind == kind,
+                self.model.object_id.in_({object_id for object_id, _, _ in rows}),
+                self.model.day.in_({day for _, day, _ in rows}),
+            )
+        }
+        for object_id, day, count in rows:
+            rollup = existing.get((object_id, day))
+            if rollup is None:
+                rollup = existing[(object_id, day)] = self.model(kind=kind, object_id=object_id, day=day, count=0)
+                self.session.add(rollup)
+            rollup.count += count
+
+    def merge_sketches(self, kind: str, sketches: dict) -> None:
+        """Merges ``{(object_id, day): HyperLogLog}`` into the stored sketches of ``kind``."""
+        if not sketches:
+            return
+        existing = {
+            (sketch.object_id, sketch.day): sketch
+            for sketch in self.session.query(RecordDailySketch).filter(
+                RecordDailySketch.kind == kind,
+                RecordDailySketch.object_id.in_({object_id for object_id, _ in sketches}),
+                RecordDailySketch.day.in_({day for _, day in sketches}),
+            )
+        }
+        for (object_id, day), sketch in sketches.items():
+            stored = existing.get((object_id, day))
+            if stored is None:
+                self.session.add(
+                    RecordDailySketch(kind=kind, object_id=object_id, day=day, registers=sketch.to_bytes())
+                )
+            else:
+                stored.registers = HyperLogLog.from_bytes(stored.registers).merge(sketch).to_bytes()
+
+    def sketches(self, kind: str, object_id: int, since: date) -> list:
+        return [
+            row.registers
+            for row in self.session.query(RecordDailySketch.registers).filter(
+                RecordDailySketch.kind == kind,
+                RecordDailySketch.object_id == object_id,
+                RecordDailySketch.day >= since,
+            )
+        ]
+
+    def prune(self, table, before: datetime, below_id: int) -> int:
+        """Deletes the raw records older than ``before`` that are already rolled up (``id < below_id``)."""
+        model = table.model
+        return (
+            self.session.query(model)
+            .filter(getattr(model, table.date_column) < before, model.id < below_id)
+            .delete(synchronize_session=False)
+        )
+
+    def daily_counts(self, kinds, since: date, object_ids=None) -> list:
+        """``(kind, object_id, day, count)`` rollup rows of ``kinds`` from ``since`` on."""
+        query = self.session.query(self.model.kind, self.model.object_id, self.model.day, self.model.count).filter(
+            self.model.kind.in_(list(kinds)), self.model.day >= since
+        )
+        if object_ids is not None:
+            query = query.filter(self.model.object_id.in_(list(object_ids)))
+        return query.all()
+
+
 class DataSetConceptRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSetConcept)
@@ -42,6 +202,16 @@ class DataSetConceptRepository(BaseRepository):
     def ds_concept_by_conceptual_doi(self, doi: str):
         return self.model.query.filter_by(conceptual_doi=doi).first()
 
+    def version_ids(self, concept_id: int) -> list:
+        """Ids of the versions of a concept, newest first (same order as ``DataSetConcept.versions``)."""
+        rows = (
+            self.session.query(DataSet.id)
+            .filter(DataSet.ds_concept_id == concept_id)
+            .order_by(DataSet.created_at.desc())
+            .all()
+        )
+        return [row.id for row in rows]
+
 
 class DSMetaDataRepository(BaseRepository):
     def __init__(self):
@@ -50,6 +220,17 @@ class DSMetaDataRepository(BaseRepository):
     def filter_by_doi(self, doi: str) -> Optional[DSMetaData]:
         return self.model.query.filter_by(dataset_doi=doi).first()
 
+    def latest_dataset_by_doi(self, doi: str):
+        """``(dataset id, concept id, conceptual DOI)`` of the newest dataset with that DOI, or None."""
+        return (
+            self.session.query(DataSet.id, DataSet.ds_concept_id, DataSetConcept.conceptual_doi)
+            .join(DSMetaData, DataSet.ds_meta_data_id == DSMetaData.id)
+            .outerjoin(DataSetConcept, DataSet.ds_concept_id == DataSetConcept.id)
+            .filter(DSMetaData.dataset_doi == doi)
+            .order_by(DataSet.created_at.desc())
+            .first()
+        )
+
     def filter_latest_by_doi(self, doi: str) -> Optional[DSMetaData]:
         return (
             DSMetaData.query.filter(DSMetaData.dataset_doi == doi)
@@ -155,9 +336,8 @@ class DataSetRepository(BaseRepository):
             query = query.filter(DSMetaData.authors.ilike(f"%{author}%"))
         if affiliation:
             query = query.filter(DSMetaData.affiliation.ilike(f"%{affiliation}%"))
-        if tags:
-            for tag in tags:
-                query = query.filter(DSMetaData.tags.ilike(f"%{tag.strip()}%"))
+        for name in split_tags(tags):
+            query = query.filter(DSMetaData.normalized_tags.any(Tag.name == name))
         if start_date:
             query = query.filter(DataSet.created_at >= start_date)
         if end_date:
@@ -170,6 +350,86 @@ class DataSetRepository(BaseRepository):
         return query.order_by(DataSet.created_at.desc()).all()
 
 
+class DataSetHarvestRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(DataSet)
+
+    def harvest_query(self, start=None, until=None, after=None):
+        """
+        Datasets by ``(DSMetaData.updated_at, id)``, with every relation read by
+        ``DataSet.to_dict`` selectin-loaded. ``after`` is the keyset of the last record returned.
+        """
+        query = (
+            self.model.query.join(DSMetaData, DSMetaData.id == DataSet.ds_meta_data_id)
+            .options(
+                contains_eager(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+                selectinload(DataSet.feature_models).selectinload(FeatureModel.files),
+                selectinload(DataSet.concept),
+            )
+            .filter(DSMetaData.updated_at.isnot(None))
+        )
+        if start is not None:
+            query = query.filter(DSMetaData.updated_at >= start)
+        if until is not None:
+            query = query.filter(DSMetaData.updated_at <= until)
+        if after is not None:
+            updated_at, last_id = after
+            query = query.filter(
+                or_(
+                    DSMetaData.updated_at > updated_at,
+                    and_(DSMetaData.updated_at == updated_at, DataSet.id > last_id),
+                )
+            )
+        return query.order_by(DSMetaData.updated_at, DataSet.id)
+
+
+class DataSetSignatureRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(DataSetSignature)
+
+    def get_by_dataset(self, data_set_id: int) -> Optional[DataSetSignature]:
+        return self.session.get(DataSetSignature, data_set_id)
+
+    def replace(self, data_set_id: int, signature: bytes, feature_count: int, buckets) -> DataSetSignature:
+        existing = self.get_by_dataset(data_set_id)
+        if existing is not None:
+            self.session.delete(existing)
+            self.session.flush()
+        record = DataSetSignature(
+            data_set_id=data_set_id,
+            signature=signature,
+            feature_count=feature_count,
+            buckets=[DataSetSignatureBucket(band=band, bucket=bucket) for band, bucket in buckets],
+        )
+        self.session.add(record)
+        self.session.commit()
+        return record
+
+    def candidates(self, data_set_id: int, exclude_concept_id: Optional[int] = None, limit: int = 50):
+        """
+        Latest datasets sharing at least one LSH bucket with ``data_set_id``, most shared bands
+        first, as ``(data_set_id, signature)``. Only the rows of the dataset's own buckets are
+        read through the (band, bucket) index, whatever the size of the catalogue.
+        """
+        own = aliased(DataSetSignatureBucket)
+        other = DataSetSignatureBucket
+        shared = func.count(other.id).label("shared")
+        query = (
+            self.session.query(other.data_set_id, shared)
+            .join(own, and_(own.band == other.band, own.bucket == other.bucket))
+            .join(DataSet, DataSet.id == other.data_set_id)
+            .filter(own.data_set_id == data_set_id, other.data_set_id != data_set_id, DataSet.is_latest.is_(True))
+        )
+        if exclude_concept_id is not None:
+            query = query.filter(or_(DataSet.ds_concept_id.is_(None), DataSet.ds_concept_id != exclude_concept_id))
+        ranked = query.group_by(other.data_set_id).order_by(desc(shared), other.data_set_id).limit(limit).subquery()
+        return (
+            self.session.query(DataSetSignature.data_set_id, DataSetSignature.signature)
+            .join(ranked, ranked.c.data_set_id == DataSetSignature.data_set_id)
+            .all()
+        )
+
+
 class DOIMappingRepository(BaseRepository):
     def __init__(self):
         super().__init__(DOIMapping)
@@ -2,13 +2,11 @@ import json
 import logging
 import os
 import shutil
-import tempfile
 import uuid
-from datetime import datetime, timezone
 from typing import Optional
-from zipfile import ZipFile
 
 from flask import (
+    Response,
     abort,
     current_app,
     jsonify,
@@ -16,31 +14,47 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_from_directory,
+    send_file,
+    stream_with_context,
     url_for,
 )
 from flask_login import current_user, login_required
+from werkzeug.http import parse_content_range_header
 
 from app.modules.comments.forms import CommentForm
 from app.modules.comments.models import Comment
 from app.modules.comments.services import CommentService
 from app.modules.community.repositories import CommunityRepository
 from app.modules.dataset import dataset_bp
+from app.modules.dataset.chunked_upload import (
+    UPLOAD_MAX_BYTES,
+    UPLOAD_MAX_PENDING_BYTES,
+    UPLOAD_SESSION_TTL_SECONDS,
+    ChunkedUpload,
+)
 from app.modules.dataset.forms import DataSetForm, DataSetVersionForm
-from app.modules.dataset.models import DSDownloadRecord
+from app.modules.dataset.ingestion import DATASET_DOWNLOAD, record_buffer
 from app.modules.dataset.services import (
+    SPARKLINE_DAYS,
+    TRENDING_DAYS,
+    TRENDING_LIMIT,
     AuthorService,
     DatasetCommentService,
-    DataSetConceptService,
+    DataSetHarvestService,
     DataSetService,
-    DOIMappingService,
-    DSDownloadRecordService,
+    DataSetSimilarityService,
+    DOIResolverService,
     DSMetaDataEditLogService,
-    DSMetaDataService,
     DSViewRecordService,
+    RecordRollupService,
+    checksum_path,
+    parse_harvest_timestamp,
+    save_with_checksum,
 )
+from app.modules.dataset.validator import REQUIRED_COLUMNS
 from app.modules.fakenodo.services import FakenodoService
 from app.modules.follow.services import FollowService
+from core.serialisers.serializer import encode_json
 
 follow_service = FollowService()
 
@@ -49,9 +63,9 @@ logger = logging.getLogger(__name__)
 
 dataset_service = DataSetService()
 author_service = AuthorService()
-dsmetadata_service = DSMetaDataService()
-dataset_concept_service = DataSetConceptService()
 ds_metadata_edit_log_service = DSMetaDataEditLogService()
+similarity_service = DataSetSimilarityService()
+rollup_service = RecordRollupService()
 
 
 class FakenodoAdapter:
@@ -80,6 +94,8 @@ class FakenodoAdapter:
             db.session.commit()
         except Exception:
             logger.exception("Failed to update concept linkage or latest flags")
+        # El concepto tiene una versión más: las resoluciones cacheadas de sus DOI ya no valen
+        DOIResolverService.invalidate()
 
         # Mover los feature models nuevos que haya subido el usuario (si hay)
         logger.info(
@@ -187,6 +203,7 @@ class FakenodoAdapter:
         _dataset_service.update_dsmetadata(
             new_dataset.ds_meta_data_id, deposition_id=deposition_id, dataset_doi=new_doi
         )
+        _dataset_service.on_published(new_dataset)
         return new_dataset
 
     def create_new_deposition(self, dataset) -> dict:
@@ -255,7 +272,7 @@ def get_deposition_client(working_dir: str | None = None):
 
 
 deposition_service = get_deposition_client()
-doi_mapping_service = DOIMappingService()
+doi_resolver_service = DOIResolverService()
 ds_view_record_service = DSViewRecordService()
 
 
@@ -288,6 +305,10 @@ def create_dataset():
             error_msg = {"message": "Internal server error while creating dataset"}
             return jsonify(error_msg), 500
 
+        # CSV demasiado grandes para validarlos enteros en la petición: el resto se valida en segundo plano
+        partially_validated = [hubfile.name for hubfile in dataset.files() if hubfile.rows_validated is False]
+        dataset_service.on_published(dataset)
+
         data = {}
         try:
             response_json = deposition_service.create_new_deposition(dataset)
@@ -337,6 +358,7 @@ def create_dataset():
                     dataset.ds_concept_id = concept.id
                     db.session.add(dataset)
                     db.session.commit()
+                    DOIResolverService.invalidate()
 
             except Exception as e:
                 msg = (
@@ -354,7 +376,13 @@ def create_dataset():
             shutil.rmtree(file_path)
 
         msg = "Everything works!"
-        return jsonify({"message": msg}), 200
+        response = {"message": msg}
+        if partially_validated:
+            response["warnings"] = [
+                f"'{name}' was partially validated on upload; its remaining rows are being validated in the background"
+                for name in partially_validated
+            ]
+        return jsonify(response), 200
 
     return render_template("dataset/upload_dataset.html", form=form)
 
@@ -379,6 +407,21 @@ def list_dataset():
     )
 
 
+VALID_UPLOAD_EXTENSIONS = (".csv", ".txt", ".md")
+
+
+def _available_filename(temp_folder, filename):
+    """Return ``filename`` or the first ``name (i).ext`` variant not yet present in ``temp_folder``."""
+    if not os.path.exists(os.path.join(temp_folder, filename)):
+        return filename
+
+    base_name, extension = os.path.splitext(filename)
+    i = 1
+    while os.path.exists(os.path.join(temp_folder, f"{base_name} ({i}){extension}")):
+        i += 1
+    return f"{base_name} ({i}){extension}"
+
+
 @dataset_bp.route("/dataset/file/upload", methods=["POST"])
 @login_required
 def upload():
@@ -392,33 +435,18 @@ def upload():
 
     logger.info(f"Received file: {file.filename}")
     filename_lower = file.filename.lower()
-    valid_extensions = (".csv", ".txt", ".md")
-    if not any(filename_lower.endswith(ext) for ext in valid_extensions):
+    if not any(filename_lower.endswith(ext) for ext in VALID_UPLOAD_EXTENSIONS):
         logger.warning(f"Invalid file extension: {file.filename}")
-        return jsonify({"message": f"Invalid file type. Allowed: {', '.join(valid_extensions)}"}), 400
+        return jsonify({"message": f"Invalid file type. Allowed: {', '.join(VALID_UPLOAD_EXTENSIONS)}"}), 400
     if not os.path.exists(temp_folder):
         os.makedirs(temp_folder)
 
-    file_path = os.path.join(temp_folder, file.filename)
-
-    if os.path.exists(file_path):
-        base_name, extension = os.path.splitext(file.filename)
-        i = 1
-        while True:
-            candidate_name = f"{base_name} ({i}){extension}"
-            candidate = os.path.join(temp_folder, candidate_name)
-            if os.path.exists(candidate):
-                i += 1
-                continue
-            new_filename = candidate_name
-            break
-        file_path = os.path.join(temp_folder, new_filename)
-    else:
-        new_filename = file.filename
+    new_filename = _available_filename(temp_folder, file.filename)
+    file_path = os.path.join(temp_folder, new_filename)
 
     try:
-        file.save(file_path)
-        logger.info(f"File saved successfully: {file_path} ({os.path.getsize(file_path)} bytes)")
+        checksum, size = save_with_checksum(file.stream, file_path)
+        logger.info(f"File saved successfully: {file_path} ({size} bytes, sha256 {checksum})")
     except Exception as e:
         logger.error(f"Error saving file {file.filename}: {str(e)}")
         return jsonify({"message": str(e)}), 500
@@ -434,6 +462,116 @@ def upload():
     )
 
 
+# ===================== CHUNKED (RESUMABLE) UPLOAD ROUTES =====================
+
+
+def _upload_session_ttl():
+    return current_app.config.get("UPLOAD_SESSION_TTL_SECONDS", UPLOAD_SESSION_TTL_SECONDS)
+
+
+@dataset_bp.route("/dataset/file/upload/session", methods=["POST"])
+@login_required
+def create_upload_session():
+    """Start a resumable upload. Body: {"filename", "size", "checksum" (optional SHA-256)}."""
+    data = request.get_json(silent=True) or {}
+    filename = os.path.basename(str(data.get("filename") or ""))
+    if not filename:
+        return jsonify({"message": "No filename provided"}), 400
+    if not any(filename.lower().endswith(ext) for ext in VALID_UPLOAD_EXTENSIONS):
+        return jsonify({"message": f"Invalid file type. Allowed: {', '.join(VALID_UPLOAD_EXTENSIONS)}"}), 400
+
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"message": "A numeric 'size' is required"}), 400
+
+    max_bytes = current_app.config.get("UPLOAD_MAX_BYTES", UPLOAD_MAX_BYTES)
+    if size > max_bytes:
+        return jsonify({"message": f"File too large. Maximum size: {max_bytes} bytes"}), 413
+
+    # Las sesiones abandonadas se descartan aquí; las vivas limitan lo que un usuario puede reservar en disco
+    temp_folder = current_user.temp_folder()
+    pending = ChunkedUpload.open_sessions(temp_folder, _upload_session_ttl())
+    max_pending = current_app.config.get("UPLOAD_MAX_PENDING_BYTES", UPLOAD_MAX_PENDING_BYTES)
+    if sum(s.size for s in pending) + size > max_pending:
+        return jsonify({"message": "Too much data pending in open upload sessions; finish or wait for them"}), 507
+
+    try:
+        upload_session = ChunkedUpload.create(temp_folder, filename, size, data.get("checksum"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except OSError as e:
+        logger.error(f"Could not reserve {size} bytes for chunked upload of {filename}: {e}")
+        return jsonify({"message": "Insufficient storage for this upload"}), 507
+
+    logger.info(
+        f"Chunked upload {upload_session.upload_id} started by user {current_user.id}: {filename} ({size} bytes)"
+    )
+    return jsonify(upload_session.to_dict()), 201
+
+
+@dataset_bp.route("/dataset/file/upload/session/<upload_id>", methods=["GET"])
+@login_required
+def get_upload_session(upload_id):
+    upload_session = ChunkedUpload.load(current_user.temp_folder(), upload_id, _upload_session_ttl())
+    if not upload_session:
+        return jsonify({"message": "Upload session not found"}), 404
+    return jsonify(upload_session.to_dict()), 200
+
+
+@dataset_bp.route("/dataset/file/upload/session/<upload_id>", methods=["PUT"])
+@login_required
+def upload_session_chunk(upload_id):
+    """Write one chunk. The byte range is taken from the ``Content-Range: bytes start-end/size`` header."""
+    upload_session = ChunkedUpload.load(current_user.temp_folder(), upload_id, _upload_session_ttl())
+    if not upload_session:
+        return jsonify({"message": "Upload session not found"}), 404
+
+    content_range = parse_content_range_header(request.headers.get("Content-Range"))
+    if content_range is None or content_range.units != "bytes" or content_range.start is None:
+        return jsonify({"message": "A valid 'Content-Range: bytes start-end/size' header is required"}), 400
+    if content_range.length is not None and content_range.length != upload_session.size:
+        return jsonify({"message": "Content-Range size does not match the upload session"}), 400
+
+    try:
+        upload_session.write_chunk(content_range.start, content_range.stop, request.stream)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except OSError as e:
+        logger.error(f"Could not write chunk of upload {upload_id}: {e}")
+        return jsonify({"message": "Insufficient storage for this upload"}), 507
+
+    return jsonify(upload_session.to_dict()), 200
+
+
+@dataset_bp.route("/dataset/file/upload/session/<upload_id>/finalize", methods=["POST"])
+@login_required
+def finalize_upload_session(upload_id):
+    temp_folder = current_user.temp_folder()
+    upload_session = ChunkedUpload.load(temp_folder, upload_id, _upload_session_ttl())
+    if not upload_session:
+        return jsonify({"message": "Upload session not found"}), 404
+
+    new_filename = _available_filename(temp_folder, upload_session.filename)
+    try:
+        checksum, size = upload_session.finalize(os.path.join(temp_folder, new_filename))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    logger.info(f"Chunked upload {upload_id} finalized: {new_filename} ({size} bytes, sha256 {checksum})")
+    return (
+        jsonify(
+            {
+                "message": "File uploaded and validated successfully",
+                "filename": new_filename,
+                "checksum": checksum,
+                "size": size,
+            }
+        ),
+        200,
+    )
+
+
 @dataset_bp.route("/dataset/file/delete", methods=["POST"])
 def delete():
     data = request.get_json()
@@ -443,6 +581,8 @@ def delete():
 
     if os.path.exists(filepath):
         os.remove(filepath)
+        if os.path.exists(checksum_path(filepath)):
+            os.remove(checksum_path(filepath))
         return jsonify({"message": "File deleted successfully"})
 
     return jsonify({"error": "Error: File not found"})
@@ -451,56 +591,150 @@ def delete():
 @dataset_bp.route("/dataset/download/<int:dataset_id>", methods=["GET"])
 def download_dataset(dataset_id):
     dataset = dataset_service.get_or_404(dataset_id)
-    file_path = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, f"dataset_{dataset_id}.zip")
-
-    with ZipFile(zip_path, "w") as zipf:
-        for subdir, dirs, files in os.walk(file_path):
-            for file in files:
-                full_path = os.path.join(subdir, file)
-                relative_path = os.path.relpath(full_path, file_path)
-                arc_base = os.path.basename(zip_path[:-4])
-                arcname = os.path.join(arc_base, relative_path)
-                zipf.write(full_path, arcname=arcname)
+    archive_name = f"dataset_{dataset_id}.zip"
+
+    cached_path, stream = dataset_service.open_download_archive(dataset)
+    if cached_path:
+        archive = send_file(cached_path, as_attachment=True, download_name=archive_name, mimetype="application/zip")
+    else:
+        archive = Response(
+            stream,
+            mimetype="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={archive_name}"},
+        )
 
     user_cookie = request.cookies.get("download_cookie")
     if not user_cookie:
         user_cookie = str(uuid.uuid4())
-        resp = make_response(
-            send_from_directory(
-                temp_dir,
-                f"dataset_{dataset_id}.zip",
-                as_attachment=True,
-                mimetype="application/zip",
-            )
-        )
+        resp = make_response(archive)
         resp.set_cookie("download_cookie", user_cookie)
     else:
-        resp = send_from_directory(
-            temp_dir,
-            f"dataset_{dataset_id}.zip",
-            as_attachment=True,
-            mimetype="application/zip",
-        )
+        resp = archive
 
-    existing_record = DSDownloadRecord.query.filter_by(
-        user_id=current_user.id if current_user.is_authenticated else None,
-        dataset_id=dataset_id,
-        download_cookie=user_cookie,
-    ).first()
-
-    if not existing_record:
-        DSDownloadRecordService().create(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            dataset_id=dataset_id,
-            download_date=datetime.now(timezone.utc),
-            download_cookie=user_cookie,
-        )
+    # Se encola: la comprobación de duplicados y el INSERT los hace el hilo de ingesta
+    record_buffer.submit(
+        DATASET_DOWNLOAD, current_user.id if current_user.is_authenticated else None, dataset_id, user_cookie
+    )
 
     return resp
 
 
+@dataset_bp.route("/dataset/<int:dataset_id>/aggregate", methods=["GET"])
+def aggregate_dataset(dataset_id):
+    """
+    Monthly / yearly aggregates of the dataset CSVs, e.g.
+    ``?freq=month&agg=mean,max&columns=_temp_mean,_precipitation``
+    """
+    dataset = dataset_service.get_or_404(dataset_id)
+
+    freq = request.args.get("freq", "month")
+    aggregations = [a.strip() for a in request.args.get("agg", "mean").split(",") if a.strip()]
+    columns = [c.strip() for c in request.args.get("columns", "").split(",") if c.strip()] or REQUIRED_COLUMNS
+
+    try:
+        return jsonify(dataset_service.aggregate(dataset, freq, aggregations, columns))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+
+@dataset_bp.route("/dataset/trending", methods=["GET"])
+def trending_datasets():
+    """Most viewed and downloaded datasets of the last ``?days=`` days, recent activity weighing more."""
+    days = max(1, min(request.args.get("days", TRENDING_DAYS, type=int), 90))
+    limit = max(1, min(request.args.get("limit", TRENDING_LIMIT, type=int), 50))
+    return jsonify({"days": days, "datasets": rollup_service.trending(days=days, limit=limit)})
+
+
+@dataset_bp.route("/dataset/<int:dataset_id>/activity", methods=["GET"])
+def dataset_activity(dataset_id):
+    """
+    Daily views and downloads of a dataset (sparkline data) and its estimated unique visitors
+    over the window, served from the daily rollups and sketches.
+    """
+    dataset = dataset_service.get_or_404(dataset_id)
+    days = max(1, min(request.args.get("days", SPARKLINE_DAYS, type=int), 365))
+    activity = rollup_service.sparkline(dataset.id, days=days)
+    unique = rollup_service.unique_visitors(dataset.id, days=days)
+    return jsonify({**activity, "unique_views": unique["views"], "unique_downloads": unique["downloads"]})
+
+
+@dataset_bp.route("/dataset/harvest", methods=["GET"])
+def harvest():
+    """
+    Incremental metadata export for mirrors: the ``DataSet.to_dict`` fields of every dataset
+    modified in ``[from, until]``, oldest change first.
+
+    ``?format=ndjson`` streams the whole window, one record per line. Otherwise a JSON page is
+    returned with a ``resumption_token``; pass it back (alone) to get the next page.
+    """
+    args = request.args
+    output = args.get("format", "json")
+    if output not in ("json", "ndjson"):
+        return jsonify({"message": "format must be 'json' or 'ndjson'"}), 400
+
+    service = DataSetHarvestService()
+    page_size = current_app.config.get("HARVEST_PAGE_SIZE", 100)
+    try:
+        start = parse_harvest_timestamp(args.get("from"))
+        until = parse_harvest_timestamp(args.get("until"), end_of_day=True)
+        if output == "ndjson":
+            records = service.stream(start, until, batch_size=page_size)
+            first = next(records, None)
+        else:
+            records, token = service.page(start, until, args.get("resumption_token"), page_size)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if output == "ndjson":
+
+        def generate():
+            if first is not None:
+                yield encode_json(first) + b"\n"
+            for record in records:
+                yield encode_json(record) + b"\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    body = {
+        "from": start.isoformat() if start else None,
+        "until": until.isoformat() if until else None,
+        "records": records,
+        "resumption_token": token,
+    }
+    return Response(encode_json(body), mimetype="application/json")
+
+
+@dataset_bp.route("/dataset/stations", methods=["GET"])
+def station_catalogue():
+    """
+    Station catalogue built from the CSV headers. Without arguments it lists every station
+    and the number of datasets per variable; ``?station=BASEL&variable=precipitation``
+    returns the datasets with that data.
+    """
+    from app.modules.hubfile.services import HubfileStationService
+
+    service = HubfileStationService()
+    station = request.args.get("station", "").strip()
+    if not station:
+        return jsonify({"stations": service.catalogue()})
+
+    variable = request.args.get("variable", "").strip() or None
+    try:
+        datasets = service.find_datasets(station, variable)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify(
+        {
+            "station": station.upper(),
+            "variable": variable,
+            "datasets": [
+                {"id": ds.id, "title": ds.ds_meta_data.title, "url": dataset_service.get_uvlhub_doi(ds)}
+                for ds in datasets
+            ],
+        }
+    )
+
+
 @dataset_bp.route("/dataset/<int:dataset_id>/new-version", methods=["GET", "POST"])
 @login_required
 def create_new_ds_version(dataset_id):
@@ -577,32 +811,18 @@ def create_new_ds_version(dataset_id):
 
 @dataset_bp.route("/doi/<path:doi>/", methods=["GET"])
 def subdomain_index(doi):
-    new_doi = doi_mapping_service.get_new_doi(doi)
-    if new_doi:
-        new_url = url_for("dataset.subdomain_index", doi=new_doi)
+    resolution = doi_resolver_service.resolve(doi)
+    if resolution is None:
+        abort(404)
+    if resolution.redirect_doi:
+        new_url = url_for("dataset.subdomain_index", doi=resolution.redirect_doi)
         return redirect(new_url, code=302)
 
-    current_dataset = None
-    concept = dataset_concept_service.filter_by_doi(doi=doi) if dataset_concept_service.filter_by_doi(doi=doi) else None
-
-    if concept:
-        if concept.versions:
-            current_dataset = concept.versions.first()
-        else:
-            abort(404)
-    else:
-        ds_meta_data = dsmetadata_service.filter_latest_by_doi(doi)
-        if ds_meta_data:
-            current_dataset = ds_meta_data.data_set
-            concept = current_dataset.concept
-        else:
-            abort(404)
-
-    if not concept:
+    all_versions = doi_resolver_service.load_versions(resolution)
+    current_dataset = next((version for version in all_versions if version.id == resolution.dataset_id), None)
+    if current_dataset is None:
         abort(404)
-
-    all_versions = concept.versions.all()
-    latest_version = all_versions[0] if all_versions else None
+    latest_version = all_versions[0]
 
     comment_service = CommentService()
     comments = comment_service.get_comments_for_dataset(current_dataset, current_user)
@@ -616,9 +836,11 @@ def subdomain_index(doi):
             authors=AuthorService.get_unique_authors(current_dataset),
             all_versions=all_versions,
             latest_version=latest_version,
-            conceptual_doi=concept.conceptual_doi,
+            conceptual_doi=resolution.conceptual_doi,
             comment_form=comment_form,
             comments=comments,
+            similar_datasets=similarity_service.similar(current_dataset),
+            activity=rollup_service.sparkline(current_dataset.id),
         )
     )
     resp.set_cookie("view_cookie", user_cookie)
@@ -1,25 +1,51 @@
+import base64
+import binascii
 import hashlib
+import json
 import logging
 import os
-import shutil
+import threading
+import time
 import uuid
-from typing import Optional
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional, Tuple
 
-from flask import request
+from flask import current_app, request
+from flask_login import current_user
+from sqlalchemy.orm import selectinload
 
 from app.modules.auth.services import AuthenticationService
-from app.modules.dataset.models import DataSet, DSMetaData, DSMetaDataEditLog, DSViewRecord
+from app.modules.dataset.aggregate import cached_aggregate
+from app.modules.dataset.archive import ArchiveCache, archive_key, collect_entries
+from app.modules.dataset.blobstore import BlobStore
+from app.modules.dataset.columnar import ColumnarFile, ColumnarStore
+from app.modules.dataset.hyperloglog import HyperLogLog, visitor_key
+from app.modules.dataset.ingestion import DATASET_DOWNLOAD, DATASET_VIEW, RECORD_TABLES, record_buffer
+from app.modules.dataset.models import DataSet, DSMetaData, DSMetaDataEditLog, DSViewRecord, split_tags
 from app.modules.dataset.repositories import (
     AuthorRepository,
     DataSetConceptRepository,
+    DataSetHarvestRepository,
     DataSetRepository,
+    DataSetSignatureRepository,
     DOIMappingRepository,
     DSDownloadRecordRepository,
     DSMetaDataEditLogRepository,
     DSMetaDataRepository,
     DSViewRecordRepository,
+    RecordRollupRepository,
+)
+from app.modules.dataset.similarity import band_buckets, dataset_features, estimate_similarity, minhash
+from app.modules.dataset.validator import (
+    CSV_VALIDATION_MAX_ROWS,
+    _read_csv_headers_try,
+    extract_station_columns,
+    numeric_columns_for,
+    validate_csv_rows,
+    validate_dataset_package,
 )
-from app.modules.dataset.validator import validate_dataset_package
 from app.modules.fakenodo.services import FakenodoService
 from app.modules.featuremodel.repositories import FeatureModelRepository, FMMetaDataRepository
 from app.modules.hubfile.repositories import (
@@ -27,20 +53,121 @@ from app.modules.hubfile.repositories import (
     HubfileRepository,
     HubfileViewRecordRepository,
 )
+from core.caching.ttl_cache import TTLCache
 from core.services.BaseService import BaseService
 
 logger = logging.getLogger(__name__)
 
 
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+CHECKSUM_SUFFIX = ".sha256"
+
+# Un único worker: las estadísticas se calculan de una en una, fuera de la petición
+_statistics_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dataset-stats")
+
+
+HARVEST_PAGE_SIZE = 100
+
+DOI_CACHE_TTL_SECONDS = 60
+DOI_CACHE_SIZE = 4096
+
+SIMILAR_DATASETS_LIMIT = 5
+# Por debajo de este Jaccard estimado los candidatos del LSH no se muestran
+SIMILARITY_THRESHOLD = 0.2
+
+# Blobs sin enlaces: cada cuánto se recogen y cuántos segundos se respetan tras su último link
+BLOB_GC_INTERVAL_SECONDS = 3600
+BLOB_GC_GRACE_SECONDS = 3600
+
+# Campos de DSMetaData cubiertos por el índice de búsqueda de explore
+SEARCHABLE_METADATA_FIELDS = frozenset(["title", "description", "tags"])
+
+
+def _reindex_if_searchable(ds_meta_data_id: int, changes: dict):
+    if SEARCHABLE_METADATA_FIELDS.intersection(changes):
+        from app.modules.explore.services import ExploreService
+
+        ExploreService.reindex_metadata(ds_meta_data_id)
+
+
+def _compute_statistics_in_background(app, dataset_id: int):
+    from app import db
+    from app.modules.hubfile.services import HubfileStatsService
+
+    with app.app_context():
+        try:
+            dataset = db.session.get(DataSet, dataset_id)
+            if dataset is not None:
+                service = DataSetService()
+                service.validate_remaining_rows(dataset)
+                service.build_columnar_sidecars(dataset)
+                HubfileStatsService().compute_for_dataset(dataset)
+        except Exception as exc:
+            logger.exception(f"Failed computing statistics for dataset {dataset_id}: {exc}")
+        finally:
+            db.session.remove()
+
+
+def checksum_path(file_path):
+    return file_path + CHECKSUM_SUFFIX
+
+
+def save_with_checksum(stream, file_path, chunk_size=CHECKSUM_CHUNK_SIZE):
+    """
+    Copy ``stream`` to ``file_path`` in fixed-size chunks, hashing while writing.
+    The SHA-256 and size are stored next to the file so that dataset creation
+    does not have to read the data again.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, "wb") as dest:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            digest.update(chunk)
+            dest.write(chunk)
+            size += len(chunk)
+
+    hash_hex = digest.hexdigest()
+    write_checksum(file_path, hash_hex, size)
+    return hash_hex, size
+
+
+def write_checksum(file_path, hash_hex, size):
+    with open(checksum_path(file_path), "w") as fh:
+        fh.write(f"{hash_hex} {size}\n")
+
+
+def read_stored_checksum(file_path):
+    """Return the ``(checksum, size)`` stored at upload time, or None if missing or stale."""
+    sidecar = checksum_path(file_path)
+    try:
+        with open(sidecar, "r") as fh:
+            hash_hex, size = fh.read().split()
+        size = int(size)
+        if size != os.path.getsize(file_path) or os.path.getmtime(sidecar) < os.path.getmtime(file_path):
+            return None
+        return hash_hex, size
+    except (OSError, ValueError):
+        return None
+
+
 def calculate_checksum_and_size(file_path):
-    file_size = os.path.getsize(file_path)
+    stored = read_stored_checksum(file_path)
+    if stored:
+        return stored
+
+    digest = hashlib.sha256()
+    file_size = 0
     with open(file_path, "rb") as file:
-        content = file.read()
-        hash_hex = hashlib.sha256(content).hexdigest()
-        return hash_hex, file_size
+        for chunk in iter(lambda: file.read(CHECKSUM_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            file_size += len(chunk)
+    return digest.hexdigest(), file_size
 
 
 class DataSetService(BaseService):
+    _gc_lock = threading.Lock()
+    _last_gc = 0.0
+
     def __init__(self):
         super().__init__(DataSetRepository())
         self.feature_model_repository = FeatureModelRepository()
@@ -69,7 +196,9 @@ class DataSetService(BaseService):
         )
 
         os.makedirs(dest_dir, exist_ok=True)
+        blob_store = self.get_blob_store()
 
+        # Los sidecars columnares se construyen en la etapa de fondo (schedule_statistics), no aquí
         for feature_model in dataset.feature_models:
             filename = feature_model.fm_meta_data.filename
             src_path = os.path.join(source_dir, filename)
@@ -79,11 +208,10 @@ class DataSetService(BaseService):
                 logger.warning(f"Source file not found, skipping move: {src_path}")
                 continue
             try:
-                if os.path.exists(dst_path):
-                    logger.info(f"Destination file {dst_path} exists — removing before move.")
-                    os.remove(dst_path)
-
-                shutil.move(src_path, dst_path)
+                # Re-uploads of an already stored file only cost a new hardlink
+                checksum, _ = calculate_checksum_and_size(src_path)
+                blob_store.ingest(src_path, checksum)
+                blob_store.link(checksum, dst_path)
             except Exception as exc:
                 logger.exception(f"Failed moving file {src_path} to {dst_path}: {exc}")
                 raise
@@ -116,6 +244,8 @@ class DataSetService(BaseService):
         )
 
         os.makedirs(dest_dir, exist_ok=True)
+        blob_store = self.get_blob_store()
+        checksums = {hubfile.name: hubfile.checksum for hubfile in original_dataset.files()}
 
         # Copiar cada feature model
         for original_fm in original_dataset.feature_models:
@@ -151,16 +281,19 @@ class DataSetService(BaseService):
                 db.session.add(new_hubfile)
                 logger.info(f"Copied Hubfile record: {original_hubfile.name} (size: {original_hubfile.size})")
 
-            # Copiar archivo físico
-            src_file = os.path.join(src_dir, original_fm.fm_meta_data.filename)
-            dest_file = os.path.join(dest_dir, original_fm.fm_meta_data.filename)
+            # Enlazar archivo físico: hardlink al blob del original, sin copiar bytes
+            filename = original_fm.fm_meta_data.filename
+            src_file = os.path.join(src_dir, filename)
+            dest_file = os.path.join(dest_dir, filename)
 
             if os.path.exists(src_file):
                 try:
-                    shutil.copy2(src_file, dest_file)
-                    logger.info(f"Copied feature model file: {src_file} -> {dest_file}")
+                    checksum = checksums.get(filename) or calculate_checksum_and_size(src_file)[0]
+                    blob_store.ingest(src_file, checksum, move=False)
+                    blob_store.link(checksum, dest_file)
+                    logger.info(f"Linked feature model file: {src_file} -> {dest_file}")
                 except Exception as exc:
-                    logger.exception(f"Failed copying file {src_file} to {dest_file}: {exc}")
+                    logger.exception(f"Failed linking file {src_file} to {dest_file}: {exc}")
             else:
                 logger.warning(f"Source feature model file not found: {src_file}")
 
@@ -170,6 +303,205 @@ class DataSetService(BaseService):
             + f"from dataset {original_dataset.id} to {new_dataset.id}"
         )
 
+    def on_published(self, dataset: DataSet):
+        """Hook run once a new dataset (or dataset version) has been published."""
+        from app.modules.explore.services import ExploreService
+        from app.modules.public.services import PlatformCountersService
+
+        DOIResolverService.invalidate()
+        PlatformCountersService.invalidate()
+        ExploreService.index_dataset(dataset)
+        self.catalogue_stations(dataset)
+        DataSetSimilarityService().compute_for_dataset(dataset)
+        self.schedule_statistics(dataset)
+
+    def catalogue_stations(self, dataset: DataSet) -> int:
+        """Record the stations and variables found in the dataset CSV headers (only the header line is read)."""
+        from app.modules.hubfile.services import HubfileStationService
+
+        return HubfileStationService().catalogue_dataset(dataset)
+
+    def schedule_statistics(self, dataset: DataSet):
+        """
+        Background stage run after a dataset is created: validates the rows the upload request
+        left unchecked, builds the columnar sidecars and date indexes of its CSVs and computes
+        their zone maps. With ``STATS_ASYNC`` disabled (tests) it runs inline in the
+        current request.
+        """
+        from app.modules.hubfile.services import HubfileStatsService
+
+        if not current_app.config.get("STATS_ASYNC", True):
+            self.validate_remaining_rows(dataset)
+            self.build_columnar_sidecars(dataset)
+            return HubfileStatsService().compute_for_dataset(dataset)
+        return _statistics_executor.submit(
+            _compute_statistics_in_background, current_app._get_current_object(), dataset.id
+        )
+
+    def get_blob_store(self) -> BlobStore:
+        return BlobStore(os.path.join(os.getenv("WORKING_DIR", ""), "uploads", "blobs"))
+
+    def get_columnar_store(self) -> ColumnarStore:
+        return ColumnarStore(os.path.join(os.getenv("WORKING_DIR", ""), "uploads", "columnar"))
+
+    def build_columnar_sidecar(self, csv_path: str, checksum: str) -> Optional[str]:
+        """
+        Make sure the columnar sidecar of a stored CSV exists. It is keyed by checksum, so
+        files shared between versions are converted only once. Failures are logged, not
+        raised: the CSV stays the source of truth and readers build it on first access.
+        """
+        if not csv_path.lower().endswith(".csv"):
+            return None
+        try:
+            return self.get_columnar_store().ensure(csv_path, checksum)
+        except Exception as exc:
+            logger.exception(f"Failed building columnar sidecar for {csv_path}: {exc}")
+            return None
+
+    def build_date_index(self, csv_path: str, checksum: str) -> Optional[str]:
+        """Make sure the date index of a stored CSV exists; same keying and error handling as the sidecar."""
+        if not csv_path.lower().endswith(".csv"):
+            return None
+        try:
+            return self.get_columnar_store().ensure_index(csv_path, checksum)
+        except Exception as exc:
+            logger.exception(f"Failed building date index for {csv_path}: {exc}")
+            return None
+
+    def validate_remaining_rows(self, dataset: DataSet) -> int:
+        """
+        Validate the rows after the first ``CSV_VALIDATION_MAX_ROWS`` of the CSVs the upload
+        request only checked partially (background stage). The outcome is stored on each file:
+        ``rows_validated`` becomes True and ``row_errors`` keeps the problems found, if any.
+        Returns how many files had errors.
+        """
+        skip_rows = current_app.config.get("CSV_VALIDATION_MAX_ROWS", CSV_VALIDATION_MAX_ROWS) or 0
+        dataset_dir = os.path.join(
+            os.getenv("WORKING_DIR", ""),
+            "uploads",
+            f"user_{dataset.user_id}",
+            f"dataset_{dataset.id}",
+        )
+        invalid = 0
+        for hubfile in dataset.files():
+            if hubfile.rows_validated is not False:
+                continue
+            path = os.path.join(dataset_dir, hubfile.name)
+            if not os.path.exists(path):
+                continue
+            headers = _read_csv_headers_try(path)
+            errors = validate_csv_rows(path, headers, numeric_columns_for(headers), skip_rows=skip_rows)
+            hubfile.rows_validated = True
+            hubfile.row_errors = "\n".join(errors) or None
+            if errors:
+                invalid += 1
+                logger.warning(f"Rows of {path} after the first {skip_rows} are not valid: {hubfile.row_errors}")
+        self.repository.session.commit()
+        return invalid
+
+    def build_columnar_sidecars(self, dataset: DataSet) -> int:
+        """
+        Build the sidecar and date index of every CSV in a dataset (background stage).
+        Returns how many sidecars exist.
+        """
+        dataset_dir = os.path.join(
+            os.getenv("WORKING_DIR", ""),
+            "uploads",
+            f"user_{dataset.user_id}",
+            f"dataset_{dataset.id}",
+        )
+        built = 0
+        for hubfile in dataset.files():
+            path = os.path.join(dataset_dir, hubfile.name)
+            if not os.path.exists(path):
+                continue
+            self.build_date_index(path, hubfile.checksum)
+            if self.build_columnar_sidecar(path, hubfile.checksum):
+                built += 1
+        return built
+
+    def aggregate(self, dataset: DataSet, freq: str, aggregations: list, columns: list) -> dict:
+        """
+        Server-side temporal aggregation of every CSV in the dataset. Results are cached per
+        file checksum, so repeated requests for the same series skip the data entirely.
+        """
+        columnar_store = self.get_columnar_store()
+        dataset_dir = os.path.join(
+            os.getenv("WORKING_DIR", ""),
+            "uploads",
+            f"user_{dataset.user_id}",
+            f"dataset_{dataset.id}",
+        )
+
+        files = []
+        for hubfile in dataset.files():
+            path = os.path.join(dataset_dir, hubfile.name)
+            if not hubfile.name.lower().endswith(".csv") or not os.path.exists(path):
+                continue
+
+            def open_columnar(path=path, checksum=hubfile.checksum):
+                return ColumnarFile(columnar_store.ensure(path, checksum))
+
+            result = cached_aggregate(hubfile.checksum, open_columnar, freq, aggregations, columns)
+            files.append({"file_id": hubfile.id, "name": hubfile.name, **result})
+
+        if not files:
+            raise ValueError("The dataset has no CSV data to aggregate")
+        if not any(file["series"] for file in files):
+            raise ValueError(f"None of the requested columns exist: {', '.join(columns)}")
+        return {"dataset_id": dataset.id, "freq": freq, "aggregations": aggregations, "files": files}
+
+    def collect_garbage_if_due(self) -> bool:
+        """
+        Deletes the blobs no dataset links to any more, with their columnar sidecars, when the
+        last collection in this process is older than ``BLOB_GC_INTERVAL_SECONDS``.
+        Called from the background ingestion thread.
+        """
+        interval = current_app.config.get("BLOB_GC_INTERVAL_SECONDS", BLOB_GC_INTERVAL_SECONDS)
+        if interval and time.monotonic() - type(self)._last_gc < interval:
+            return False
+        if not self._gc_lock.acquire(blocking=False):
+            return False
+        try:
+            type(self)._last_gc = time.monotonic()
+            removed = self.get_blob_store().collect_garbage(
+                min_age=BLOB_GC_GRACE_SECONDS, on_remove=self.get_columnar_store().discard
+            )
+            if removed:
+                logger.info(f"Collected {removed} unreferenced blobs")
+        finally:
+            self._gc_lock.release()
+        return True
+
+    def get_archive_cache(self) -> ArchiveCache:
+        directory = current_app.config.get("ARCHIVE_CACHE_DIR") or os.path.join(
+            os.getenv("WORKING_DIR", ""), "uploads", "archive_cache"
+        )
+        return ArchiveCache(directory, current_app.config.get("ARCHIVE_CACHE_MAX_BYTES", 2 * 1024**3))
+
+    def open_download_archive(self, dataset: DataSet):
+        """
+        Returns ``(path, None)`` when the dataset archive is already cached, or
+        ``(None, stream)`` with a generator that streams the ZIP while caching it.
+        The cache key is derived from the Hubfile checksums, so re-downloads of an
+        unchanged dataset hit the same entry and any file change yields a new one.
+        """
+        dataset_dir = os.path.join(
+            os.getenv("WORKING_DIR", ""),
+            "uploads",
+            f"user_{dataset.user_id}",
+            f"dataset_{dataset.id}",
+        )
+        checksums = {file.name: file.checksum for file in dataset.files()}
+        entries = collect_entries(dataset_dir, f"dataset_{dataset.id}", checksums)
+
+        cache = self.get_archive_cache()
+        key = archive_key(entries)
+        cached_path = cache.lookup(key)
+        if cached_path:
+            return cached_path, None
+        return None, cache.stream(key, entries)
+
     def get_synchronized(self, current_user_id: int) -> DataSet:
         return self.repository.get_synchronized(current_user_id)
 
@@ -235,9 +567,10 @@ class DataSetService(BaseService):
 
             file_paths = [os.path.join(current_user.temp_folder(), fn) for fn in uploaded_filenames]
             try:
-                validate_dataset_package(
+                partially_validated = validate_dataset_package(
                     file_paths=file_paths,
                     allow_empty=allow_empty_package,
+                    max_rows=current_app.config.get("CSV_VALIDATION_MAX_ROWS", CSV_VALIDATION_MAX_ROWS) or None,
                 )
             except Exception:
                 self.repository.session.rollback()
@@ -248,8 +581,16 @@ class DataSetService(BaseService):
                 file_path = file_paths[e]
                 checksum, size = calculate_checksum_and_size(file_path)
 
+                rows_validated = None
+                if filename.lower().endswith(".csv"):
+                    rows_validated = file_path not in partially_validated
                 file = self.hubfilerepository.create(
-                    commit=False, name=filename, checksum=checksum, size=size, feature_model_id=fm.id
+                    commit=False,
+                    name=filename,
+                    checksum=checksum,
+                    size=size,
+                    feature_model_id=fm.id,
+                    rows_validated=rows_validated,
                 )
                 fm.files.append(file)
             self.repository.session.commit()
@@ -260,7 +601,11 @@ class DataSetService(BaseService):
         return dataset
 
     def update_dsmetadata(self, id, **kwargs):
-        return self.dsmetadata_repository.update(id, **kwargs)
+        ds_meta_data = self.dsmetadata_repository.update(id, **kwargs)
+        _reindex_if_searchable(id, kwargs)
+        if "dataset_doi" in kwargs:
+            DOIResolverService.invalidate()
+        return ds_meta_data
 
     def get_uvlhub_doi(self, dataset: DataSet) -> str:
         domain = os.getenv("DOMAIN", "localhost")
@@ -380,7 +725,11 @@ class DSMetaDataService(BaseService):
         super().__init__(DSMetaDataRepository())
 
     def update(self, id, **kwargs):
-        return self.repository.update(id, **kwargs)
+        ds_meta_data = self.repository.update(id, **kwargs)
+        _reindex_if_searchable(id, kwargs)
+        if "tags" in kwargs and ds_meta_data is not None and ds_meta_data.data_set is not None:
+            DataSetSimilarityService().compute_for_dataset(ds_meta_data.data_set)
+        return ds_meta_data
 
     def filter_by_doi(self, doi: str) -> Optional[DSMetaData]:
         return self.repository.filter_by_doi(doi)
@@ -404,14 +753,91 @@ class DSViewRecordService(BaseService):
         if not user_cookie:
             user_cookie = str(uuid.uuid4())
 
-        existing_record = self.the_record_exists(dataset=dataset, user_cookie=user_cookie)
-
-        if not existing_record:
-            self.create_new_record(dataset=dataset, user_cookie=user_cookie)
+        # Se encola: la comprobación de duplicados y el INSERT los hace el hilo de ingesta
+        user_id = current_user.id if current_user.is_authenticated else None
+        record_buffer.submit(DATASET_VIEW, user_id, dataset.id, user_cookie)
 
         return user_cookie
 
 
+class DOIResolution(NamedTuple):
+    dataset_id: Optional[int]
+    concept_id: Optional[int]
+    conceptual_doi: Optional[str]
+    latest_id: Optional[int]
+    version_ids: Tuple[int, ...]
+    # DOI antiguo con correspondencia en DOIMapping: sólo se redirige
+    redirect_doi: Optional[str] = None
+
+
+# DOI -> DOIResolution (or None for unknown DOIs). Cleared by every publish path
+doi_cache = TTLCache(ttl=DOI_CACHE_TTL_SECONDS, maxsize=DOI_CACHE_SIZE)
+
+
+class DOIResolverService(BaseService):
+    """
+    Resolves any DOI (conceptual, version or an old mapped one) for the ``/doi/<doi>/``
+    landing page to ids only, so the result can be cached and the page needs a single
+    query to load the versions it shows.
+    """
+
+    def __init__(self):
+        super().__init__(DSMetaDataRepository())
+        self.concept_repository = DataSetConceptRepository()
+        self.doi_mapping_repository = DOIMappingRepository()
+
+    @staticmethod
+    def invalidate() -> None:
+        doi_cache.clear()
+
+    def resolve(self, doi: str) -> Optional[DOIResolution]:
+        ttl = current_app.config.get("DOI_CACHE_TTL", DOI_CACHE_TTL_SECONDS)
+        if ttl > 0:
+            cached = doi_cache.get(doi, ttl=ttl)
+            if cached is not None:
+                return cached or None
+        resolution = self._resolve(doi)
+        if ttl > 0:
+            # Las DOI desconocidas también se cachean (como False) para no repetir las consultas
+            doi_cache.put(doi, resolution or False)
+        return resolution
+
+    def _resolve(self, doi: str) -> Optional[DOIResolution]:
+        mapping = self.doi_mapping_repository.get_new_doi(doi)
+        if mapping and mapping.dataset_doi_new:
+            return DOIResolution(None, None, None, None, (), redirect_doi=mapping.dataset_doi_new)
+
+        concept = self.concept_repository.ds_concept_by_conceptual_doi(doi)
+        if concept is not None:
+            concept_id, conceptual_doi, dataset_id = concept.id, concept.conceptual_doi, None
+        else:
+            row = self.repository.latest_dataset_by_doi(doi)
+            if row is None or row.ds_concept_id is None:
+                return None
+            concept_id, conceptual_doi, dataset_id = row.ds_concept_id, row.conceptual_doi, row.id
+
+        version_ids = tuple(self.concept_repository.version_ids(concept_id))
+        if not version_ids:
+            return None
+        return DOIResolution(
+            dataset_id=dataset_id if dataset_id is not None else version_ids[0],
+            concept_id=concept_id,
+            conceptual_doi=conceptual_doi,
+            latest_id=version_ids[0],
+            version_ids=version_ids,
+        )
+
+    def load_versions(self, resolution: DOIResolution) -> List[DataSet]:
+        """Every version of the resolved concept, newest first, with their metadata, in one query."""
+        datasets = {
+            dataset.id: dataset
+            for dataset in DataSet.query.options(selectinload(DataSet.ds_meta_data))
+            .filter(DataSet.id.in_(resolution.version_ids))
+            .all()
+        }
+        return [datasets[dataset_id] for dataset_id in resolution.version_ids if dataset_id in datasets]
+
+
 class DOIMappingService(BaseService):
     def __init__(self):
         super().__init__(DOIMappingRepository())
@@ -424,6 +850,354 @@ class DOIMappingService(BaseService):
             return None
 
 
+class DataSetSimilarityService(BaseService):
+    """
+    "Similar datasets" panel. A MinHash signature of each dataset's extra column headers, stations,
+    tags and authors is stored at publish time together with its LSH band buckets, so the panel
+    is a bucket lookup plus a few signature comparisons instead of a catalogue scan.
+    """
+
+    def __init__(self):
+        super().__init__(DataSetSignatureRepository())
+
+    def features(self, dataset: DataSet) -> set:
+        from app.modules.hubfile.services import HubfileService
+
+        headers = []
+        hubfile_service = HubfileService()
+        for hubfile in dataset.files():
+            if not hubfile.name.lower().endswith(".csv"):
+                continue
+            path = hubfile_service.get_path_by_hubfile(hubfile)
+            if os.path.exists(path):
+                headers.extend(_read_csv_headers_try(path))
+        meta = dataset.ds_meta_data
+        return dataset_features(
+            headers,
+            (station for station, _, _ in extract_station_columns(headers)),
+            split_tags(meta.tags),
+            (author.name for author in meta.authors),
+        )
+
+    def compute_for_dataset(self, dataset: DataSet):
+        """(Re)compute and store the signature of a dataset. Failures are logged, never raised."""
+        try:
+            features = self.features(dataset)
+            signature = minhash(features)
+            if signature is None:
+                return None
+            return self.repository.replace(dataset.id, signature, len(features), band_buckets(signature))
+        except Exception as exc:
+            self.repository.session.rollback()
+            logger.exception(f"Failed computing the similarity signature of dataset {dataset.id}: {exc}")
+            return None
+
+    def similar(self, dataset: DataSet, limit: int = SIMILAR_DATASETS_LIMIT) -> List[Tuple[DataSet, float]]:
+        """Most similar latest datasets of other concepts, as ``(dataset, estimated Jaccard)``."""
+        record = self.repository.get_by_dataset(dataset.id)
+        if record is None:
+            # Las firmas solo se calculan al publicar o editar etiquetas, nunca durante un GET
+            return []
+
+        scored = []
+        for candidate_id, signature in self.repository.candidates(dataset.id, dataset.ds_concept_id):
+            score = estimate_similarity(record.signature, signature)
+            if score >= SIMILARITY_THRESHOLD:
+                scored.append((score, candidate_id))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        scored = scored[:limit]
+        if not scored:
+            return []
+
+        datasets = {
+            ds.id: ds
+            for ds in DataSet.query.options(selectinload(DataSet.ds_meta_data))
+            .filter(DataSet.id.in_([candidate_id for _, candidate_id in scored]))
+            .all()
+        }
+        return [(datasets[candidate_id], score) for score, candidate_id in scored if candidate_id in datasets]
+
+
+def encode_resumption_token(start, until, last) -> str:
+    """Opaque token carrying the harvest window and the ``(updated_at, id)`` of the last record sent."""
+    raw = json.dumps(
+        {
+            "from": start.isoformat() if start else None,
+            "until": until.isoformat() if until else None,
+            "after": [last.ds_meta_data.updated_at.isoformat(), last.id],
+        }
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_resumption_token(token: str):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8"))
+        start = datetime.fromisoformat(raw["from"]) if raw["from"] else None
+        until = datetime.fromisoformat(raw["until"]) if raw["until"] else None
+        updated_at, last_id = raw["after"]
+        return start, until, (datetime.fromisoformat(updated_at), int(last_id))
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid resumption token") from exc
+
+
+def parse_harvest_timestamp(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """
+    ``from`` / ``until`` as an ISO date or datetime; aware values are converted to naive UTC.
+    A bare ``until`` date covers that whole day.
+    """
+    if not value:
+        return None
+    # Un '+' sin escapar en la query string llega como espacio (p.ej. '...T10:00:00 01:00')
+    text = value.strip().replace(" ", "+")
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError as exc:
+        raise ValueError(f"Invalid timestamp '{value}', expected ISO 8601") from exc
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_day and len(text) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed
+
+
+class DataSetHarvestService(BaseService):
+    """
+    Incremental metadata export for mirrors. Records are ``DataSet.to_dict`` plus
+    ``modified_at``, ordered by last modification, either one resumable page at a time or
+    streamed whole; each page (or stream batch) is a single eager-loaded query.
+    """
+
+    def __init__(self):
+        super().__init__(DataSetHarvestRepository())
+
+    @staticmethod
+    def record(dataset: DataSet) -> dict:
+        record = dataset.to_dict()
+        record["created_at"] = dataset.created_at.isoformat()
+        record["modified_at"] = dataset.ds_meta_data.updated_at.isoformat()
+        return record
+
+    def page(self, start=None, until=None, token: Optional[str] = None, limit: int = HARVEST_PAGE_SIZE):
+        """Returns ``(records, resumption_token)``; the token is None on the last page."""
+        after = None
+        if token:
+            # El token fija la ventana de la primera petición
+            start, until, after = decode_resumption_token(token)
+        if start and until and start > until:
+            raise ValueError("'from' must not be later than 'until'")
+        datasets = self.repository.harvest_query(start, until, after).limit(limit + 1).all()
+        has_more = len(datasets) > limit
+        datasets = datasets[:limit]
+        next_token = encode_resumption_token(start, until, datasets[-1]) if has_more else None
+        return [self.record(dataset) for dataset in datasets], next_token
+
+    def stream(self, start=None, until=None, batch_size: int = HARVEST_PAGE_SIZE):
+        """Every record of the window, read ``batch_size`` rows (and their relations) at a time."""
+        if start and until and start > until:
+            raise ValueError("'from' must not be later than 'until'")
+        for dataset in self.repository.harvest_query(start, until).yield_per(batch_size):
+            yield self.record(dataset)
+
+
+ROLLUP_INTERVAL_SECONDS = 300
+ROLLUP_BATCH_ROWS = 50000
+ROLLUP_SETTLE_SECONDS = 120
+TRENDING_DAYS = 14
+TRENDING_HALF_LIFE_DAYS = 3.0
+TRENDING_LIMIT = 10
+SPARKLINE_DAYS = 30
+TRENDING_CACHE_TTL_SECONDS = 60
+# Candidatos que se cargan por cada puesto pedido: los no publicados (sin DOI) se saltan
+TRENDING_OVERFETCH = 4
+# Peso de cada tipo de registro en la puntuación de trending: una descarga vale más que una visita
+TRENDING_WEIGHTS = {DATASET_VIEW: 1.0, DATASET_DOWNLOAD: 3.0}
+
+
+# (days, limit) -> trending feed. Cleared by every rollup run in this process
+trending_cache = TTLCache(ttl=TRENDING_CACHE_TTL_SECONDS, maxsize=64)
+
+
+class RecordRollupService(BaseService):
+    """
+    Per-day, per-object counts of the raw view / download records (``RecordDailyRollup``),
+    and the trending feed and activity sparklines served from them. Each run only reads the
+    records past the high-water mark of their table. Runs belong to the background ingestion
+    thread (``RecordBuffer._roll_up``); requests only read the rollups.
+    """
+
+    _run_lock = threading.Lock()
+    _last_run = 0.0
+
+    def __init__(self):
+        super().__init__(RecordRollupRepository())
+
+    def run(self, max_rows: Optional[int] = None) -> dict:
+        """Rolls up every new record, ``max_rows`` ids per transaction; returns the records added per kind."""
+        max_rows = max_rows or current_app.config.get("ROLLUP_BATCH_ROWS", ROLLUP_BATCH_ROWS)
+        settle = timedelta(seconds=current_app.config.get("ROLLUP_SETTLE_SECONDS", ROLLUP_SETTLE_SECONDS))
+        added = {}
+        for kind, table in RECORD_TABLES.items():
+            while True:
+                try:
+                    state = self.repository.lock_state(kind)
+                    now = datetime.now(timezone.utc).replace(tzinfo=None)
+                    after_id = state.last_record_id
+                    if state.observed_record_id <= after_id:
+                        # Cada proceso inserta por lotes en paralelo: un id menor que el máximo visible
+                        # puede confirmarse después, así que solo se agrega hasta el máximo visto hace
+                        # al menos ROLLUP_SETTLE_SECONDS
+                        max_id = self.repository.max_record_id(table)
+                        if max_id > after_id:
+                            state.observed_record_id, state.observed_at = max_id, now
+                    settled = state.observed_at is not None and now - state.observed_at >= settle
+                    upto_id = min(state.observed_record_id, after_id + max_rows) if settled else after_id
+                    if upto_id > after_id:
+                        counts, sketches = defaultdict(int), {}
+                        for object_id, day, user_id, cookie, count in self.repository.aggregate(
+                            table, after_id, upto_id
+                        ):
+                            counts[(object_id, day)] += count
+                            sketch = sketches.get((object_id, day))
+                            if sketch is None:
+                                sketch = sketches[(object_id, day)] = HyperLogLog()
+                            sketch.add(visitor_key(user_id, cookie))
+                        self.repository.merge(kind, [(object_id, day, n) for (object_id, day), n in counts.items()])
+                        self.repository.merge_sketches(kind, sketches)
+                        added[kind] = added.get(kind, 0) + sum(counts.values())
+                        state.last_record_id = upto_id
+                    state.rolled_up_at = datetime.now(timezone.utc).replace(tzinfo=None)
+                    self.repository.session.commit()
+                except Exception:
+                    self.repository.session.rollback()
+                    raise
+                if upto_id - after_id < max_rows:
+                    break
+        type(self)._last_run = time.monotonic()
+        trending_cache.clear()
+        return added
+
+    def prune(self) -> dict:
+        """
+        Deletes raw records older than ``RECORDS_RETENTION_DAYS`` (0 keeps them forever). Only
+        rows below the settled high-water mark are deleted, so counts and unique visitors survive
+        in the rollups; the row at the mark is kept so its id is never reused.
+        """
+        retention = current_app.config.get("RECORDS_RETENTION_DAYS", 0)
+        if not retention:
+            return {}
+        before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=retention)
+        states = self.repository.states()
+        pruned = {}
+        try:
+            for kind, table in RECORD_TABLES.items():
+                state = states.get(kind)
+                if state is not None and state.last_record_id:
+                    pruned[kind] = self.repository.prune(table, before, state.last_record_id)
+            self.repository.session.commit()
+        except Exception:
+            self.repository.session.rollback()
+            raise
+        return pruned
+
+    def run_if_due(self) -> bool:
+        """
+        Runs the rollup, then the retention prune, when the last run in this process is older than
+        ``ROLLUP_INTERVAL_SECONDS``. Called from the background ingestion thread.
+        """
+        interval = current_app.config.get("ROLLUP_INTERVAL_SECONDS", ROLLUP_INTERVAL_SECONDS)
+        if interval and time.monotonic() - type(self)._last_run < interval:
+            return False
+        if not self._run_lock.acquire(blocking=False):
+            return False
+        try:
+            self.run()
+            self.prune()
+        finally:
+            self._run_lock.release()
+        return True
+
+    @staticmethod
+    def _window(days: int) -> Tuple[date, date]:
+        today = datetime.now(timezone.utc).date()
+        return today - timedelta(days=days - 1), today
+
+    def trending(self, days: int = TRENDING_DAYS, limit: int = TRENDING_LIMIT) -> List[dict]:
+        """
+        Synchronized datasets ranked by their weighted views and downloads of the last ``days``
+        days, each day decayed by half every ``TRENDING_HALF_LIFE_DAYS``. Cached per
+        ``(days, limit)`` until the next rollup run or ``TRENDING_CACHE_TTL``.
+        """
+        ttl = current_app.config.get("TRENDING_CACHE_TTL", TRENDING_CACHE_TTL_SECONDS)
+        cached = trending_cache.get((days, limit), ttl=ttl) if ttl > 0 else None
+        if cached is not None:
+            return cached
+
+        since, today = self._window(days)
+        half_life = current_app.config.get("TRENDING_HALF_LIFE_DAYS", TRENDING_HALF_LIFE_DAYS)
+        scores = defaultdict(float)
+        totals = defaultdict(lambda: dict.fromkeys(TRENDING_WEIGHTS, 0))
+        for kind, object_id, day, count in self.repository.daily_counts(TRENDING_WEIGHTS, since):
+            scores[object_id] += TRENDING_WEIGHTS[kind] * count * 0.5 ** ((today - day).days / half_life)
+            totals[object_id][kind] += count
+
+        ranked = sorted(scores, key=lambda object_id: (-scores[object_id], object_id))
+        trending = []
+        chunk = limit * TRENDING_OVERFETCH
+        for start in range(0, len(ranked), chunk):
+            candidates = ranked[start : start + chunk]
+            datasets = {
+                dataset.id: dataset
+                for dataset in DataSet.query.join(DataSet.ds_meta_data)
+                .options(selectinload(DataSet.ds_meta_data))
+                .filter(DataSet.id.in_(candidates), DSMetaData.dataset_doi.isnot(None))
+            }
+            for dataset_id in candidates:
+                dataset = datasets.get(dataset_id)
+                if dataset is None:
+                    continue
+                trending.append(
+                    {
+                        "id": dataset.id,
+                        "title": dataset.ds_meta_data.title,
+                        "url": dataset.get_uvlhub_doi(),
+                        "score": round(scores[dataset_id], 4),
+                        "views": totals[dataset_id][DATASET_VIEW],
+                        "downloads": totals[dataset_id][DATASET_DOWNLOAD],
+                    }
+                )
+                if len(trending) >= limit:
+                    break
+            if len(trending) >= limit:
+                break
+
+        if ttl > 0:
+            trending_cache.put((days, limit), trending)
+        return trending
+
+    def unique_visitors(self, dataset_id: int, days: int = SPARKLINE_DAYS) -> dict:
+        """Estimated distinct viewers and downloaders of a dataset over the last ``days`` days."""
+        since, _ = self._window(days)
+        return {
+            label: HyperLogLog.union(
+                HyperLogLog.from_bytes(registers) for registers in self.repository.sketches(kind, dataset_id, since)
+            ).count()
+            for label, kind in (("views", DATASET_VIEW), ("downloads", DATASET_DOWNLOAD))
+        }
+
+    def sparkline(self, dataset_id: int, days: int = SPARKLINE_DAYS) -> dict:
+        """Daily views and downloads of a dataset over the last ``days`` days, oldest first, zero-filled."""
+        since, _ = self._window(days)
+        series = {kind: [0] * days for kind in (DATASET_VIEW, DATASET_DOWNLOAD)}
+        for kind, _, day, count in self.repository.daily_counts(series, since, object_ids=[dataset_id]):
+            series[kind][(day - since).days] += count
+        return {
+            "days": [(since + timedelta(days=offset)).isoformat() for offset in range(days)],
+            "views": series[DATASET_VIEW],
+            "downloads": series[DATASET_DOWNLOAD],
+        }
+
+
 class SizeService:
     def __init__(self):
         pass
@@ -0,0 +1,85 @@
+# app/modules/dataset/similarity.py
+import hashlib
+import random
+from array import array
+from typing import Iterable, List, Optional, Set, Tuple
+
+from app.modules.dataset.models import normalize_tag
+from app.modules.dataset.validator import REQUIRED_COLUMNS, _find_date_column, _match_required_in_headers
+
+# 64 permutaciones en 16 bandas de 4 filas: dos datasets comparten algún bucket con
+# probabilidad 1 - (1 - J^4)^16, ~0.65 con Jaccard 0.4 y >0.96 a partir de 0.6
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: signatures stored in the database must stay comparable across processes and releases
+_rng = random.Random(20261017)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def _hash64(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def extra_columns(headers: List[str]) -> List[str]:
+    """
+    Headers beyond what every dataset must have: the validator requires a date column and all
+    REQUIRED_COLUMNS, so those would be shared by the whole catalogue and tell nothing apart.
+    """
+    common: Set[str] = set()
+    for required in REQUIRED_COLUMNS:
+        common.update(_match_required_in_headers(required, headers))
+    date_index = _find_date_column(headers)
+    return [h for i, h in enumerate(headers) if h not in common and i != date_index]
+
+
+def dataset_features(headers: Iterable[str], stations: Iterable[str], tags: Iterable[str], authors: Iterable[str]):
+    """
+    Prefixed feature set of a dataset, so a tag and a column with the same name stay different
+    features. Only the extra columns of ``headers`` count (see ``extra_columns``).
+    """
+    features: Set[str] = set()
+    headers = [h for h in headers if h and h.strip()]
+    features.update(f"column:{h.strip().lower()}" for h in extra_columns(headers))
+    features.update(f"station:{s.strip().upper()}" for s in stations if s and s.strip())
+    features.update(f"tag:{normalize_tag(t)}" for t in tags if t and t.strip())
+    features.update(f"author:{' '.join(a.split()).lower()}" for a in authors if a and a.strip())
+    return features
+
+
+def minhash(features: Iterable[str]) -> Optional[bytes]:
+    """
+    MinHash signature of a feature set: for each of the ``NUM_PERM`` universal hash
+    functions, the minimum 32-bit hash over the features. Returned packed as
+    ``NUM_PERM`` unsigned ints (256 bytes), or None for an empty set.
+    """
+    hashes = [_hash64(feature) for feature in set(features)]
+    if not hashes:
+        return None
+    signature = array("I", (min(((a * x + b) % _PRIME) & _MAX_HASH for x in hashes) for a, b in _PERMUTATIONS))
+    return signature.tobytes()
+
+
+def unpack(signature: bytes) -> array:
+    values = array("I")
+    values.frombytes(signature)
+    return values
+
+
+def band_buckets(signature: bytes) -> List[Tuple[int, int]]:
+    """``(band, bucket)`` keys of a signature: each band of rows hashed to a signed 64-bit integer."""
+    buckets = []
+    step = ROWS_PER_BAND * 4
+    for band in range(BANDS):
+        digest = hashlib.blake2b(signature[band * step : (band + 1) * step], digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+    return buckets
+
+
+def estimate_similarity(signature_a: bytes, signature_b: bytes) -> float:
+    """Estimated Jaccard similarity: the fraction of permutations on which both minimums agree."""
+    a, b = unpack(signature_a), unpack(signature_b)
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
@@ -2,7 +2,10 @@
 Tests for Dataset Routes
 """
 
+import errno
+import hashlib
 import os
+import time
 from io import BytesIO
 from unittest.mock import MagicMock, patch
 
@@ -11,6 +14,7 @@ import pytest
 from app import db
 from app.modules.auth.models import User
 from app.modules.conftest import login, logout
+from app.modules.dataset.chunked_upload import ChunkedUpload
 from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
 from app.modules.profile.models import UserProfile  # Necesario para arreglar el error
 
@@ -354,6 +358,90 @@ class TestDatasetDownload:
         # Verificamos que funciona (200 OK)
         assert response.status_code == 200
 
+    def test_download_dataset_served_from_cache(self, test_client, sample_dataset, tmp_path):
+        """Second download of an unchanged dataset is served from the archive cache"""
+        dataset_dir = os.path.join(
+            os.getenv("WORKING_DIR", ""), "uploads", f"user_{sample_dataset.user_id}", f"dataset_{sample_dataset.id}"
+        )
+        os.makedirs(dataset_dir, exist_ok=True)
+        with open(os.path.join(dataset_dir, "data.csv"), "w") as f:
+            f.write("DATE,_temp_mean\n2023-01-01,10\n")
+
+        test_client.application.config["ARCHIVE_CACHE_DIR"] = str(tmp_path)
+        try:
+            first = test_client.get(f"/dataset/download/{sample_dataset.id}")
+            assert first.status_code == 200
+            assert first.is_streamed
+            assert len(os.listdir(tmp_path)) == 1
+
+            second = test_client.get(f"/dataset/download/{sample_dataset.id}")
+            assert second.status_code == 200
+            assert second.data == first.data
+        finally:
+            test_client.application.config["ARCHIVE_CACHE_DIR"] = None
+
+
+class TestDatasetAggregate:
+    """Tests for /dataset/<id>/aggregate"""
+
+    def _add_csv(self, dataset, working_dir, content: bytes):
+        from app.modules.featuremodel.models import FeatureModel, FMMetaData
+        from app.modules.hubfile.models import Hubfile
+
+        fm_meta = FMMetaData(
+            filename="daily.csv", title="Daily", description="Daily data", publication_type=PublicationType.NONE
+        )
+        db.session.add(fm_meta)
+        db.session.flush()
+        fm = FeatureModel(data_set_id=dataset.id, fm_meta_data_id=fm_meta.id)
+        db.session.add(fm)
+        db.session.flush()
+        db.session.add(
+            Hubfile(
+                name="daily.csv",
+                checksum=hashlib.sha256(content).hexdigest(),
+                size=len(content),
+                feature_model_id=fm.id,
+            )
+        )
+        db.session.commit()
+
+        dataset_dir = working_dir / "uploads" / f"user_{dataset.user_id}" / f"dataset_{dataset.id}"
+        dataset_dir.mkdir(parents=True)
+        (dataset_dir / "daily.csv").write_bytes(content)
+
+    def test_aggregate_monthly_means(self, test_client, sample_dataset, tmp_path):
+        """Test monthly aggregation of a dataset CSV"""
+        content = b"DATE,BASEL_temp_mean,BASEL_precipitation\n2012-01-01,1,2\n2012-01-02,3,NA\n2012-02-01,5,1\n"
+        self._add_csv(sample_dataset, tmp_path, content)
+
+        with patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+            response = test_client.get(
+                f"/dataset/{sample_dataset.id}/aggregate?freq=month&agg=mean,max&columns=_temp_mean,_precipitation"
+            )
+
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert payload["freq"] == "month"
+        (file_result,) = payload["files"]
+        assert file_result["periods"] == ["2012-01", "2012-02"]
+        assert file_result["series"]["_temp_mean"] == {"mean": [2.0, 5.0], "max": [3.0, 5.0]}
+        assert file_result["series"]["_precipitation"]["mean"] == [2.0, 1.0]
+
+    def test_aggregate_invalid_frequency(self, test_client, sample_dataset, tmp_path):
+        """Test that unsupported frequencies are rejected"""
+        self._add_csv(sample_dataset, tmp_path, b"DATE,BASEL_temp_mean\n2012-01-01,1\n")
+
+        with patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+            response = test_client.get(f"/dataset/{sample_dataset.id}/aggregate?freq=hour")
+
+        assert response.status_code == 400
+
+    def test_aggregate_dataset_without_csv(self, test_client, sample_dataset):
+        """Test that a dataset without CSV files cannot be aggregated"""
+        response = test_client.get(f"/dataset/{sample_dataset.id}/aggregate")
+        assert response.status_code == 400
+
 
 class TestDatasetSearch:
     """Tests for /dataset/search"""
@@ -409,6 +497,140 @@ class TestFileUpload:
         logout(test_client)
 
 
+class TestChunkedUpload:
+    """Tests for /dataset/file/upload/session"""
+
+    CONTENT = b"DATE,_temp_mean\n" + b"2023-01-01,10\n" * 50
+
+    def _start(self, test_client, **extra):
+        payload = {"filename": "chunked.csv", "size": len(self.CONTENT), **extra}
+        response = test_client.post("/dataset/file/upload/session", json=payload)
+        assert response.status_code == 201
+        return response.get_json()["upload_id"]
+
+    def _put(self, test_client, upload_id, start, stop):
+        return test_client.put(
+            f"/dataset/file/upload/session/{upload_id}",
+            data=self.CONTENT[start:stop],
+            headers={"Content-Range": f"bytes {start}-{stop - 1}/{len(self.CONTENT)}"},
+        )
+
+    def test_chunked_upload_out_of_order(self, test_client, sample_user):
+        """Chunks sent in any order are assembled and verified on finalize"""
+        login(test_client, "test@example.com", "test1234")
+        checksum = hashlib.sha256(self.CONTENT).hexdigest()
+        upload_id = self._start(test_client, checksum=checksum)
+
+        middle = len(self.CONTENT) // 2
+        assert self._put(test_client, upload_id, middle, len(self.CONTENT)).status_code == 200
+
+        status = test_client.get(f"/dataset/file/upload/session/{upload_id}").get_json()
+        assert status["received"] == [[middle, len(self.CONTENT)]]
+        assert status["complete"] is False
+        assert test_client.post(f"/dataset/file/upload/session/{upload_id}/finalize").status_code == 400
+
+        assert self._put(test_client, upload_id, 0, middle).status_code == 200
+        response = test_client.post(f"/dataset/file/upload/session/{upload_id}/finalize")
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["checksum"] == checksum
+        with open(os.path.join(sample_user.temp_folder(), data["filename"]), "rb") as f:
+            assert f.read() == self.CONTENT
+        logout(test_client)
+
+    def test_chunked_upload_checksum_mismatch(self, test_client):
+        """A checksum mismatch discards the session"""
+        login(test_client, "test@example.com", "test1234")
+        upload_id = self._start(test_client, checksum="0" * 64)
+        self._put(test_client, upload_id, 0, len(self.CONTENT))
+
+        response = test_client.post(f"/dataset/file/upload/session/{upload_id}/finalize")
+
+        assert response.status_code == 400
+        assert "Checksum mismatch" in response.get_json()["message"]
+        assert test_client.get(f"/dataset/file/upload/session/{upload_id}").status_code == 404
+        logout(test_client)
+
+    def test_chunked_upload_rejects_invalid_range(self, test_client):
+        """Chunks without a valid Content-Range header are rejected"""
+        login(test_client, "test@example.com", "test1234")
+        upload_id = self._start(test_client)
+
+        response = test_client.put(f"/dataset/file/upload/session/{upload_id}", data=b"abc")
+
+        assert response.status_code == 400
+        logout(test_client)
+
+    def test_chunked_upload_invalid_file_type(self, test_client):
+        """Sessions can only be opened for allowed extensions"""
+        login(test_client, "test@example.com", "test1234")
+        response = test_client.post("/dataset/file/upload/session", json={"filename": "test.exe", "size": 3})
+        assert response.status_code == 400
+        logout(test_client)
+
+    def test_chunked_upload_rejects_oversized_file(self, test_client):
+        """Declared sizes above UPLOAD_MAX_BYTES are rejected before reserving any disk"""
+        login(test_client, "test@example.com", "test1234")
+        max_bytes = test_client.application.config["UPLOAD_MAX_BYTES"]
+
+        response = test_client.post("/dataset/file/upload/session", json={"filename": "big.csv", "size": max_bytes + 1})
+
+        assert response.status_code == 413
+        logout(test_client)
+
+    def test_chunked_upload_limits_pending_bytes(self, test_client, sample_user):
+        """Open sessions of a user cannot reserve more than UPLOAD_MAX_PENDING_BYTES together"""
+        login(test_client, "test@example.com", "test1234")
+        config = test_client.application.config
+        previous = config["UPLOAD_MAX_PENDING_BYTES"]
+        for upload_session in ChunkedUpload.open_sessions(sample_user.temp_folder()):
+            upload_session.discard()
+        config["UPLOAD_MAX_PENDING_BYTES"] = len(self.CONTENT) * 2
+        try:
+            self._start(test_client)
+            self._start(test_client)
+            response = test_client.post(
+                "/dataset/file/upload/session", json={"filename": "chunked.csv", "size": len(self.CONTENT)}
+            )
+        finally:
+            config["UPLOAD_MAX_PENDING_BYTES"] = previous
+
+        assert response.status_code == 507
+        logout(test_client)
+
+    def test_chunked_upload_out_of_space(self, test_client, sample_user):
+        """A failed disk reservation answers 507 and leaves no partial session behind"""
+        login(test_client, "test@example.com", "test1234")
+        sessions_dir = os.path.join(sample_user.temp_folder(), ".chunked")
+        before = set(os.listdir(sessions_dir)) if os.path.isdir(sessions_dir) else set()
+
+        with patch("os.posix_fallocate", side_effect=OSError(errno.ENOSPC, "No space left on device"), create=True):
+            with patch("os.ftruncate", side_effect=OSError(errno.ENOSPC, "No space left on device")):
+                response = test_client.post(
+                    "/dataset/file/upload/session", json={"filename": "chunked.csv", "size": len(self.CONTENT)}
+                )
+
+        assert response.status_code == 507
+        assert set(os.listdir(sessions_dir)) == before
+        logout(test_client)
+
+    def test_chunked_upload_stale_session_expires(self, test_client, sample_user):
+        """Sessions idle for longer than UPLOAD_SESSION_TTL_SECONDS are discarded"""
+        login(test_client, "test@example.com", "test1234")
+        upload_id = self._start(test_client)
+        upload_session = ChunkedUpload.load(sample_user.temp_folder(), upload_id)
+        stale = time.time() - test_client.application.config["UPLOAD_SESSION_TTL_SECONDS"] - 60
+        for path in (upload_session.meta_path, upload_session.ranges_path):
+            os.utime(path, (stale, stale))
+
+        self._start(test_client)
+
+        assert not os.path.exists(upload_session.part_path)
+        assert test_client.get(f"/dataset/file/upload/session/{upload_id}").status_code == 404
+        logout(test_client)
+
+
 class TestFileDelete:
     """Tests for /dataset/file/delete"""
 
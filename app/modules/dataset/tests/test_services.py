@@ -1,6 +1,8 @@
+import hashlib
 import os
 import tempfile
 import uuid
+from io import BytesIO
 from unittest.mock import Mock, patch
 
 import pytest
@@ -24,6 +26,8 @@ from app.modules.dataset.services import (
     DSViewRecordService,
     SizeService,
     calculate_checksum_and_size,
+    checksum_path,
+    save_with_checksum,
 )
 from app.modules.featuremodel.models import FeatureModel, FMMetaData
 from app.modules.profile.models import UserProfile
@@ -116,6 +120,34 @@ def test_calculate_checksum_and_size():
         os.unlink(tmp_file_path)
 
 
+def test_save_with_checksum_stores_sidecar(tmp_path):
+    """Checksum computed while saving matches a full read and is reused later."""
+    content = b"DATE,_temp_mean\n2023-01-01,10\n" * 100
+    file_path = str(tmp_path / "data.csv")
+
+    checksum, size = save_with_checksum(BytesIO(content), file_path, chunk_size=7)
+
+    assert size == len(content)
+    assert checksum == hashlib.sha256(content).hexdigest()
+    assert os.path.exists(checksum_path(file_path))
+    with patch("builtins.open", wraps=open) as mock_open:
+        assert calculate_checksum_and_size(file_path) == (checksum, size)
+    assert all(call.args[0] != file_path for call in mock_open.call_args_list)
+
+
+def test_calculate_checksum_ignores_stale_sidecar(tmp_path):
+    """A sidecar that no longer matches the file is ignored."""
+    file_path = str(tmp_path / "data.csv")
+    save_with_checksum(BytesIO(b"original"), file_path)
+    with open(file_path, "wb") as fh:
+        fh.write(b"changed content")
+
+    checksum, size = calculate_checksum_and_size(file_path)
+
+    assert checksum == hashlib.sha256(b"changed content").hexdigest()
+    assert size == len(b"changed content")
+
+
 # DataSetService Tests
 class TestDataSetService:
     @pytest.fixture
@@ -427,39 +459,121 @@ class TestDataSetService:
         # Should strip v prefix and validate
         assert is_valid is True or is_valid is False
 
-    @patch("app.modules.dataset.services.os.remove")
-    @patch("app.modules.dataset.services.os.path.exists")
-    @patch("app.modules.dataset.services.shutil.move")
-    @patch("app.modules.dataset.services.os.makedirs")
     @patch("app.modules.dataset.services.AuthenticationService")
     def test_move_feature_models_success(
         self,
         mock_auth_service,
-        mock_makedirs,
-        mock_move,
-        mock_exists,
-        mock_remove,
         test_app,
         dataset_service,
         dataset_with_feature_models,
+        tmp_path,
     ):
-        """Test moving feature models successfully."""
-        with test_app.app_context():
-            # Mock authenticated user
+        """Test moving feature models into the blob store and linking them into the dataset folder."""
+        with test_app.app_context(), patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+            temp_folder = tmp_path / "temp"
+            temp_folder.mkdir()
+            (temp_folder / "test_model.uvl").write_text("features")
+
             mock_user = Mock()
             mock_user.id = 1
-            mock_user.temp_folder.return_value = "/tmp/test"
+            mock_user.temp_folder.return_value = str(temp_folder)
             mock_auth_service.return_value.get_authenticated_user.return_value = mock_user
 
-            # Mock file exists - return True first time, False second time
-            mock_exists.side_effect = [True, False]
-
             dataset = DataSet.query.get(dataset_with_feature_models.id)
 
             dataset_service.move_feature_models(dataset)
 
-            # Verify makedirs was called
-            mock_makedirs.assert_called()
+            dst_path = tmp_path / "uploads" / "user_1" / f"dataset_{dataset.id}" / "test_model.uvl"
+            checksum = hashlib.sha256(b"features").hexdigest()
+            blob_store = dataset_service.get_blob_store()
+            assert not (temp_folder / "test_model.uvl").exists()
+            assert dst_path.read_text() == "features"
+            assert os.path.samefile(dst_path, blob_store.blob_path(checksum))
+            assert blob_store.refcount(checksum) == 1
+
+    def test_build_columnar_sidecar_only_for_csv(self, test_app, dataset_service, tmp_path):
+        """Test that CSVs get a columnar sidecar keyed by checksum and other files are skipped."""
+        with test_app.app_context(), patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+            csv_file = tmp_path / "data.csv"
+            csv_file.write_text("DATE,_temp_mean\n2020-01-01,1.5\n2020-01-02,2.5\n")
+            readme = tmp_path / "README.md"
+            readme.write_text("readme")
+            checksum = hashlib.sha256(csv_file.read_bytes()).hexdigest()
+
+            sidecar = dataset_service.build_columnar_sidecar(str(csv_file), checksum)
+
+            assert sidecar == dataset_service.get_columnar_store().path_for(checksum)
+            assert os.path.isfile(sidecar)
+            assert dataset_service.build_columnar_sidecar(str(readme), "0" * 64) is None
+
+    def test_schedule_statistics_builds_sidecars_and_indexes_in_the_background_stage(
+        self, test_app, dataset_service, tmp_path
+    ):
+        """Sidecars and date indexes are not built when files are moved but in the stage scheduled on publish."""
+        with test_app.app_context(), patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+            content = b"DATE,_temp_mean\n2020-01-01,1.5\n"
+            folder = tmp_path / "uploads" / "user_7" / "dataset_9"
+            folder.mkdir(parents=True)
+            (folder / "data.csv").write_bytes(content)
+            checksum = hashlib.sha256(content).hexdigest()
+            dataset = Mock(id=9, user_id=7)
+            dataset.files.return_value = [Mock(checksum=checksum), Mock(checksum="0" * 64)]
+            dataset.files.return_value[0].name = "data.csv"
+            dataset.files.return_value[1].name = "README.md"
+            store = dataset_service.get_columnar_store()
+            assert not store.has(checksum)
+
+            with patch("app.modules.hubfile.services.HubfileStatsService.compute_for_dataset") as compute:
+                dataset_service.schedule_statistics(dataset)
+
+            assert store.has(checksum)
+            assert os.path.isfile(store.index_path_for(checksum))
+            compute.assert_called_once_with(dataset)
+
+    def test_validate_remaining_rows_checks_the_tail_in_the_background_stage(self, test_app, dataset_service, tmp_path):
+        """Rows the upload request left unchecked are validated later and the outcome stored on the file."""
+        with test_app.app_context(), patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+            folder = tmp_path / "uploads" / "user_7" / "dataset_9"
+            folder.mkdir(parents=True)
+            (folder / "big.csv").write_text("DATE,_temp_mean\n2020-01-01,1.5\n2020-01-02,hot\n")
+            partial = Mock(rows_validated=False, row_errors=None)
+            partial.name = "big.csv"
+            checked = Mock(rows_validated=True, row_errors=None)
+            checked.name = "small.csv"
+            dataset = Mock(id=9, user_id=7)
+            dataset.files.return_value = [partial, checked]
+
+            with patch.dict(test_app.config, {"CSV_VALIDATION_MAX_ROWS": 1}):
+                assert dataset_service.validate_remaining_rows(dataset) == 1
+
+            assert partial.rows_validated is True
+            assert "fila 3: valor no numérico 'hot'" in partial.row_errors
+            assert checked.row_errors is None
+
+    def test_collect_garbage_if_due_removes_orphan_blobs_and_sidecars(self, test_app, dataset_service, tmp_path):
+        """Unlinked blobs and their sidecars are collected periodically; linked ones stay."""
+        with test_app.app_context(), patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+            blob_store = dataset_service.get_blob_store()
+            columnar_store = dataset_service.get_columnar_store()
+            checksums = {}
+            for name in ("kept.csv", "orphan.csv"):
+                content = f"DATE,_temp_mean\n2020-01-01,{len(name)}\n".encode()
+                (tmp_path / name).write_bytes(content)
+                checksums[name] = hashlib.sha256(content).hexdigest()
+                blob_store.ingest(str(tmp_path / name), checksums[name])
+                columnar_store.ensure(blob_store.blob_path(checksums[name]), checksums[name])
+            blob_store.link(checksums["kept.csv"], str(tmp_path / "dataset_file.csv"))
+
+            with (
+                patch("app.modules.dataset.services.BLOB_GC_GRACE_SECONDS", 0),
+                patch.dict(test_app.config, {"BLOB_GC_INTERVAL_SECONDS": 3600}),
+                patch.object(DataSetService, "_last_gc", float("-inf")),
+            ):
+                assert dataset_service.collect_garbage_if_due() is True
+                assert dataset_service.collect_garbage_if_due() is False
+
+            assert blob_store.has(checksums["kept.csv"]) and columnar_store.has(checksums["kept.csv"])
+            assert not blob_store.has(checksums["orphan.csv"]) and not columnar_store.has(checksums["orphan.csv"])
 
     @patch("app.modules.dataset.services.os.path.exists")
     @patch("app.modules.dataset.services.AuthenticationService")
@@ -486,20 +600,15 @@ class TestDataSetService:
             # Should not raise exception, just log warning
             dataset_service.move_feature_models(dataset)
 
-    @patch("app.modules.dataset.services.shutil.copy2")
-    @patch("app.modules.dataset.services.os.path.exists")
-    @patch("app.modules.dataset.services.os.makedirs")
     def test_copy_feature_models_from_original_success(
         self,
-        mock_makedirs,
-        mock_exists,
-        mock_copy2,
         test_app,
         dataset_service,
         dataset_with_feature_models,
+        tmp_path,
     ):
-        """Test copying feature models from original dataset."""
-        with test_app.app_context():
+        """Test that a new version hardlinks the original files instead of copying them."""
+        with test_app.app_context(), patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
             # Create a new empty dataset to copy into
             ds_meta_new = DSMetaData(
                 title="New Dataset Version",
@@ -509,19 +618,23 @@ class TestDataSetService:
             db.session.add(ds_meta_new)
             db.session.flush()
 
-            new_dataset = DataSet(user_id=1, ds_meta_data_id=ds_meta_new.id, version_number="2.0.0")
+            original_dataset = DataSet.query.get(dataset_with_feature_models.id)
+            new_dataset = DataSet(
+                user_id=original_dataset.user_id, ds_meta_data_id=ds_meta_new.id, version_number="2.0.0"
+            )
             db.session.add(new_dataset)
             db.session.commit()
 
-            original_dataset = DataSet.query.get(dataset_with_feature_models.id)
-
-            # Mock file operations
-            mock_exists.return_value = True
+            src_dir = tmp_path / "uploads" / f"user_{original_dataset.user_id}" / f"dataset_{original_dataset.id}"
+            src_dir.mkdir(parents=True)
+            (src_dir / "test_model.uvl").write_text("features")
 
             dataset_service.copy_feature_models_from_original(new_dataset, original_dataset)
 
-            # Verify makedirs was called
-            mock_makedirs.assert_called()
+            dest_file = tmp_path / "uploads" / f"user_{new_dataset.user_id}" / f"dataset_{new_dataset.id}"
+            dest_file = dest_file / "test_model.uvl"
+            assert os.path.samefile(dest_file, src_dir / "test_model.uvl")
+            assert dataset_service.get_blob_store().refcount(hashlib.sha256(b"features").hexdigest()) == 2
 
     @patch("app.modules.dataset.services.os.path.exists")
     @patch("app.modules.dataset.services.os.makedirs")
@@ -555,14 +668,16 @@ class TestDataSetService:
             # Should not raise exception, just log warning
             dataset_service.copy_feature_models_from_original(new_dataset, original_dataset)
 
-    @patch("app.modules.dataset.services.shutil.copy2")
+    @patch("app.modules.dataset.services.BlobStore.ingest")
+    @patch("app.modules.dataset.services.calculate_checksum_and_size")
     @patch("app.modules.dataset.services.os.path.exists")
     @patch("app.modules.dataset.services.os.makedirs")
     def test_copy_feature_models_from_original_copy_fails(
         self,
         mock_makedirs,
         mock_exists,
-        mock_copy2,
+        mock_checksum,
+        mock_ingest,
         test_app,
         dataset_service,
         dataset_with_feature_models,
@@ -585,13 +700,14 @@ class TestDataSetService:
 
             # Mock file exists but copy fails
             mock_exists.return_value = True
-            mock_copy2.side_effect = Exception("Permission denied")
+            mock_checksum.return_value = ("abc", 3)
+            mock_ingest.side_effect = Exception("Permission denied")
 
             # Should not raise exception, just log error
             dataset_service.copy_feature_models_from_original(new_dataset, original_dataset)
 
-    @patch("app.modules.dataset.services.shutil.move")
-    @patch("app.modules.dataset.services.os.remove")
+    @patch("app.modules.dataset.services.BlobStore.ingest")
+    @patch("app.modules.dataset.services.calculate_checksum_and_size")
     @patch("app.modules.dataset.services.os.path.exists")
     @patch("app.modules.dataset.services.os.makedirs")
     @patch("app.modules.dataset.services.AuthenticationService")
@@ -600,8 +716,8 @@ class TestDataSetService:
         mock_auth_service,
         mock_makedirs,
         mock_exists,
-        mock_remove,
-        mock_move,
+        mock_checksum,
+        mock_ingest,
         test_app,
         dataset_service,
         dataset_with_feature_models,
@@ -614,8 +730,9 @@ class TestDataSetService:
             mock_auth_service.return_value.get_authenticated_user.return_value = mock_user
 
             # Mock file exists but move fails
-            mock_exists.side_effect = [True, False]
-            mock_move.side_effect = Exception("Move failed")
+            mock_exists.return_value = True
+            mock_checksum.return_value = ("abc", 3)
+            mock_ingest.side_effect = Exception("Move failed")
 
             dataset = DataSet.query.get(dataset_with_feature_models.id)
 
@@ -0,0 +1,74 @@
+import pytest
+
+from app.modules.dataset.aggregate import LRUCache, aggregate_cache, aggregate_columnar, cached_aggregate
+from app.modules.dataset.columnar import ColumnarFile, write_sidecar
+
+
+@pytest.fixture
+def sidecar(tmp_path):
+    csv_file = tmp_path / "daily.csv"
+    csv_file.write_text(
+        "DATE,BASEL_temp_mean,BASEL_precipitation\n"
+        "2010-01-01,1.5,0\n"
+        "2010-01-02,2.5,NA\n"
+        "2010-02-01,-1,4\n"
+        "2011-03-01,10,1\n",
+        encoding="utf-8",
+    )
+    path = tmp_path / "daily.wcol"
+    write_sidecar(str(csv_file), str(path))
+    return str(path)
+
+
+def test_aggregate_by_month(sidecar):
+    with ColumnarFile(sidecar) as columnar:
+        result = aggregate_columnar(columnar, "month", ["mean", "max", "count"], ["_temp_mean", "BASEL_precipitation"])
+
+    assert result["periods"] == ["2010-01", "2010-02", "2011-03"]
+    assert result["series"]["_temp_mean"] == {"mean": [2.0, -1.0, 10.0], "max": [2.5, -1.0, 10.0], "count": [2, 1, 1]}
+    assert result["series"]["BASEL_precipitation"]["mean"] == [0.0, 4.0, 1.0]
+    assert result["missing"] == []
+
+
+def test_aggregate_by_year_reports_missing_columns(sidecar):
+    with ColumnarFile(sidecar) as columnar:
+        result = aggregate_columnar(columnar, "year", ["sum", "null_count"], ["_precipitation", "_humidity"])
+
+    assert result["periods"] == ["2010", "2011"]
+    assert result["series"]["_precipitation"] == {"sum": [4.0, 1.0], "null_count": [1, 0]}
+    assert result["missing"] == ["_humidity"]
+
+
+def test_aggregate_rejects_unknown_parameters(sidecar):
+    with ColumnarFile(sidecar) as columnar:
+        with pytest.raises(ValueError):
+            aggregate_columnar(columnar, "week", ["mean"], ["_temp_mean"])
+        with pytest.raises(ValueError):
+            aggregate_columnar(columnar, "month", ["median"], ["_temp_mean"])
+
+
+def test_cached_aggregate_opens_file_only_once(sidecar):
+    aggregate_cache.clear()
+    opened = []
+
+    def open_columnar():
+        opened.append(True)
+        return ColumnarFile(sidecar)
+
+    first = cached_aggregate("c" * 64, open_columnar, "month", ["mean"], ["_temp_mean"])
+    second = cached_aggregate("c" * 64, open_columnar, "month", ["mean"], ["_temp_mean"])
+
+    assert first == second
+    assert len(opened) == 1
+    assert aggregate_cache.hits == 1
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
@@ -0,0 +1,114 @@
+"""
+Tests for the paginated, projectable and streaming /api/v1/datasets/ resource.
+"""
+
+import json
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.api import dataset_serializer
+from app.modules.dataset.models import DataSet, PublicationType
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
+from core.resources.generic_resource import decode_cursor, encode_cursor
+from core.serialisers.serializer import encode_json
+
+
+@pytest.fixture(scope="module")
+def api_datasets(test_client):
+    user = create_user("api_datasets@example.com")
+
+    datasets = []
+    for i in range(5):
+        dataset = create_dataset(user, f"Api dataset {i}", "Api")
+        fm_meta = FMMetaData(filename="a.csv", title="a", description="a", publication_type=PublicationType.NONE)
+        db.session.add(fm_meta)
+        db.session.flush()
+        fm = FeatureModel(data_set_id=dataset.id, fm_meta_data_id=fm_meta.id)
+        db.session.add(fm)
+        db.session.flush()
+        db.session.add(Hubfile(name=f"file_{i}.csv", checksum="x", size=1024, feature_model_id=fm.id))
+        datasets.append(dataset)
+    db.session.commit()
+    return datasets
+
+
+def _all_ids(test_client, limit):
+    ids, cursor = [], None
+    while True:
+        url = f"/api/v1/datasets/?limit={limit}&fields=dataset_id" + (f"&cursor={cursor}" if cursor else "")
+        data = test_client.get(url).get_json()
+        ids.extend(item["dataset_id"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            assert data["has_more"] is False
+            return ids
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    with pytest.raises(ValueError):
+        decode_cursor("%%%")
+
+
+def test_pages_cover_every_dataset_once(test_client, api_datasets):
+    ids = _all_ids(test_client, limit=2)
+    assert ids == sorted(ids) and len(ids) == len(set(ids))
+    assert {d.id for d in api_datasets} <= set(ids)
+
+
+def test_fields_projection_and_include(test_client, api_datasets):
+    dataset = api_datasets[0]
+    item = test_client.get(f"/api/v1/datasets/{dataset.id}?fields=dataset_id,name").get_json()
+    assert item == {"dataset_id": dataset.id, "name": "Api dataset 0"}
+
+    item = test_client.get(f"/api/v1/datasets/{dataset.id}?include=files").get_json()
+    assert set(item) == {"dataset_id", "created", "name", "doi", "files"}
+    assert item["files"] == [{"file_id": dataset.files()[0].id, "file_name": "file_0.csv", "size": "1.0 KB"}]
+
+    # Sin parámetros se mantiene la respuesta completa
+    item = test_client.get(f"/api/v1/datasets/{dataset.id}").get_json()
+    assert set(item) == {"dataset_id", "created", "name", "doi", "files"}
+
+
+def test_bad_parameters_are_rejected(test_client, api_datasets):
+    assert test_client.get("/api/v1/datasets/?fields=nope").status_code == 400
+    assert test_client.get("/api/v1/datasets/?include=name").status_code == 400
+    assert test_client.get("/api/v1/datasets/?cursor=%%%").status_code == 400
+    assert test_client.get("/api/v1/datasets/?limit=abc").status_code == 400
+    assert test_client.get("/api/v1/datasets/?format=xml").status_code == 400
+
+
+def test_ndjson_stream(test_client, api_datasets):
+    response = test_client.get("/api/v1/datasets/?format=ndjson&fields=dataset_id,name")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {d.id for d in api_datasets} <= {line["dataset_id"] for line in lines}
+    assert all(set(line) == {"dataset_id", "name"} for line in lines)
+
+    response = test_client.get("/api/v1/datasets/?fields=dataset_id", headers={"Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+
+
+def test_serialize_many_matches_serialize(test_client, api_datasets):
+    ids = [d.id for d in api_datasets]
+    with test_client.application.test_request_context():
+        expected = [dataset_serializer.serialize(db.session.get(DataSet, i)) for i in ids]
+        query = DataSet.query.filter(DataSet.id.in_(ids)).order_by(DataSet.id)
+        assert dataset_serializer.serialize_many(query) == expected
+        assert json.loads(dataset_serializer.encode_many(query)) == expected
+        assert dataset_serializer.serialize_many(query, ["dataset_id", "created"]) == [
+            {"dataset_id": item["dataset_id"], "created": item["created"]} for item in expected
+        ]
+    # El plan de cada modelo y conjunto de campos se compila una sola vez
+    assert dataset_serializer.plan(DataSet) is dataset_serializer.plan(DataSet)
+
+
+def test_encode_json_handles_nested_structures():
+    assert json.loads(encode_json({"items": [{"a": 1, "b": None}], "has_more": False})) == {
+        "items": [{"a": 1, "b": None}],
+        "has_more": False,
+    }
@@ -0,0 +1,80 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from app.modules.dataset.archive import ArchiveCache, archive_key, collect_entries, iter_zip
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    d = tmp_path / "dataset_1"
+    d.mkdir()
+    (d / "data.csv").write_text("DATE,_temp_mean\n2023-01-01,10\n")
+    (d / "README.md").write_text("Dataset description")
+    return d
+
+
+def test_iter_zip_produces_valid_archive(dataset_dir):
+    entries = collect_entries(str(dataset_dir), "dataset_1")
+    payload = b"".join(iter_zip(entries, chunk_size=4))
+
+    with zipfile.ZipFile(io.BytesIO(payload)) as zipf:
+        assert zipf.testzip() is None
+        assert sorted(zipf.namelist()) == ["dataset_1/README.md", "dataset_1/data.csv"]
+        assert zipf.read("dataset_1/data.csv") == (dataset_dir / "data.csv").read_bytes()
+
+
+def test_collect_entries_missing_directory(tmp_path):
+    assert collect_entries(str(tmp_path / "missing"), "dataset_1") == []
+
+
+def test_archive_key_uses_checksums(dataset_dir):
+    first = archive_key(collect_entries(str(dataset_dir), "dataset_1", {"data.csv": "a", "README.md": "b"}))
+    same = archive_key(collect_entries(str(dataset_dir), "dataset_1", {"data.csv": "a", "README.md": "b"}))
+    changed = archive_key(collect_entries(str(dataset_dir), "dataset_1", {"data.csv": "c", "README.md": "b"}))
+
+    assert first == same
+    assert first != changed
+
+
+def test_archive_cache_stores_streamed_archive(tmp_path, dataset_dir):
+    cache = ArchiveCache(str(tmp_path / "cache"), max_bytes=10 * 1024**2)
+    entries = collect_entries(str(dataset_dir), "dataset_1")
+    key = archive_key(entries)
+
+    assert cache.lookup(key) is None
+    streamed = b"".join(cache.stream(key, entries))
+
+    cached_path = cache.lookup(key)
+    assert cached_path is not None
+    with open(cached_path, "rb") as fh:
+        assert fh.read() == streamed
+
+
+def test_archive_cache_discards_interrupted_stream(tmp_path, dataset_dir):
+    cache = ArchiveCache(str(tmp_path / "cache"), max_bytes=10 * 1024**2)
+    entries = collect_entries(str(dataset_dir), "dataset_1")
+    key = archive_key(entries)
+
+    stream = cache.stream(key, entries)
+    next(stream)
+    stream.close()
+
+    assert cache.lookup(key) is None
+    assert os.listdir(cache.directory) == []
+
+
+def test_archive_cache_evicts_least_recently_used(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    cache = ArchiveCache(str(cache_dir), max_bytes=150)
+    for i, name in enumerate(["old", "recent", "newest"]):
+        path = cache_dir / f"{name}.zip"
+        path.write_bytes(b"x" * 60)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    cache.evict()
+
+    assert sorted(os.listdir(cache_dir)) == ["newest.zip", "recent.zip"]
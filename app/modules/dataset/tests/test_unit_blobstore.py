@@ -0,0 +1,101 @@
+import hashlib
+import os
+
+import pytest
+
+from app.modules.dataset.blobstore import BlobStore
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+def _write(path, content: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return hashlib.sha256(content).hexdigest()
+
+
+def test_ingest_moves_file_into_store(tmp_path, blob_store):
+    src = tmp_path / "temp" / "data.csv"
+    checksum = _write(src, b"DATE,_temp_mean\n")
+
+    blob = blob_store.ingest(str(src), checksum)
+
+    assert not src.exists()
+    assert blob == blob_store.blob_path(checksum)
+    assert blob_store.has(checksum)
+
+
+def test_ingest_duplicate_keeps_single_blob(tmp_path, blob_store):
+    first = tmp_path / "temp" / "a.csv"
+    second = tmp_path / "temp" / "b.csv"
+    checksum = _write(first, b"same content")
+    _write(second, b"same content")
+
+    blob_store.ingest(str(first), checksum)
+    blob_store.ingest(str(second), checksum)
+
+    assert not second.exists()
+    assert len(os.listdir(os.path.dirname(blob_store.blob_path(checksum)))) == 1
+
+
+def test_link_shares_blob_between_datasets(tmp_path, blob_store):
+    src = tmp_path / "temp" / "data.csv"
+    checksum = _write(src, b"shared")
+    blob_store.ingest(str(src), checksum)
+
+    v1 = tmp_path / "dataset_1" / "data.csv"
+    v2 = tmp_path / "dataset_2" / "data.csv"
+    v1.parent.mkdir()
+    v2.parent.mkdir()
+    blob_store.link(checksum, str(v1))
+    blob_store.link(checksum, str(v2))
+
+    assert os.path.samefile(v1, v2)
+    assert blob_store.refcount(checksum) == 2
+
+
+def test_release_deletes_blob_with_last_reference(tmp_path, blob_store):
+    src = tmp_path / "temp" / "data.csv"
+    checksum = _write(src, b"content")
+    blob_store.ingest(str(src), checksum)
+    v1 = tmp_path / "v1.csv"
+    v2 = tmp_path / "v2.csv"
+    blob_store.link(checksum, str(v1))
+    blob_store.link(checksum, str(v2))
+
+    assert blob_store.release(str(v1), checksum) is False
+    assert blob_store.has(checksum)
+    assert v2.read_bytes() == b"content"
+
+    assert blob_store.release(str(v2), checksum) is True
+    assert not blob_store.has(checksum)
+
+
+def test_collect_garbage_removes_unreferenced_blobs(tmp_path, blob_store):
+    kept_src = tmp_path / "kept.csv"
+    orphan_src = tmp_path / "orphan.csv"
+    kept = _write(kept_src, b"kept")
+    orphan = _write(orphan_src, b"orphan")
+    blob_store.ingest(str(kept_src), kept)
+    blob_store.ingest(str(orphan_src), orphan)
+    blob_store.link(kept, str(tmp_path / "dataset_file.csv"))
+
+    assert blob_store.collect_garbage() == 1
+    assert blob_store.has(kept)
+    assert not blob_store.has(orphan)
+
+
+def test_collect_garbage_keeps_recently_ingested_blobs(tmp_path, blob_store):
+    src = tmp_path / "fresh.csv"
+    checksum = _write(src, b"fresh")
+    blob_store.ingest(str(src), checksum)
+    removed = []
+
+    assert blob_store.collect_garbage(min_age=3600, on_remove=removed.append) == 0
+    assert blob_store.has(checksum)
+
+    assert blob_store.collect_garbage(on_remove=removed.append) == 1
+    assert removed == [checksum]
@@ -0,0 +1,77 @@
+import math
+from datetime import date
+
+import pytest
+
+from app.modules.dataset.columnar import (
+    MISSING_DATE,
+    ColumnarFile,
+    ColumnarStore,
+    from_epoch_days,
+    to_epoch_days,
+    write_sidecar,
+)
+from app.modules.dataset.validator import REQUIRED_COLUMNS
+
+
+@pytest.fixture
+def weather_csv(tmp_path):
+    headers = ["DATE", "MONTH"] + [f"BASEL{col}" for col in REQUIRED_COLUMNS]
+    lines = [",".join(headers)]
+    lines.append(",".join(["2000-01-01", "1"] + ["1.5"] * len(REQUIRED_COLUMNS)))
+    lines.append(",".join(["20000102", "1", "NA"] + ["2"] * (len(REQUIRED_COLUMNS) - 1)))
+    lines.append(",".join(["bad-date", "1", ""] + ["3"] * (len(REQUIRED_COLUMNS) - 1)))
+    path = tmp_path / "weather.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_epoch_days_round_trip():
+    assert to_epoch_days(date(1970, 1, 2)) == 1
+    assert from_epoch_days(to_epoch_days(date(2023, 5, 17))) == date(2023, 5, 17)
+    assert from_epoch_days(MISSING_DATE) is None
+
+
+def test_write_sidecar_header_describes_columns(tmp_path, weather_csv):
+    header = write_sidecar(str(weather_csv), str(tmp_path / "weather.wcol"), source_checksum="abc", batch_size=2)
+
+    assert header["rows"] == 3
+    assert header["date_column"] == "DATE"
+    assert header["source_checksum"] == "abc"
+    by_name = {column["name"]: column for column in header["columns"]}
+    assert by_name["DATE"]["dtype"] == "<i8"
+    assert by_name["BASEL_temp_max"]["dtype"] == "<f4"
+    assert by_name["BASEL_temp_max"]["field"] == "_temp_max"
+    assert by_name["MONTH"]["field"] is None
+    assert all(column["offset"] % 64 == 0 for column in header["columns"])
+
+
+def test_columnar_file_maps_typed_columns(tmp_path, weather_csv):
+    path = tmp_path / "weather.wcol"
+    write_sidecar(str(weather_csv), str(path), batch_size=2)
+
+    with ColumnarFile(str(path)) as cf:
+        dates = cf.dates()
+        assert list(dates) == [to_epoch_days(date(2000, 1, 1)), to_epoch_days(date(2000, 1, 2)), MISSING_DATE]
+
+        temp_mean = cf.column(cf.field_column("_temp_mean"))
+        assert temp_mean.format == "f"
+        assert temp_mean[0] == 1.5
+        assert math.isnan(temp_mean[1]) and math.isnan(temp_mean[2])
+        assert list(cf.column("BASEL_wind_speed")) == [1.5, 2.0, 3.0]
+
+
+def test_columnar_store_builds_once_per_checksum(tmp_path, weather_csv):
+    store = ColumnarStore(str(tmp_path / "columnar"))
+
+    path = store.ensure(str(weather_csv), "ab" * 32)
+    mtime = (tmp_path / "columnar" / "ab" / f"{'ab' * 32}.wcol").stat().st_mtime_ns
+    assert store.ensure(str(weather_csv), "ab" * 32) == path
+    assert (tmp_path / "columnar" / "ab" / f"{'ab' * 32}.wcol").stat().st_mtime_ns == mtime
+
+    cf = store.open("ab" * 32)
+    assert cf.rows == 3
+    cf.close()
+
+    store.discard("ab" * 32)
+    assert store.open("ab" * 32) is None
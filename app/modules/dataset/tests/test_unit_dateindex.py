@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+from app.modules.dataset.dateindex import DateIndex, build_date_index
+
+
+def _write_csv(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def daily_csv(tmp_path):
+    lines = ["DATE,BASEL_temp_max,BASEL_humidity"]
+    for day in range(1, 11):
+        lines.append(f"2001-01-{day:02d},{day}.5,{50 + day}")
+        if day == 5:
+            lines.append("")
+    return _write_csv(tmp_path / "daily.csv", lines)
+
+
+def test_build_date_index_marks_sorted_files(tmp_path, daily_csv):
+    header = build_date_index(str(daily_csv), str(tmp_path / "daily.didx"))
+
+    assert header["rows"] == 10
+    assert header["sorted"] is True
+    assert header["date_column"] == "DATE"
+    assert header["headers"] == ["DATE", "BASEL_temp_max", "BASEL_humidity"]
+
+
+def test_row_range_seeks_to_date_range(tmp_path, daily_csv):
+    build_date_index(str(daily_csv), str(tmp_path / "daily.didx"))
+
+    with DateIndex(str(tmp_path / "daily.didx")) as index:
+        rows = index.row_range(date(2001, 1, 4), date(2001, 1, 7))
+        assert rows == range(3, 7)
+        assert [row[0] for row in index.iter_rows(str(daily_csv), rows)] == [
+            "2001-01-04",
+            "2001-01-05",
+            "2001-01-06",
+            "2001-01-07",
+        ]
+        assert index.row_range(None, date(2001, 1, 2)) == range(0, 2)
+        assert index.row_range(date(2002, 1, 1), None) == range(10, 10)
+        assert len(index.row_range()) == 10
+
+
+def test_unsorted_files_are_filtered_by_scan(tmp_path):
+    csv_file = _write_csv(
+        tmp_path / "unsorted.csv",
+        ["DATE;value", "2001-03-01;1", "2001-01-01;2", "not-a-date;3", "2001-02-01;4"],
+    )
+    header = build_date_index(str(csv_file), str(tmp_path / "unsorted.didx"))
+    assert header["sorted"] is False
+
+    with DateIndex(str(tmp_path / "unsorted.didx")) as index:
+        rows = index.row_range(date(2001, 1, 15), date(2001, 3, 1))
+        assert [row for row in index.iter_rows(str(csv_file), rows)] == [["2001-03-01", "1"], ["2001-02-01", "4"]]
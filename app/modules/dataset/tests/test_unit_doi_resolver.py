@@ -0,0 +1,102 @@
+"""
+Tests for the cached DOI resolution behind the /doi/<doi>/ landing page.
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.models import DataSetConcept, DOIMapping
+from app.modules.dataset.services import DataSetService, DOIResolverService, doi_cache
+
+
+@pytest.fixture(scope="module")
+def doi_versions(test_client):
+    user = create_user("doi_resolver@example.com")
+    concept = DataSetConcept(conceptual_doi="10.1234/resolver-concept")
+    db.session.add(concept)
+    db.session.flush()
+
+    versions = []
+    for number, doi in enumerate(["10.1234/resolver.v1", "10.1234/resolver.v2", "10.1234/resolver.v2"], start=1):
+        dataset = create_dataset(
+            user,
+            f"Resolver v{number}",
+            "DOI",
+            dataset_doi=doi,
+            tags="doi",
+            ds_concept_id=concept.id,
+            created_at=datetime(2024, 1, number),
+            is_latest=number == 3,
+            version_number=f"v1.{number}.0",
+        )
+        versions.append(dataset)
+    db.session.add(DOIMapping(dataset_doi_old="10.1234/resolver.old", dataset_doi_new="10.1234/resolver.v1"))
+    db.session.commit()
+    return {"concept": concept, "versions": versions}
+
+
+@pytest.fixture
+def cache_enabled(test_client):
+    doi_cache.clear()
+    test_client.application.config["DOI_CACHE_TTL"] = 60
+    yield
+    test_client.application.config["DOI_CACHE_TTL"] = 0
+    doi_cache.clear()
+
+
+def test_resolves_every_kind_of_doi(test_client, doi_versions):
+    v1, v2, v3 = doi_versions["versions"]
+    newest_first = (v3.id, v2.id, v1.id)
+    with test_client.application.test_request_context():
+        resolver = DOIResolverService()
+        concept = resolver.resolve("10.1234/resolver-concept")
+        assert (concept.dataset_id, concept.latest_id, concept.version_ids) == (v3.id, v3.id, newest_first)
+        assert concept.conceptual_doi == "10.1234/resolver-concept"
+        assert resolver.resolve("10.1234/resolver.v1").dataset_id == v1.id
+        # Una versión menor comparte la DOI de la anterior: se muestra la más reciente
+        assert resolver.resolve("10.1234/resolver.v2").dataset_id == v3.id
+        assert resolver.resolve("10.1234/resolver.old").redirect_doi == "10.1234/resolver.v1"
+        assert resolver.resolve("10.1234/unknown") is None
+        assert [d.id for d in resolver.load_versions(concept)] == list(newest_first)
+
+
+def test_resolution_is_cached_until_a_publish(test_client, doi_versions, cache_enabled):
+    with test_client.application.test_request_context():
+        resolver = DOIResolverService()
+        with patch.object(DOIResolverService, "_resolve", wraps=resolver._resolve) as resolve:
+            first = resolver.resolve("10.1234/resolver.v1")
+            assert resolver.resolve("10.1234/resolver.v1") == first
+            assert resolver.resolve("10.1234/unknown") is None
+            assert resolver.resolve("10.1234/unknown") is None
+            assert resolve.call_count == 2
+
+            DataSetService().update_dsmetadata(
+                doi_versions["versions"][0].ds_meta_data_id, dataset_doi="10.1234/resolver.v1"
+            )
+            resolver.resolve("10.1234/resolver.v1")
+            assert resolve.call_count == 3
+
+            with (
+                patch.object(DataSetService, "catalogue_stations"),
+                patch.object(DataSetService, "schedule_statistics"),
+                patch("app.modules.explore.services.ExploreService.index_dataset"),
+                patch("app.modules.dataset.services.DataSetSimilarityService.compute_for_dataset"),
+            ):
+                DataSetService().on_published(doi_versions["versions"][2])
+            resolver.resolve("10.1234/resolver.v1")
+            assert resolve.call_count == 4
+
+
+def test_landing_page_renders_from_resolution(test_client, doi_versions):
+    response = test_client.get("/doi/10.1234/resolver-concept/")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert "Resolver v3" in body and "v1.1.0" in body
+
+    response = test_client.get("/doi/10.1234/resolver.old/", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/doi/10.1234/resolver.v1/")
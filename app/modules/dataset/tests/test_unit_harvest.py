@@ -0,0 +1,91 @@
+"""
+Tests for the incremental metadata harvesting endpoint.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.services import (
+    DataSetHarvestService,
+    DSMetaDataService,
+    decode_resumption_token,
+    parse_harvest_timestamp,
+)
+
+
+@pytest.fixture(scope="module")
+def harvest_datasets(test_client):
+    user = create_user("harvest@example.com")
+
+    datasets = []
+    for day in range(1, 6):
+        stamp = datetime(2030, 1, day, 12, 0, 0)
+        datasets.append(create_dataset(user, f"Harvested {day}", "Harvest", updated_at=stamp, created_at=stamp))
+    db.session.commit()
+    return datasets
+
+
+def test_parse_harvest_timestamp():
+    assert parse_harvest_timestamp("2030-01-02") == datetime(2030, 1, 2)
+    assert parse_harvest_timestamp("2030-01-02", end_of_day=True) == datetime(2030, 1, 2, 23, 59, 59, 999999)
+    # '+' sin escapar llega como espacio; se normaliza a UTC
+    assert parse_harvest_timestamp("2030-01-02T10:00:00 01:00") == datetime(2030, 1, 2, 9, 0, 0)
+    assert parse_harvest_timestamp(None) is None
+    with pytest.raises(ValueError):
+        parse_harvest_timestamp("yesterday")
+
+
+def test_pages_follow_resumption_tokens(test_client, harvest_datasets):
+    titles, token = [], None
+    while True:
+        url = "/dataset/harvest?from=2030-01-01&limit=2" + (f"&resumption_token={token}" if token else "")
+        test_client.application.config["HARVEST_PAGE_SIZE"] = 2
+        try:
+            data = test_client.get(url).get_json()
+        finally:
+            test_client.application.config["HARVEST_PAGE_SIZE"] = 100
+        titles.extend(record["title"] for record in data["records"])
+        token = data["resumption_token"]
+        if token is None:
+            break
+    assert titles == [f"Harvested {day}" for day in range(1, 6)]
+
+
+def test_window_is_inclusive_and_records_match_to_dict(test_client, harvest_datasets):
+    data = test_client.get("/dataset/harvest?from=2030-01-02&until=2030-01-03").get_json()
+    assert [record["title"] for record in data["records"]] == ["Harvested 2", "Harvested 3"]
+    record = data["records"][0]
+    with test_client.application.test_request_context():
+        expected = harvest_datasets[1].to_dict()
+    assert set(record) == set(expected) | {"modified_at"}
+    assert record["created_at"] == "2030-01-02T12:00:00"
+    assert record["modified_at"] == "2030-01-02T12:00:00"
+
+
+def test_ndjson_stream(test_client, harvest_datasets):
+    response = test_client.get("/dataset/harvest?format=ndjson&from=2030-01-04")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["title"] for line in lines] == ["Harvested 4", "Harvested 5"]
+
+
+def test_edits_move_records_forward(test_client, harvest_datasets):
+    before = datetime.utcnow() - timedelta(seconds=1)
+    with test_client.application.test_request_context():
+        DSMetaDataService().update(harvest_datasets[0].ds_meta_data_id, description="Edited")
+        records, _ = DataSetHarvestService().page(start=before, until=before + timedelta(minutes=5))
+    assert [record["title"] for record in records] == ["Harvested 1"]
+
+
+def test_bad_parameters(test_client, harvest_datasets):
+    assert test_client.get("/dataset/harvest?from=nope").status_code == 400
+    assert test_client.get("/dataset/harvest?format=xml").status_code == 400
+    assert test_client.get("/dataset/harvest?resumption_token=%%%").status_code == 400
+    assert test_client.get("/dataset/harvest?from=2030-02-01&until=2030-01-01").status_code == 400
+    with pytest.raises(ValueError):
+        decode_resumption_token("bm9wZQ")
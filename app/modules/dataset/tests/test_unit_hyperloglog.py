@@ -0,0 +1,40 @@
+"""
+Tests for the HyperLogLog sketches behind the unique visitor estimates.
+"""
+
+import pytest
+
+from app.modules.dataset.hyperloglog import NUM_REGISTERS, HyperLogLog, visitor_key
+
+
+def test_small_counts_are_close_to_exact():
+    assert HyperLogLog().count() == 0
+    sketch = HyperLogLog().update(f"c:{i}" for i in range(50))
+    assert sketch.update(["c:1", "c:2"]).count() == pytest.approx(50, abs=1)
+
+
+def test_large_counts_stay_within_the_standard_error():
+    sketch = HyperLogLog().update(f"visitor-{i}" for i in range(20000))
+    assert sketch.count() == pytest.approx(20000, rel=0.05)
+
+
+def test_merge_is_the_union():
+    monday = HyperLogLog().update(f"v{i}" for i in range(0, 3000))
+    tuesday = HyperLogLog().update(f"v{i}" for i in range(2000, 5000))
+    both = HyperLogLog().update(f"v{i}" for i in range(0, 5000))
+    assert HyperLogLog.union([monday, tuesday]).registers == both.registers
+    assert both.count() == pytest.approx(5000, rel=0.05)
+
+
+def test_serialization_round_trip():
+    sketch = HyperLogLog().update(f"v{i}" for i in range(100))
+    data = sketch.to_bytes()
+    assert len(data) < NUM_REGISTERS
+    assert HyperLogLog.from_bytes(data).registers == sketch.registers
+    with pytest.raises(ValueError):
+        HyperLogLog(b"\x00" * 10)
+
+
+def test_visitor_key_prefers_the_user():
+    assert visitor_key(7, "abc") == visitor_key(7, "other") == "u:7"
+    assert visitor_key(None, "abc") == "c:abc"
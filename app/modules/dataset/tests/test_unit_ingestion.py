@@ -0,0 +1,122 @@
+"""
+Tests for the buffered ingestion of view and download records.
+"""
+
+import os
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.ingestion import (
+    DATASET_DOWNLOAD,
+    DATASET_VIEW,
+    RecordEvent,
+    record_buffer,
+)
+from app.modules.dataset.models import DSDownloadRecord, DSViewRecord
+from app.modules.public.models import PlatformCounter
+
+
+@pytest.fixture(scope="module")
+def ingestion_dataset(test_client):
+    dataset = create_dataset(create_user("ingestion@example.com"), "Ingestion", "Records")
+    db.session.commit()
+    return dataset
+
+
+@pytest.fixture
+def async_buffer(test_client, tmp_path):
+    config = test_client.application.config
+    config.update(RECORDS_ASYNC=True, RECORDS_SPOOL_DIR=str(tmp_path), RECORDS_FLUSH_SECONDS=0)
+    record_buffer.reset()
+    yield tmp_path
+    record_buffer.reset()
+    config.update(RECORDS_ASYNC=False, RECORDS_SPOOL_DIR=None, RECORDS_QUEUE_SIZE=10000)
+
+
+def _views(dataset, cookie=None):
+    query = DSViewRecord.query.filter_by(dataset_id=dataset.id)
+    return query.filter_by(view_cookie=cookie).count() if cookie else query.count()
+
+
+def _spooled(directory):
+    path = os.path.join(directory, f"records-{os.getpid()}.ndjson")
+    with open(path, encoding="utf-8") as spool:
+        return [RecordEvent.from_line(line) for line in spool]
+
+
+def test_inline_mode_keeps_one_record_per_cookie(test_client, ingestion_dataset):
+    with test_client.application.test_request_context():
+        record_buffer.submit(DATASET_DOWNLOAD, None, ingestion_dataset.id, "inline")
+        record_buffer.submit(DATASET_DOWNLOAD, None, ingestion_dataset.id, "inline")
+    assert DSDownloadRecord.query.filter_by(dataset_id=ingestion_dataset.id, download_cookie="inline").count() == 1
+    assert db.session.get(PlatformCounter, "dataset_downloads").value == DSDownloadRecord.query.count()
+
+
+def test_buffered_events_are_deduplicated_spooled_and_bulk_written(test_client, ingestion_dataset, async_buffer):
+    with test_client.application.test_request_context():
+        record_buffer.submit(DATASET_VIEW, None, ingestion_dataset.id, "already")
+    with test_client.application.test_request_context():
+        record_buffer.submit(DATASET_VIEW, None, ingestion_dataset.id, "b1")
+        record_buffer.submit(DATASET_VIEW, None, ingestion_dataset.id, "b1")
+        record_buffer.submit(DATASET_VIEW, None, ingestion_dataset.id, "b2")
+
+    assert [event.cookie for event in record_buffer.pending()] == ["already", "b1", "b2"]
+    assert [event.cookie for event in _spooled(async_buffer)] == ["already", "b1", "b2"]
+    assert _views(ingestion_dataset) == 0
+
+    # Una visita ya registrada por otra vía no se duplica al volcar el lote
+    db.session.add(DSViewRecord(dataset_id=ingestion_dataset.id, view_cookie="already"))
+    db.session.commit()
+    assert record_buffer.flush() == 2
+    db.session.expire_all()
+    assert _views(ingestion_dataset) == 3 and _views(ingestion_dataset, "already") == 1
+    assert record_buffer.pending() == [] and _spooled(async_buffer) == []
+    assert db.session.get(PlatformCounter, "dataset_views").value == DSViewRecord.query.count()
+
+
+def test_failed_flush_keeps_events_for_the_next_one(test_client, ingestion_dataset, async_buffer):
+    with test_client.application.test_request_context():
+        record_buffer.submit(DATASET_VIEW, None, ingestion_dataset.id, "retry")
+    with patch("app.modules.dataset.ingestion.write_records", side_effect=RuntimeError("db down")):
+        assert record_buffer.flush() == 0
+    assert [event.cookie for event in record_buffer.pending()] == ["retry"]
+    assert [event.cookie for event in _spooled(async_buffer)] == ["retry"]
+
+    assert record_buffer.flush() == 1
+    db.session.expire_all()
+    assert _views(ingestion_dataset, "retry") == 1
+
+
+def test_full_buffer_drops_new_events(test_client, ingestion_dataset, async_buffer):
+    test_client.application.config["RECORDS_QUEUE_SIZE"] = 2
+    with test_client.application.test_request_context():
+        for cookie in ("q1", "q2", "q3"):
+            record_buffer.submit(DATASET_VIEW, None, ingestion_dataset.id, cookie)
+    assert [event.cookie for event in record_buffer.pending()] == ["q1", "q2"]
+    assert record_buffer.dropped == 1
+
+
+def test_spool_of_a_previous_run_is_replayed(test_client, ingestion_dataset, async_buffer):
+    event = RecordEvent(DATASET_VIEW, None, ingestion_dataset.id, "crashed", datetime.now(timezone.utc))
+    with open(os.path.join(async_buffer, f"records-{os.getpid()}.ndjson"), "w", encoding="utf-8") as spool:
+        spool.write(event.to_line())
+        spool.write("not json\n")
+
+    with test_client.application.test_request_context():
+        record_buffer.submit(DATASET_VIEW, None, ingestion_dataset.id, "after-restart")
+    assert [e.cookie for e in record_buffer.pending()] == ["crashed", "after-restart"]
+    assert record_buffer.flush() == 2
+    db.session.expire_all()
+    assert _views(ingestion_dataset, "crashed") == 1
+
+
+def test_routes_queue_views_and_downloads(test_client, ingestion_dataset, async_buffer):
+    test_client.set_cookie("download_cookie", "route-cookie")
+    with patch("app.modules.dataset.routes.dataset_service.open_download_archive", return_value=(None, iter([b""]))):
+        assert test_client.get(f"/dataset/download/{ingestion_dataset.id}").status_code == 200
+    assert [(e.kind, e.cookie) for e in record_buffer.pending()] == [(DATASET_DOWNLOAD, "route-cookie")]
+    assert DSDownloadRecord.query.filter_by(download_cookie="route-cookie").count() == 0
@@ -0,0 +1,257 @@
+"""
+Tests for the daily rollups of view / download records, the trending feed and the sparklines.
+"""
+
+from datetime import datetime, time, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Query
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.ingestion import DATASET_DOWNLOAD, DATASET_VIEW
+from app.modules.dataset.models import (
+    DataSetConcept,
+    DSDownloadRecord,
+    DSViewRecord,
+    RecordDailyRollup,
+    RecordDailySketch,
+    RecordRollupState,
+)
+from app.modules.dataset.services import RecordRollupService
+from app.modules.public.repositories import PlatformCounterRepository
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+def _at(days_ago: int) -> datetime:
+    return datetime.combine(TODAY - timedelta(days=days_ago), time(12, 0))
+
+
+def _views(dataset, days_ago, n, prefix="v"):
+    for i in range(n):
+        db.session.add(
+            DSViewRecord(dataset_id=dataset.id, view_cookie=f"{prefix}{days_ago}-{i}", view_date=_at(days_ago))
+        )
+
+
+def _downloads(dataset, days_ago, n):
+    for i in range(n):
+        db.session.add(
+            DSDownloadRecord(dataset_id=dataset.id, download_cookie=f"d{days_ago}-{i}", download_date=_at(days_ago))
+        )
+
+
+@pytest.fixture(scope="module")
+def rollup_datasets(test_client):
+    user = create_user("rollups@example.com")
+    concept = DataSetConcept(conceptual_doi="10.1234/rollups-concept")
+    db.session.add(concept)
+    db.session.flush()
+    datasets = {}
+    for name, doi in (("fresh", "10.1234/fresh"), ("stale", "10.1234/stale"), ("private", None)):
+        datasets[name] = create_dataset(
+            user,
+            f"Rollup {name}",
+            "R",
+            dataset_doi=doi,
+            tags="r",
+            ds_concept_id=concept.id if name == "fresh" else None,
+        )
+
+    _views(datasets["fresh"], 0, 2)
+    _downloads(datasets["fresh"], 1, 3)
+    _views(datasets["stale"], 6, 10)
+    _views(datasets["stale"], 40, 50)
+    _views(datasets["private"], 0, 30)
+    db.session.commit()
+    return datasets
+
+
+def _rollups(kind, dataset):
+    return {
+        rollup.day: rollup.count
+        for rollup in RecordDailyRollup.query.filter_by(kind=kind, object_id=dataset.id).order_by(RecordDailyRollup.day)
+    }
+
+
+def test_run_aggregates_only_new_records(test_client, rollup_datasets):
+    fresh, stale = rollup_datasets["fresh"], rollup_datasets["stale"]
+    with test_client.application.test_request_context():
+        service = RecordRollupService()
+        # Lotes pequeños: varias transacciones por tabla, mismo resultado
+        assert service.run(max_rows=7) == {DATASET_VIEW: 92, DATASET_DOWNLOAD: 3}
+        assert _rollups(DATASET_VIEW, stale) == {TODAY - timedelta(days=40): 50, TODAY - timedelta(days=6): 10}
+        assert _rollups(DATASET_DOWNLOAD, fresh) == {TODAY - timedelta(days=1): 3}
+        state = db.session.get(RecordRollupState, DATASET_VIEW)
+        assert state.last_record_id == db.session.query(db.func.max(DSViewRecord.id)).scalar()
+
+        assert service.run() == {}
+
+        _views(fresh, 0, 4, prefix="late")
+        db.session.commit()
+        assert service.run() == {DATASET_VIEW: 4}
+        assert _rollups(DATASET_VIEW, fresh) == {TODAY: 6}
+
+
+def test_trending_decays_and_skips_unpublished(test_client, rollup_datasets):
+    with test_client.application.test_request_context():
+        service = RecordRollupService()
+        service.run()
+        trending = service.trending(days=14)
+        assert [item["title"] for item in trending] == ["Rollup fresh", "Rollup stale"]
+        assert trending[0]["views"] == 6 and trending[0]["downloads"] == 3
+        # Las visitas de hace 40 días quedan fuera de la ventana
+        assert trending[1]["views"] == 10
+        assert [item["title"] for item in service.trending(days=3)] == ["Rollup fresh"]
+        assert len(service.trending(days=14, limit=1)) == 1
+
+
+def test_sparkline_is_zero_filled(test_client, rollup_datasets):
+    with test_client.application.test_request_context():
+        service = RecordRollupService()
+        service.run()
+        activity = service.sparkline(rollup_datasets["fresh"].id, days=7)
+    assert activity["days"][-1] == TODAY.isoformat() and len(activity["days"]) == 7
+    assert activity["views"] == [0, 0, 0, 0, 0, 0, 6]
+    assert activity["downloads"] == [0, 0, 0, 0, 0, 3, 0]
+
+
+def test_trending_and_activity_routes(test_client, rollup_datasets):
+    data = test_client.get("/dataset/trending?days=14&limit=5").get_json()
+    assert data["days"] == 14
+    assert [item["id"] for item in data["datasets"]] == [rollup_datasets["fresh"].id, rollup_datasets["stale"].id]
+
+    data = test_client.get(f"/dataset/{rollup_datasets['stale'].id}/activity?days=10").get_json()
+    assert sum(data["views"]) == 10 and len(data["days"]) == 10
+    assert test_client.get("/dataset/999999/activity").status_code == 404
+
+
+def test_dataset_page_shows_activity(test_client, rollup_datasets):
+    with test_client.application.test_request_context():
+        RecordRollupService().run()
+    response = test_client.get("/doi/10.1234/fresh/")
+    assert response.status_code == 200
+    assert 'id="dataset-activity"' in response.get_data(as_text=True)
+
+
+def test_run_waits_for_concurrent_inserts_to_settle(test_client, rollup_datasets):
+    private = rollup_datasets["private"]
+    config = test_client.application.config
+    with test_client.application.test_request_context():
+        service = RecordRollupService()
+        service.run()
+        config["ROLLUP_SETTLE_SECONDS"] = 60
+        try:
+            _views(private, 0, 2, prefix="settle")
+            db.session.commit()
+            # Recién observados: otro proceso podría tener aún sin confirmar un lote con ids menores
+            assert service.run() == {}
+            _views(private, 0, 1, prefix="later")
+            db.session.commit()
+            state = db.session.get(RecordRollupState, DATASET_VIEW)
+            state.observed_at -= timedelta(seconds=61)
+            db.session.commit()
+            assert service.run() == {DATASET_VIEW: 2}
+        finally:
+            config["ROLLUP_SETTLE_SECONDS"] = 0
+        assert service.run() == {DATASET_VIEW: 1}
+
+
+def test_lock_state_tolerates_a_concurrent_first_run(test_client, rollup_datasets):
+    with test_client.application.test_request_context():
+        repository = RecordRollupService().repository
+        last_record_id = repository.lock_state(DATASET_VIEW).last_record_id
+        db.session.commit()
+        # Otro proceso inserta la fila entre la consulta y el INSERT
+        with patch.object(Query, "first", return_value=None):
+            assert repository.lock_state(DATASET_VIEW).last_record_id == last_record_id
+        db.session.commit()
+
+
+def test_unique_visitors_count_a_signed_in_user_once(test_client, rollup_datasets):
+    stale = rollup_datasets["stale"]
+    user = User.query.filter_by(email="rollups@example.com").one()
+    for cookie in ("laptop", "phone"):
+        db.session.add(DSViewRecord(dataset_id=stale.id, user_id=user.id, view_cookie=cookie, view_date=_at(2)))
+    db.session.commit()
+    with test_client.application.test_request_context():
+        service = RecordRollupService()
+        service.run()
+        assert service.unique_visitors(stale.id, days=10) == {"views": 11, "downloads": 0}
+        assert service.unique_visitors(rollup_datasets["fresh"].id, days=7)["downloads"] == 3
+
+    data = test_client.get(f"/dataset/{stale.id}/activity?days=10").get_json()
+    assert sum(data["views"]) == 12 and data["unique_views"] == 11 and data["unique_downloads"] == 0
+
+
+def test_retention_prunes_only_rolled_up_records(test_client, rollup_datasets):
+    stale = rollup_datasets["stale"]
+    config = test_client.application.config
+    with test_client.application.test_request_context():
+        service = RecordRollupService()
+        service.run()
+        counters = PlatformCounterRepository()
+        views_before = counters.exact("dataset_views")
+        config["RECORDS_RETENTION_DAYS"] = 30
+        try:
+            # Un registro antiguo que aún no está agregado no se purga
+            db.session.add(DSViewRecord(dataset_id=stale.id, view_cookie="backfill", view_date=_at(45)))
+            db.session.commit()
+            assert service.prune() == {DATASET_VIEW: 50, DATASET_DOWNLOAD: 0}
+            assert DSViewRecord.query.filter_by(view_cookie="backfill").count() == 1
+            assert counters.exact("dataset_views") == views_before + 1
+
+            _views(stale, 0, 1, prefix="recent")
+            db.session.commit()
+            # run() solo agrega; la purga la hace el hilo de fondo junto con la agregación
+            service.run()
+            assert DSViewRecord.query.filter_by(view_cookie="backfill").count() == 1
+            assert service.run_if_due()
+            assert DSViewRecord.query.filter(DSViewRecord.view_date < _at(30)).count() == 0
+        finally:
+            config["RECORDS_RETENTION_DAYS"] = 0
+        assert counters.exact("dataset_views") == views_before + 2
+        assert _rollups(DATASET_VIEW, stale)[TODAY - timedelta(days=40)] == 50
+        assert RecordDailySketch.query.filter_by(kind=DATASET_VIEW, object_id=stale.id).count() == 5
+        # 10 + 50 + 1 usuario + 2 visitantes nuevos: estimación con error relativo pequeño
+        assert service.unique_visitors(stale.id, days=50)["views"] == pytest.approx(63, rel=0.05)
+
+
+def test_prune_keeps_records_above_an_unsettled_mark(test_client, rollup_datasets):
+    fresh = rollup_datasets["fresh"]
+    config = test_client.application.config
+    with test_client.application.test_request_context():
+        service = RecordRollupService()
+        service.run()
+        config.update(RECORDS_RETENTION_DAYS=30, ROLLUP_SETTLE_SECONDS=60)
+        try:
+            db.session.add(DSViewRecord(dataset_id=fresh.id, view_cookie="in-flight", view_date=_at(60)))
+            db.session.commit()
+            assert service.run_if_due()
+            assert DSViewRecord.query.filter_by(view_cookie="in-flight").count() == 1
+        finally:
+            config.update(RECORDS_RETENTION_DAYS=0, ROLLUP_SETTLE_SECONDS=0)
+        assert service.run() == {DATASET_VIEW: 1}
+        assert _rollups(DATASET_VIEW, fresh)[TODAY - timedelta(days=60)] == 1
+
+
+def test_trending_is_cached_until_the_next_run(test_client, rollup_datasets):
+    with (
+        test_client.application.test_request_context(),
+        patch.dict(test_client.application.config, {"TRENDING_CACHE_TTL": 60}),
+    ):
+        service = RecordRollupService()
+        service.run()
+        first = service.trending(days=14, limit=1)
+        assert [item["title"] for item in first] == ["Rollup fresh"]
+        with patch.object(service.repository, "daily_counts") as daily_counts:
+            assert service.trending(days=14, limit=1) == first
+            assert not daily_counts.called
+
+        _views(rollup_datasets["stale"], 0, 20, prefix="burst")
+        db.session.commit()
+        service.run()
+        assert [item["title"] for item in service.trending(days=14, limit=1)] == ["Rollup stale"]
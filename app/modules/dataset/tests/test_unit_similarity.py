@@ -0,0 +1,151 @@
+"""
+Tests for the MinHash / LSH "similar datasets" panel.
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.models import (
+    Author,
+    DataSetConcept,
+    DataSetSignature,
+    DataSetSignatureBucket,
+    PublicationType,
+)
+from app.modules.dataset.services import DataSetSimilarityService
+from app.modules.dataset.similarity import BANDS, band_buckets, dataset_features, estimate_similarity, minhash
+from app.modules.dataset.validator import REQUIRED_COLUMNS
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
+
+HEADERS = "DATE,BASEL_temp_max,BASEL_temp_min,BASEL_precipitation,DE_BILT_temp_max\n"
+
+
+def _dataset(user, title, tags, authors, concept=None, is_latest=True, doi=None):
+    dataset = create_dataset(
+        user,
+        title,
+        "Similarity",
+        authors=[Author(name=name) for name in authors],
+        tags=tags,
+        dataset_doi=doi,
+        ds_concept_id=concept,
+        is_latest=is_latest,
+    )
+    db.session.commit()
+    return dataset
+
+
+def _attach_csv(dataset, working_dir, content):
+    fm_meta = FMMetaData(filename="data.csv", title="csv", description="csv", publication_type=PublicationType.NONE)
+    db.session.add(fm_meta)
+    db.session.flush()
+    fm = FeatureModel(data_set_id=dataset.id, fm_meta_data_id=fm_meta.id)
+    db.session.add(fm)
+    db.session.flush()
+    folder = working_dir / "uploads" / f"user_{dataset.user_id}" / f"dataset_{dataset.id}"
+    folder.mkdir(parents=True)
+    (folder / "data.csv").write_text(content)
+    db.session.add(Hubfile(name="data.csv", checksum="x", size=len(content), feature_model_id=fm.id))
+    db.session.commit()
+
+
+@pytest.fixture(scope="module")
+def similar_datasets(test_client, tmp_path_factory):
+    working_dir = tmp_path_factory.mktemp("similarity")
+    user = create_user("similarity@example.com")
+    db.session.commit()
+
+    concept = DataSetConcept(conceptual_doi="10.1234/similar-concept")
+    db.session.add(concept)
+    db.session.commit()
+
+    tags = "rain, alps, temperature, daily"
+    authors = ["Ana Pérez", "Luis Gómez"]
+    base = _dataset(user, "Alpine rain", tags, authors, concept=concept.id, doi="10.1234/similar-base")
+    twin = _dataset(user, "Alpine rain mirror", tags, authors)
+    close = _dataset(user, "Alpine rain extended", tags + ", snow", authors)
+    unrelated = _dataset(user, "Desert wind", "wind, sahara", ["Someone Else"])
+    old_twin = _dataset(user, "Alpine rain old", tags, authors, is_latest=False)
+    same_concept = _dataset(
+        user, "Alpine rain v2", tags, authors, concept=concept.id, is_latest=False, doi="10.1234/similar-v2"
+    )
+
+    with patch.dict(os.environ, {"WORKING_DIR": str(working_dir)}):
+        for dataset in (base, twin, close):
+            _attach_csv(dataset, working_dir, HEADERS + "2020-01-01,1,2,3,4\n")
+        service = DataSetSimilarityService()
+        for dataset in (base, twin, close, unrelated, old_twin, same_concept):
+            service.compute_for_dataset(dataset)
+        yield {"base": base, "twin": twin, "close": close, "unrelated": unrelated, "old_twin": old_twin}
+
+
+def test_minhash_estimates_jaccard():
+    a = {f"feature-{i}" for i in range(100)}
+    b = {f"feature-{i}" for i in range(50, 150)}
+    assert minhash([]) is None
+    assert len(minhash(a)) == 256
+    assert minhash(a) == minhash(sorted(a))
+    assert estimate_similarity(minhash(a), minhash(a)) == 1.0
+    # Jaccard real 50/150; el error típico con 64 permutaciones es ~0.06
+    assert abs(estimate_similarity(minhash(a), minhash(b)) - 1 / 3) < 0.2
+    assert estimate_similarity(minhash(a), minhash({"other"})) < 0.1
+
+
+def test_identical_signatures_share_every_bucket():
+    signature = minhash({"tag:rain", "station:BASEL"})
+    assert band_buckets(signature) == band_buckets(bytes(signature))
+    assert [band for band, _ in band_buckets(signature)] == list(range(BANDS))
+
+
+def test_dataset_features_are_prefixed_and_normalised():
+    features = dataset_features(
+        ["DATE", "BASEL_temp_max", "BASEL_snow_depth "], ["basel"], ["Rain ", "rain"], ["Ana  Pérez"]
+    )
+    assert features == {"column:basel_snow_depth", "station:BASEL", "tag:rain", "author:ana pérez"}
+
+
+def test_mandatory_columns_are_not_features():
+    # Todo dataset válido tiene la fecha y las columnas obligatorias: no distinguen a nadie
+    headers = ["fecha"] + [f"BASEL{token}" for token in REQUIRED_COLUMNS]
+    assert dataset_features(headers, [], [], []) == set()
+
+
+def test_signature_stored_with_buckets(test_client, similar_datasets):
+    record = db.session.get(DataSetSignature, similar_datasets["base"].id)
+    # 2 estaciones, 4 etiquetas y 2 autores; las columnas obligatorias no cuentan
+    assert record.feature_count == 8
+    assert DataSetSignatureBucket.query.filter_by(data_set_id=record.data_set_id).count() == BANDS
+
+
+def test_similar_returns_latest_datasets_of_other_concepts(test_client, similar_datasets):
+    with test_client.application.test_request_context():
+        similar = DataSetSimilarityService().similar(similar_datasets["base"])
+    titles = [dataset.ds_meta_data.title for dataset, _ in similar]
+    assert titles[:2] == ["Alpine rain mirror", "Alpine rain extended"]
+    assert similar[0][1] == 1.0
+    assert "Desert wind" not in titles
+    assert "Alpine rain old" not in titles and "Alpine rain v2" not in titles
+
+
+def test_signature_is_not_computed_on_view(test_client, similar_datasets):
+    db.session.delete(db.session.get(DataSetSignature, similar_datasets["twin"].id))
+    db.session.commit()
+    with test_client.application.test_request_context():
+        assert DataSetSimilarityService().similar(similar_datasets["twin"]) == []
+        assert db.session.get(DataSetSignature, similar_datasets["twin"].id) is None
+        DataSetSimilarityService().compute_for_dataset(similar_datasets["twin"])
+        similar = DataSetSimilarityService().similar(similar_datasets["twin"])
+    assert similar and similar[0][0].id == similar_datasets["base"].id
+
+
+def test_view_page_shows_similar_panel(test_client, similar_datasets):
+    response = test_client.get("/doi/10.1234/similar-base/")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert 'id="similar-datasets"' in body
+    assert "Alpine rain mirror" in body
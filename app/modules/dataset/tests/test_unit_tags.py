@@ -0,0 +1,102 @@
+"""
+Tests for the normalised tag table kept in sync with DSMetaData.tags.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.models import DSMetaData, PublicationType, Tag, _existing_tags, split_tags
+from app.modules.dataset.repositories import DataSetRepository
+from app.modules.explore.services import ExploreService
+
+
+def _metadata(tags):
+    meta = DSMetaData(title="Tagged", description="Tags", publication_type=PublicationType.OTHER, tags=tags)
+    db.session.add(meta)
+    db.session.commit()
+    return meta
+
+
+@pytest.fixture(scope="module")
+def tag_user(test_client):
+    user = create_user("tags@example.com")
+    db.session.commit()
+    return user
+
+
+def test_split_tags_normalises_and_deduplicates():
+    assert split_tags(" Weather,  North   America ,weather,,") == ["weather", "north america"]
+    assert split_tags(["A", " a ", "", None]) == ["a"]
+    assert split_tags(None) == []
+
+
+def test_tags_are_synced_on_insert(test_client):
+    meta = _metadata("Solar, wind-speed, solar")
+    assert sorted(tag.name for tag in meta.normalized_tags) == ["solar", "wind-speed"]
+
+
+def test_tags_are_shared_and_resynced_on_update(test_client):
+    first = _metadata("shared_tag_abc, only_first")
+    second = _metadata("Shared_Tag_ABC")
+    assert Tag.query.filter_by(name="shared_tag_abc").count() == 1
+    assert second.normalized_tags[0] is first.normalized_tags[0]
+
+    first.tags = "only_first, replaced"
+    db.session.commit()
+    assert sorted(tag.name for tag in first.normalized_tags) == ["only_first", "replaced"]
+
+    first.tags = None
+    db.session.commit()
+    assert first.normalized_tags == []
+
+
+def test_accented_variants_share_a_tag(test_client):
+    assert split_tags("Café, cafe, CAFÉ ,naïve") == ["cafe", "naive"]
+    first = _metadata("Café_Tag_Ñ")
+    second = _metadata("cafe_tag_n")
+    assert [tag.name for tag in first.normalized_tags] == ["cafe_tag_n"]
+    assert second.normalized_tags[0] is first.normalized_tags[0]
+
+
+def test_tag_created_concurrently_is_reused(test_client):
+    # Otra petición confirma el tag entre nuestra consulta y nuestro INSERT
+    db.session.execute(Tag.__table__.insert().values(name="raced_tag_uvw"))
+    db.session.commit()
+    lookups = []
+
+    def stale_then_real(session, names, lock=False):
+        lookups.append(lock)
+        return {} if len(lookups) == 1 else _existing_tags(session, names, lock)
+
+    with patch("app.modules.dataset.models._existing_tags", side_effect=stale_then_real):
+        meta = _metadata("raced_tag_uvw")
+
+    assert lookups == [False, True]
+    assert [tag.name for tag in meta.normalized_tags] == ["raced_tag_uvw"]
+    assert Tag.query.filter_by(name="raced_tag_uvw").count() == 1
+
+
+def test_repository_search_uses_exact_tags(test_client, tag_user):
+    dataset = create_dataset(tag_user, "Tagged", "Tags", tags="hydrology_xyz, lakes")
+    create_dataset(tag_user, "Tagged", "Tags", tags="hydrology_xyz_extra")
+    db.session.commit()
+
+    results = DataSetRepository().search(tags=["Hydrology_XYZ", ""])
+    assert [d.id for d in results] == [dataset.id]
+
+
+def test_popular_tags_endpoint(test_client, tag_user):
+    for _ in range(3):
+        create_dataset(tag_user, "Tagged", "Tags", tags="popular_tag_qrs")
+    db.session.commit()
+
+    with test_client.application.test_request_context():
+        counts = {t["name"]: t["count"] for t in ExploreService().popular_tags(500)}
+    assert counts["popular_tag_qrs"] == 3
+
+    response = test_client.get("/explore/tags?limit=1")
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
@@ -2,7 +2,7 @@ import csv
 
 import pytest
 
-from app.modules.dataset.validator import REQUIRED_COLUMNS, validate_dataset_package
+from app.modules.dataset.validator import REQUIRED_COLUMNS, validate_csv_rows, validate_dataset_package
 
 # Fixture para crear estructura básica
 
@@ -159,3 +159,139 @@ def test_validate_missing_columns_logic(base_dataset_structure):
     err_msg = str(excinfo.value)
     assert missing[0] in err_msg
     assert missing[1] in err_msg
+
+
+# --- BLOQUE 5: Validación de filas (streaming) ---
+
+
+def _valid_row(day="2023-01-01"):
+    # temp_mean, temp_max, temp_min, cloud_cover, global_radiation, humidity,
+    # pressure, precipitation, sunshine, wind_gust, wind_speed
+    return [day, "10", "15", "5", "4", "120", "60", "1013", "0.5", "8", "12", "4"]
+
+
+def test_validate_rows_accepts_valid_data_and_missing_values(base_dataset_structure):
+    d, readme = base_dataset_structure
+    csv_file = d / "rows.csv"
+    missing_row = _valid_row("2023-01-03")
+    missing_row[6] = ""
+    missing_row[7] = "NA"
+    create_csv(csv_file, ["DATE"] + REQUIRED_COLUMNS, [_valid_row("2023-01-01"), _valid_row("20230102"), missing_row])
+
+    validate_dataset_package([str(csv_file), str(readme)], REQUIRED_COLUMNS)
+
+
+def test_validate_rows_reports_non_numeric_and_out_of_range(base_dataset_structure):
+    d, readme = base_dataset_structure
+    csv_file = d / "bad_values.csv"
+    bad = _valid_row("2023-01-02")
+    bad[1] = "warm"  # _temp_mean
+    bad[6] = "140"  # _humidity
+    create_csv(csv_file, ["DATE"] + REQUIRED_COLUMNS, [_valid_row(), bad])
+
+    with pytest.raises(ValueError) as excinfo:
+        validate_dataset_package([str(csv_file), str(readme)], REQUIRED_COLUMNS)
+
+    err_msg = str(excinfo.value)
+    assert "'_temp_mean': fila 3: valor no numérico 'warm'" in err_msg
+    assert "'_humidity': fila 3: valor 140 fuera de rango" in err_msg
+
+
+def test_validate_rows_reports_unparseable_and_non_monotonic_dates(base_dataset_structure):
+    d, readme = base_dataset_structure
+    csv_file = d / "bad_dates.csv"
+    create_csv(
+        csv_file,
+        ["DATE"] + REQUIRED_COLUMNS,
+        [_valid_row("2023-01-05"), _valid_row("2023-01-04"), _valid_row("not-a-date")],
+        delimiter=";",
+    )
+
+    with pytest.raises(ValueError) as excinfo:
+        validate_dataset_package([str(csv_file), str(readme)], REQUIRED_COLUMNS)
+
+    err_msg = str(excinfo.value)
+    assert "orden no monótono" in err_msg
+    assert "fecha no válida 'not-a-date'" in err_msg
+
+
+def test_validate_rows_caps_errors_per_column(tmp_path):
+    csv_file = tmp_path / "many_errors.csv"
+    rows = []
+    for i in range(20):
+        row = _valid_row(f"2023-01-{i + 1:02d}")
+        row[8] = "-5"  # _precipitation
+        rows.append(row)
+    create_csv(csv_file, ["DATE"] + REQUIRED_COLUMNS, rows)
+    headers = ["DATE"] + REQUIRED_COLUMNS
+
+    errors = validate_csv_rows(
+        str(csv_file),
+        headers,
+        {i + 1: col for i, col in enumerate(REQUIRED_COLUMNS)},
+        max_errors_per_column=3,
+        batch_size=4,
+    )
+
+    assert len(errors) == 1
+    assert errors[0].count("fuera de rango") == 3
+    assert "hay más errores" in errors[0]
+
+
+def test_validate_rows_can_be_disabled(base_dataset_structure):
+    d, readme = base_dataset_structure
+    csv_file = d / "skip_rows.csv"
+    bad = _valid_row()
+    bad[1] = "warm"
+    create_csv(csv_file, ["DATE"] + REQUIRED_COLUMNS, [bad])
+
+    validate_dataset_package([str(csv_file), str(readme)], REQUIRED_COLUMNS, check_rows=False)
+
+
+def test_validate_rows_fast_and_slow_paths_agree(tmp_path):
+    csv_file = tmp_path / "mixed.csv"
+    padded = _valid_row("2023-01-04")
+    padded[1] = " 10.5 "
+    padded[2] = "nan"
+    rows = [_valid_row("2023-01-01"), _valid_row("2023-01-02"), [""] * 12, _valid_row("2023-01-03"), padded]
+    rows += [_valid_row("2023-01-05"), _valid_row("2023-01-01"), _valid_row("2023-01-06")[:5]]
+    create_csv(csv_file, ["DATE"] + REQUIRED_COLUMNS, rows)
+    headers = ["DATE"] + REQUIRED_COLUMNS
+    numeric = {i + 1: col for i, col in enumerate(REQUIRED_COLUMNS)}
+
+    # Lotes de dos filas: unos bien formados (vía rápida) y otros con filas vacías o incompletas
+    errors = validate_csv_rows(str(csv_file), headers, numeric, batch_size=2)
+    assert errors == validate_csv_rows(str(csv_file), headers, numeric, batch_size=100)
+    assert len(errors) == 2
+    assert "fila 8: fecha 2023-01-01 anterior a la fila previa" in " ".join(errors)
+    assert "fila 9: 5 columnas, se esperaban 12" in " ".join(errors)
+
+
+def test_validate_rows_can_be_bounded(base_dataset_structure):
+    d, readme = base_dataset_structure
+    csv_file = d / "bounded.csv"
+    bad = _valid_row("2023-01-03")
+    bad[1] = "warm"
+    create_csv(csv_file, ["DATE"] + REQUIRED_COLUMNS, [_valid_row("2023-01-01"), _valid_row("2023-01-02"), bad])
+
+    assert validate_dataset_package([str(csv_file), str(readme)], REQUIRED_COLUMNS, max_rows=2) == [str(csv_file)]
+    with pytest.raises(ValueError):
+        validate_dataset_package([str(csv_file), str(readme)], REQUIRED_COLUMNS, max_rows=3)
+
+
+def test_validate_rows_can_skip_the_rows_already_checked(base_dataset_structure):
+    d, _ = base_dataset_structure
+    csv_file = d / "tail.csv"
+    bad = _valid_row("2023-01-03")
+    bad[1] = "warm"
+    rows = [_valid_row("2023-01-01"), _valid_row("2023-01-05"), bad]
+    headers = ["DATE"] + REQUIRED_COLUMNS
+    create_csv(csv_file, headers, rows)
+    numeric_columns = {i + 1: column for i, column in enumerate(REQUIRED_COLUMNS)}
+
+    errors = " ".join(validate_csv_rows(str(csv_file), headers, numeric_columns, skip_rows=2))
+
+    assert "fila 4: valor no numérico 'warm'" in errors
+    # El orden de fechas se comprueba también contra la última fila saltada
+    assert "fila 4: fecha 2023-01-03 anterior" in errors
+    assert validate_csv_rows(str(csv_file), headers, numeric_columns, skip_rows=3) == []
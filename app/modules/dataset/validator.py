@@ -1,7 +1,10 @@
 # app/modules/dataset/validators.py
 import csv
+import math
 import os
-from typing import List
+from datetime import date, datetime
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
 
 REQUIRED_COLUMNS = [
     "_temp_mean",
@@ -17,6 +20,264 @@ REQUIRED_COLUMNS = [
     "_wind_speed",
 ]
 
+# Physically plausible bounds per measurement (inclusive). They are deliberately
+# loose so that common unit conventions (e.g. cloud cover in oktas or %) pass.
+PLAUSIBLE_RANGES = {
+    "_temp_mean": (-90.0, 60.0),
+    "_temp_max": (-90.0, 60.0),
+    "_temp_min": (-90.0, 60.0),
+    "_cloud_cover": (0.0, 100.0),
+    "_global_radiation": (0.0, 1500.0),
+    "_humidity": (0.0, 100.0),
+    "_pressure": (0.0, 1100.0),
+    "_precipitation": (0.0, 2000.0),
+    "_sunshine": (0.0, 24.0),
+    "_wind_gust": (0.0, 120.0),
+    "_wind_speed": (0.0, 120.0),
+}
+
+DATE_HEADERS = ("date", "timestamp", "time", "fecha")
+DATE_FORMATS = ("%Y-%m-%d", "%Y%m%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m", "%Y")
+MISSING_VALUES = frozenset(["", "na", "nan", "n/a", "null", "none", "-"])
+ROW_BATCH_SIZE = 50_000
+# Filas de cada CSV que se validan dentro de la petición de subida; el resto, en segundo plano
+CSV_VALIDATION_MAX_ROWS = 200_000
+MAX_ERRORS_PER_COLUMN = 5
+
+
+def _sniff_delimiter(path: str, nbytes_sample: int = 8192) -> str:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as fh:
+            return csv.Sniffer().sniff(fh.read(nbytes_sample)).delimiter
+    except Exception:
+        return ","
+
+
+def parse_date(value: str) -> Optional[date]:
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def detect_date_format(value: str) -> Optional[str]:
+    """First of DATE_FORMATS that parses ``value``."""
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            datetime.strptime(value, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+
+def date_parser(fmt: Optional[str]) -> Callable[[str], Optional[date]]:
+    """
+    ``parse_date`` specialised to the format detected in a column: cells in that format take one
+    parse (``date.fromisoformat`` for ISO dates), anything else still falls back to every format.
+    """
+    if fmt is None:
+        return parse_date
+    if fmt == "%Y-%m-%d":
+
+        def parse(value: str) -> Optional[date]:
+            if len(value) == 10 and value[4] == "-":
+                try:
+                    return date.fromisoformat(value)
+                except ValueError:
+                    pass
+            return parse_date(value)
+
+        return parse
+
+    def parse(value: str) -> Optional[date]:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            return parse_date(value)
+
+    return parse
+
+
+def _find_date_column(headers: List[str]) -> Optional[int]:
+    for i, h in enumerate(headers):
+        if h.strip().lower() in DATE_HEADERS:
+            return i
+    for i, h in enumerate(headers):
+        if "date" in h.lower():
+            return i
+    return None
+
+
+def validate_csv_rows(
+    path: str,
+    headers: List[str],
+    numeric_columns: Dict[int, str],
+    max_errors_per_column: int = MAX_ERRORS_PER_COLUMN,
+    batch_size: int = ROW_BATCH_SIZE,
+    max_rows: Optional[int] = None,
+    skip_rows: int = 0,
+) -> List[str]:
+    """
+    Stream the data rows of a CSV and check them column by column.
+    - the date column must be parseable and non-decreasing
+    - every column in ``numeric_columns`` (index -> required token) must be numeric
+      and inside PLAUSIBLE_RANGES; empty / NA cells count as missing values
+    Rows are read in batches of ``batch_size`` so memory stays bounded, and only the
+    first ``max_errors_per_column`` errors of each column are reported. With ``max_rows``
+    only the first rows are checked; with ``skip_rows`` the first rows are not (the date
+    order is still checked against the last skipped row).
+    """
+    return _validate_rows(path, headers, numeric_columns, max_errors_per_column, batch_size, max_rows, skip_rows)[0]
+
+
+def _validate_rows(
+    path: str,
+    headers: List[str],
+    numeric_columns: Dict[int, str],
+    max_errors_per_column: int = MAX_ERRORS_PER_COLUMN,
+    batch_size: int = ROW_BATCH_SIZE,
+    max_rows: Optional[int] = None,
+    skip_rows: int = 0,
+) -> Tuple[List[str], bool]:
+    """``validate_csv_rows`` plus whether rows were left unchecked because of ``max_rows``."""
+    name = os.path.basename(path)
+    date_idx = _find_date_column(headers)
+    ncols = len(headers)
+    errors: Dict[str, List[str]] = {}
+    error_counts: Dict[str, int] = {}
+
+    def report(column: str, message: str):
+        error_counts[column] = error_counts.get(column, 0) + 1
+        if error_counts[column] <= max_errors_per_column:
+            errors.setdefault(column, []).append(message)
+
+    bounds = {idx: PLAUSIBLE_RANGES.get(token) for idx, token in numeric_columns.items()}
+    previous_date = None
+    parse = date_format = None
+    first_row = 2  # row 1 is the header
+
+    truncated = False
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as fh:
+        rows_reader = reader = csv.reader(fh, delimiter=_sniff_delimiter(path))
+        next(reader, None)
+        if skip_rows:
+            last = None
+            for last in islice(reader, skip_rows):
+                pass
+            first_row += skip_rows
+            if last is not None and date_idx is not None and len(last) > date_idx:
+                previous_date = parse_date(last[date_idx])
+        if max_rows is not None:
+            reader = islice(reader, max_rows)
+        while True:
+            batch = list(islice(reader, batch_size))
+            if not batch:
+                break
+
+            columns = None
+            if len(set(map(len, batch))) == 1 and len(batch[0]) == ncols:
+                # Lote bien formado (mismo número de columnas, sin filas en blanco): sin bucle por fila
+                columns = list(zip(*batch))
+                row_numbers = range(first_row, first_row + len(batch))
+                if not all(map(str.strip, columns[0])):
+                    columns = None
+            if columns is None:
+                rows = []
+                row_numbers = []
+                for offset, row in enumerate(batch):
+                    if not row or (not row[0].strip() and not "".join(row).strip()):
+                        continue
+                    if len(row) != ncols:
+                        report("(filas)", f"fila {first_row + offset}: {len(row)} columnas, se esperaban {ncols}")
+                        continue
+                    rows.append(row)
+                    row_numbers.append(first_row + offset)
+                columns = list(zip(*rows)) if rows else None
+            first_row += len(batch)
+            if columns is None:
+                continue
+
+            if date_idx is not None:
+                column = headers[date_idx]
+                cells = columns[date_idx]
+                if parse is None:
+                    # El formato se detecta una vez por fichero, no en cada celda
+                    date_format = detect_date_format(cells[0])
+                    parse = date_parser(date_format)
+                parsed_dates = None
+                if date_format == "%Y-%m-%d":
+                    try:
+                        parsed_dates = list(map(date.fromisoformat, cells))
+                    except ValueError:
+                        pass
+                if (
+                    parsed_dates is not None
+                    and (previous_date is None or previous_date <= parsed_dates[0])
+                    and parsed_dates == sorted(parsed_dates)
+                ):
+                    previous_date = parsed_dates[-1]
+                else:
+                    for row_number, raw in zip(row_numbers, cells):
+                        parsed = parse(raw)
+                        if parsed is None:
+                            report(column, f"fila {row_number}: fecha no válida '{raw}'")
+                            continue
+                        if previous_date is not None and parsed < previous_date:
+                            report(
+                                column, f"fila {row_number}: fecha {raw} anterior a la fila previa (orden no monótono)"
+                            )
+                        previous_date = parsed
+
+            for idx, limits in bounds.items():
+                column = headers[idx]
+                if error_counts.get(column, 0) > max_errors_per_column:
+                    continue
+                low, high = limits or (-math.inf, math.inf)
+                try:
+                    # Caso habitual, columna entera válida: se convierte y comprueba en C, sin bucle por celda
+                    numbers = list(map(float, columns[idx]))
+                    if low <= min(numbers) and max(numbers) <= high:
+                        continue
+                except ValueError:
+                    pass
+                for row_number, raw in zip(row_numbers, columns[idx]):
+                    # float() ya ignora los espacios; solo lo que no es número se compara con MISSING_VALUES
+                    try:
+                        number = float(raw)
+                    except ValueError:
+                        if raw.strip().lower() not in MISSING_VALUES:
+                            report(column, f"fila {row_number}: valor no numérico '{raw}'")
+                        continue
+                    if not (low <= number <= high) and number == number:
+                        report(column, f"fila {row_number}: valor {raw.strip()} fuera de rango [{low}, {high}]")
+
+        if max_rows is not None:
+            truncated = next(rows_reader, None) is not None
+
+    messages = []
+    for column, column_errors in errors.items():
+        detail = "; ".join(column_errors)
+        if error_counts[column] > len(column_errors):
+            detail += " (hay más errores en esta columna)"
+        messages.append(f"Datos no válidos en '{name}', columna '{column}': {detail}")
+    return messages, truncated
+
+
+def numeric_columns_for(headers: List[str], required_columns: List[str] = REQUIRED_COLUMNS) -> Dict[int, str]:
+    """Index -> required token of every header matching a required column (the first token wins)."""
+    numeric_columns = {}
+    for req in required_columns:
+        matches = _match_required_in_headers(req, headers)
+        for i, h in enumerate(headers):
+            if h in matches and i not in numeric_columns:
+                numeric_columns[i] = req
+    return numeric_columns
+
 
 def _read_csv_headers_try(path: str, nbytes_sample: int = 8192) -> List[str]:
     try:
@@ -71,6 +332,38 @@ def _match_required_in_headers(required: str, headers: List[str]) -> List[str]:
     return matches
 
 
+def normalize_field(variable: str) -> Optional[str]:
+    """Map 'precipitation', '_precipitation' or 'PRECIPITATION' to its required token, if any."""
+    token = "_" + variable.strip().lower().lstrip("_")
+    return token if token in REQUIRED_COLUMNS else None
+
+
+def extract_station_columns(headers: List[str]) -> List[Tuple[str, str, str]]:
+    """
+    Return ``(station, required token, header)`` for every station-qualified measurement
+    header, e.g. 'BASEL_temp_mean' -> ('BASEL', '_temp_mean', 'BASEL_temp_mean').
+    Both STATION_token and token_STATION are recognised; unqualified headers are skipped.
+    Station ids are upper-cased.
+    """
+    tokens = sorted(REQUIRED_COLUMNS, key=len, reverse=True)
+    found = []
+    for header in headers:
+        lowered = header.lower()
+        for token in tokens:
+            bare = token.lstrip("_")
+            station = None
+            if lowered.endswith(token) and len(header) > len(token):
+                station = header[: -len(token)]
+            elif lowered.startswith(bare + "_"):
+                station = header[len(bare) + 1 :]
+            if station is not None:
+                station = station.strip(" _")
+                if station:
+                    found.append((station.upper(), token, header))
+                break
+    return found
+
+
 def validate_dataset_package(
     file_paths: List[str],
     required_columns: List[str] = REQUIRED_COLUMNS,
@@ -78,10 +371,14 @@ def validate_dataset_package(
     require_readme: bool = True,
     exact_match: bool = False,
     allow_empty: bool = False,
-) -> None:
+    check_rows: bool = True,
+    max_rows: Optional[int] = None,
+) -> List[str]:
     """
     Validate a package (list of file paths). Raises ValueError with readable message on failure.
     - Uses pattern-based matching: allowed headers like 'BASEL_temp_mean' satisfy '_temp_mean'
+    - With ``check_rows`` the data rows (the first ``max_rows`` if given) are streamed through ``validate_csv_rows``
+    Returns the paths of the CSVs with rows left unchecked because of ``max_rows``.
     """
     csv_paths = []
     readme_paths = []
@@ -97,6 +394,7 @@ def validate_dataset_package(
 
     errors = []
     warnings = []
+    partially_validated = []
 
     # cardinality checks
     # Si allow_empty=True, no exigir CSVs ni README (permite paquetes sin CSV)
@@ -139,6 +437,14 @@ def validate_dataset_package(
         if missing:
             errors.append(f"Faltan columnas requeridas en '{os.path.basename(csvp)}': {missing}")
 
+        if check_rows and not missing:
+            row_errors, truncated = _validate_rows(
+                csvp, headers, numeric_columns_for(headers, required_columns), max_rows=max_rows
+            )
+            errors.extend(row_errors)
+            if truncated:
+                partially_validated.append(csvp)
+
         if extra_headers:
             warnings.append(f"Columnas extra en '{os.path.basename(csvp)}': {extra_headers} (se permiten por patrón)")
 
@@ -152,4 +458,4 @@ def validate_dataset_package(
                 msg_lines.append(" - " + w)
         raise ValueError("\n".join(msg_lines))
 
-    return
+    return partially_validated
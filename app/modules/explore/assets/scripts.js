@@ -1,5 +1,7 @@
 document.addEventListener('DOMContentLoaded', () => {
     wireFilters();
+    wireInfiniteScroll();
+    wireSuggestions();
     const urlParams = new URLSearchParams(window.location.search);
     const q = urlParams.get('query') || '';
     const queryInput = document.getElementById('query');
@@ -14,6 +16,7 @@ function wireFilters() {
     const filtersRoot = document.getElementById('filters');
     const results = document.getElementById('results');
     const notFound = document.getElementById('results_not_found');
+    if (!filtersRoot || !results) return;
 
     const inputs = filtersRoot.querySelectorAll(
         '#query,#title,#author,#affiliation,#tags,#start_date,#end_date,#doi,#min_size,#max_size,#publication_type,[name="sorting"]'
@@ -45,7 +48,7 @@ function wireFilters() {
             sorting:          (document.querySelector('[name="sorting"]:checked')?.value || 'newest'),
         };
 
-        fetch('/explore', {
+        fetch('/explore/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -55,7 +58,7 @@ function wireFilters() {
         })
         .then(response => response.json())
         .then(data => {
-            const count = data.length;
+            const count = data.datasets.length;
             const label = count === 1 ? 'dataset' : 'datasets';
             const counter = document.getElementById('results_number');
             if (counter) counter.textContent = `${count} ${label} found`;
@@ -66,7 +69,7 @@ function wireFilters() {
                 return;
             }
 
-            data.forEach(dataset => {
+            data.datasets.forEach(dataset => {
                             let card = document.createElement('div');
                             card.className = 'col-12';
                             card.innerHTML = `
@@ -148,6 +151,87 @@ function wireFilters() {
     }
 }
 
+// Scroll infinito: cuando el centinela entra en pantalla se pide la siguiente
+// página (ya renderizada) con el cursor que devolvió la anterior
+function wireInfiniteScroll() {
+    const results = document.getElementById('results');
+    const sentinel = document.getElementById('results-sentinel');
+    if (!results || !sentinel || !('IntersectionObserver' in window)) return;
+
+    let loading = false;
+    const observer = new IntersectionObserver(entries => {
+        if (!entries.some(entry => entry.isIntersecting) || loading) return;
+        const cursor = sentinel.dataset.nextCursor;
+        if (!cursor) {
+            observer.disconnect();
+            sentinel.remove();
+            return;
+        }
+
+        loading = true;
+        const params = new URLSearchParams(window.location.search);
+        params.set('cursor', cursor);
+        params.set('format', 'html');
+        fetch('/explore/page?' + params.toString())
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                sentinel.dataset.nextCursor = response.headers.get('X-Next-Cursor') || '';
+                return response.text();
+            })
+            .then(html => {
+                results.insertAdjacentHTML('beforeend', html);
+                if (window.feather) feather.replace();
+                if (!sentinel.dataset.nextCursor) {
+                    observer.disconnect();
+                    sentinel.remove();
+                } else {
+                    // Si la página era corta el centinela sigue visible: volver a observarlo
+                    observer.unobserve(sentinel);
+                    observer.observe(sentinel);
+                }
+            })
+            .catch(error => console.error('Error loading more datasets:', error))
+            .finally(() => { loading = false; });
+    }, { rootMargin: '400px' });
+
+    // Con JS activo el enlace "Load more" sobra
+    const loadMore = document.getElementById('load-more');
+    if (loadMore) loadMore.style.display = 'none';
+    observer.observe(sentinel);
+}
+
+// Autocompletado del buscador lateral (GET /explore/suggest en cada pulsación)
+function wireSuggestions() {
+    const input = document.getElementById('explore-query');
+    const list = document.getElementById('explore-suggestions');
+    if (!input || !list) return;
+
+    let controller = null;
+    input.addEventListener('input', () => {
+        const q = input.value.trim();
+        if (controller) controller.abort();
+        if (!q) {
+            list.innerHTML = '';
+            return;
+        }
+        controller = new AbortController();
+        fetch('/explore/suggest?q=' + encodeURIComponent(q), { signal: controller.signal })
+            .then(response => response.json())
+            .then(data => {
+                list.innerHTML = '';
+                data.suggestions.forEach(suggestion => {
+                    const option = document.createElement('option');
+                    option.value = suggestion.text;
+                    option.label = suggestion.type;
+                    list.appendChild(option);
+                });
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') console.error('Error loading suggestions:', error);
+            });
+    });
+}
+
 function formatDate(dateString) {
     const d = new Date(dateString);
     return d.toLocaleString('en-US', {
@@ -0,0 +1,113 @@
+# app/modules/explore/content_search.py
+import operator
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Optional, Tuple
+
+from app.modules.dataset.columnar import MISSING_DATE, ColumnarFile, from_epoch_days, to_epoch_days, to_float32
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+_PREDICATE_RE = re.compile(
+    r"^\s*([A-Za-z0-9_ ]+?)\s*(>=|<=|!=|==|=|>|<)\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*$"
+)
+
+
+class Predicate:
+    """
+    ``column op value`` over the measurements of a CSV; ``column`` is a header or a required token.
+    ``value`` is rounded to float32 like the sidecar columns, so ``=40.1`` matches a stored 40.1.
+    """
+
+    __slots__ = ("column", "op", "value")
+
+    def __init__(self, column: str, op: str, value: float):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}'")
+        self.column = column
+        self.op = "=" if op == "==" else op
+        self.value = to_float32(float(value))
+
+    def __repr__(self):
+        return f"{self.column}{self.op}{self.value:g}"
+
+
+def parse_predicate(text: str) -> Predicate:
+    """Parse ``'_temp_max>40'`` / ``'BASEL_precipitation >= 10'``. Raises ValueError."""
+    match = _PREDICATE_RE.match(text or "")
+    if not match:
+        raise ValueError(f"Invalid predicate '{text}', expected e.g. '_temp_max>40'")
+    column, op, value = match.groups()
+    return Predicate(column.strip(), op, float(value))
+
+
+def row_bounds(dates, is_sorted: bool, start: Optional[date], end: Optional[date]):
+    """
+    Rows of a columnar date column within ``[start, end]``: a ``(first, last)`` slice when the
+    dates are sorted (two binary searches), otherwise None and the caller filters by date.
+    """
+    if start is None and end is None:
+        return 0, len(dates)
+    if not is_sorted:
+        return None
+    first = bisect_left(dates, to_epoch_days(start)) if start is not None else 0
+    last = bisect_right(dates, to_epoch_days(end)) if end is not None else len(dates)
+    return first, max(first, last)
+
+
+def scan_column(
+    columnar: ColumnarFile,
+    column: str,
+    predicate: Predicate,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    dates_sorted: bool = False,
+) -> Tuple[int, Optional[date]]:
+    """
+    Verify a predicate against one mapped column. Returns the number of matching rows in the
+    date range and the date of the first one. With sorted dates the range is a slice of
+    the mapped column, so only those pages are touched.
+    """
+    values = columnar.column(column)
+    dates = columnar.dates()
+    test = OPERATORS[predicate.op]
+    threshold = predicate.value
+
+    if dates is None:
+        if start or end:
+            return 0, None
+        bounds = (0, len(values))
+    else:
+        bounds = row_bounds(dates, dates_sorted, start, end)
+
+    count = 0
+    first_row = None
+    if bounds is not None:
+        first, last = bounds
+        with values[first:last] as segment:
+            for i, value in enumerate(segment, first):
+                if value == value and test(value, threshold):
+                    count += 1
+                    if first_row is None:
+                        first_row = i
+    else:
+        lo = to_epoch_days(start) if start is not None else None
+        hi = to_epoch_days(end) if end is not None else None
+        for i, (day, value) in enumerate(zip(dates, values)):
+            if day == MISSING_DATE or (lo is not None and day < lo) or (hi is not None and day > hi):
+                continue
+            if value == value and test(value, threshold):
+                count += 1
+                if first_row is None:
+                    first_row = i
+
+    first_date = from_epoch_days(dates[first_row]) if first_row is not None and dates is not None else None
+    return count, first_date
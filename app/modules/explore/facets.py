@@ -0,0 +1,67 @@
+# app/modules/explore/facets.py
+from typing import Hashable, Iterable, Tuple
+
+from app.modules.dataset.models import normalize_tag, split_tags
+from app.modules.explore.repositories import normalize_tokens
+from core.caching.ttl_cache import TTLCache
+
+FACETS_TTL_SECONDS = 60
+FACETS_CACHE_SIZE = 512
+TOP_TAGS = 20
+
+
+# Cleared whenever the catalogue changes in this process
+facets_cache = TTLCache(ttl=FACETS_TTL_SECONDS, maxsize=FACETS_CACHE_SIZE)
+
+
+def facets_key(
+    query="", publication_type="any", tags=None, start_date=None, end_date=None, **kwargs
+) -> Tuple[Hashable, ...]:
+    """Normalised cache key: equivalent filters (case, accents, word order, sorting) share an entry."""
+    tag_names = split_tags(tags) if isinstance(tags, (str, list)) else []
+    return (
+        tuple(sorted(set(normalize_tokens(query)))),
+        (publication_type or "any").lower(),
+        tuple(sorted(tag_names)),
+        start_date or None,
+        end_date or None,
+    )
+
+
+def build_facets(groups: Iterable[Tuple[object, str, int, int]], top_tags: int = TOP_TAGS) -> dict:
+    """
+    Fold the ``(publication_type, tags, year, count)`` groups of the aggregate query into
+    per-publication-type, per-tag and per-year counts. Tags are stored as a comma separated
+    string, so each group is split once here instead of once per dataset.
+    """
+    total = 0
+    types = {}
+    tags = {}
+    tag_labels = {}
+    years = {}
+    for publication_type, tag_string, year, count in groups:
+        total += count
+        if publication_type is not None:
+            types[publication_type] = types.get(publication_type, 0) + count
+        if year is not None:
+            years[int(year)] = years.get(int(year), 0) + count
+        seen = set()
+        for tag in (tag_string or "").split(","):
+            label = tag.strip()
+            key = normalize_tag(label)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            tags[key] = tags.get(key, 0) + count
+            tag_labels.setdefault(key, label)
+
+    top = sorted(tags.items(), key=lambda item: (-item[1], item[0]))[:top_tags]
+    return {
+        "total": total,
+        "publication_type": [
+            {"value": member.value.lower(), "label": member.name.replace("_", " ").title(), "count": count}
+            for member, count in sorted(types.items(), key=lambda item: (-item[1], item[0].value))
+        ],
+        "tags": [{"value": tag_labels[key], "count": count} for key, count in top],
+        "years": [{"value": year, "count": years[year]} for year in sorted(years, reverse=True)],
+    }
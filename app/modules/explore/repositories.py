@@ -2,12 +2,33 @@ import re
 from datetime import datetime, timedelta
 
 import unidecode
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, extract, func, or_
+from sqlalchemy.orm import selectinload
 
-from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
+from app.modules.dataset.models import (
+    Author,
+    DataSet,
+    DSDownloadRecord,
+    DSMetaData,
+    DSMetaDataEditLog,
+    DSViewRecord,
+    PublicationType,
+    Tag,
+    ds_meta_data_tag,
+    split_tags,
+)
+from app.modules.featuremodel.models import FeatureModel
 from core.repositories.BaseRepository import BaseRepository
 
 
+def normalize_tokens(text: str):
+    if not text:
+        return []
+    t = unidecode.unidecode(text).lower().strip()
+    t = re.sub(r'[,.":\'()\[\]^;!¡¿?]', "", t)
+    return [w for w in t.split() if w]
+
+
 class ExploreRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSet)
@@ -21,41 +42,68 @@ class ExploreRepository(BaseRepository):
             return None
 
     def _tokens(self, text: str):
-        if not text:
-            return []
-        t = unidecode.unidecode(text).lower().strip()
-        t = re.sub(r'[,.":\'()\[\]^;!¡¿?]', "", t)
-        return [w for w in t.split() if w]
+        return normalize_tokens(text)
 
-    def filter(
-        self, query="", sorting="newest", publication_type="any", tags=None, start_date=None, end_date=None, **kwargs
-    ):
+    def index_stamp(self) -> dict:
+        """
+        Cheap fingerprint of the catalogue used to detect changes made by other processes;
+        ``count`` is the number of latest versions, the datasets the search index holds.
+        """
+        max_id, first_created_at = self.session.query(func.max(DataSet.id), func.min(DataSet.created_at)).one()
+        count = self.session.query(func.count(DataSet.id)).filter(DataSet.is_latest.is_(True)).scalar()
+        max_edit_id = self.session.query(func.max(DSMetaDataEditLog.id)).scalar()
+        return {
+            "count": count,
+            "max_id": max_id or 0,
+            "max_edit_id": max_edit_id or 0,
+            "first_created_at": first_created_at.isoformat() if first_created_at else None,
+        }
 
-        q = self.model.query.join(DataSet.ds_meta_data).outerjoin(DSMetaData.authors).distinct(DataSet.id)
+    def iter_index_documents(
+        self, after_id=None, edited_after=None, ds_meta_data_id=None, latest_only=False, batch_size=1000
+    ):
+        """
+        Stream datasets with their metadata and authors for the search index.
+        ``after_id`` / ``edited_after`` restrict it to datasets created or edited since a stamp.
+        """
+        q = self.model.query.options(selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors))
+        if latest_only:
+            q = q.filter(DataSet.is_latest.is_(True))
+        if ds_meta_data_id is not None:
+            q = q.filter(DataSet.ds_meta_data_id == ds_meta_data_id)
+        if after_id is not None:
+            edited = self.session.query(DSMetaDataEditLog.ds_meta_data_id).filter(
+                DSMetaDataEditLog.id > (edited_after or 0)
+            )
+            q = q.filter(or_(DataSet.id > after_id, DataSet.ds_meta_data_id.in_(edited)))
+        return q.order_by(DataSet.id).yield_per(batch_size)
 
+    def _filtered_query(
+        self,
+        query="",
+        publication_type="any",
+        tags=None,
+        start_date=None,
+        end_date=None,
+        latest_only=False,
+    ):
+        """Build the (unordered) query for the explore filters."""
         words = self._tokens(query)
         has_query = bool(words)
         has_pub_type = bool(publication_type and publication_type != "any")
 
-        if isinstance(tags, str):
-            tag_list = self._tokens(tags)
-        elif isinstance(tags, list):
-            tag_list = [t.strip() for t in tags if isinstance(t, str) and t.strip()]
-        else:
-            tag_list = []
+        q = self.model.query.join(DataSet.ds_meta_data)
+        if has_query:
+            # Solo la búsqueda por texto necesita los autores (y el distinct que evita duplicados)
+            q = q.outerjoin(DSMetaData.authors).distinct(DataSet.id)
+        if latest_only:
+            q = q.filter(DataSet.is_latest.is_(True))
 
-        has_tags = bool(tag_list)
+        tag_list = split_tags(tags) if isinstance(tags, (str, list)) else []
 
         sd = self._parse_date(start_date)
         ed = self._parse_date(end_date)
 
-        # No filters applied
-        if not (has_query or has_pub_type or has_tags or sd or ed):
-            if sorting == "oldest":
-                q = q.order_by(DataSet.created_at.asc(), DataSet.id.asc())
-            else:
-                q = q.order_by(DataSet.created_at.desc(), DataSet.id.desc())
-
         # Dates
         if sd:
             q = q.filter(DataSet.created_at >= sd)
@@ -68,11 +116,9 @@ class ExploreRepository(BaseRepository):
             if member is not None:
                 q = q.filter(DSMetaData.publication_type == member)
 
-        # Tags
-        if has_tags:
-            clauses = [DSMetaData.tags.ilike(f"%{t}%") for t in tag_list]
-            if clauses:
-                q = q.filter(and_(*clauses))
+        # Tags: igualdad exacta contra la tabla normalizada (todas deben estar presentes)
+        for name in tag_list:
+            q = q.filter(DSMetaData.normalized_tags.any(Tag.name == name))
 
         # General search
         if has_query:
@@ -89,6 +135,42 @@ class ExploreRepository(BaseRepository):
                 )
             q = q.filter(and_(*per_word_groups))
 
+        return q
+
+    def iter_suggest_documents(self, ds_meta_data_id=None, batch_size=1000):
+        """Latest dataset versions with the metadata, authors and tags the autocomplete needs."""
+        q = self.model.query.filter(DataSet.is_latest.is_(True)).options(
+            selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+            selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.normalized_tags),
+        )
+        if ds_meta_data_id is not None:
+            q = q.filter(DataSet.ds_meta_data_id == ds_meta_data_id)
+        return q.order_by(DataSet.id).yield_per(batch_size)
+
+    def engagement_counts(self) -> dict:
+        """Views plus downloads per dataset id, in two grouped queries."""
+        counts = {}
+        for model, column in ((DSViewRecord, DSViewRecord.dataset_id), (DSDownloadRecord, DSDownloadRecord.dataset_id)):
+            for dataset_id, total in self.session.query(column, func.count(model.id)).group_by(column):
+                if dataset_id is not None:
+                    counts[dataset_id] = counts.get(dataset_id, 0) + total
+        return counts
+
+    def version_ids(self, ds_concept_id) -> list:
+        return [row.id for row in self.session.query(DataSet.id).filter(DataSet.ds_concept_id == ds_concept_id)]
+
+    def filter(
+        self,
+        query="",
+        sorting="newest",
+        publication_type="any",
+        tags=None,
+        start_date=None,
+        end_date=None,
+        **kwargs,
+    ):
+        q = self._filtered_query(query, publication_type, tags, start_date, end_date)
+
         # Ordering
         if sorting == "oldest":
             q = q.order_by(DataSet.created_at.asc(), DataSet.id.asc())
@@ -96,3 +178,92 @@ class ExploreRepository(BaseRepository):
             q = q.order_by(DataSet.created_at.desc(), DataSet.id.desc())
 
         return q.all()
+
+    def filter_page(
+        self,
+        limit,
+        after=None,
+        query="",
+        sorting="newest",
+        publication_type="any",
+        tags=None,
+        start_date=None,
+        end_date=None,
+        **kwargs,
+    ):
+        """
+        One page of the latest versions matching the filters, using keyset pagination on
+        ``(created_at, id)``: ``after`` is the key of the last row already shown, so every
+        page is an index range scan no matter how deep the user scrolls.
+        Fetches ``limit + 1`` rows so the caller can tell whether there is a next page.
+        """
+        q = self._filtered_query(query, publication_type, tags, start_date, end_date, latest_only=True)
+
+        oldest_first = sorting == "oldest"
+        if after is not None:
+            created_at, last_id = after
+            if oldest_first:
+                q = q.filter(
+                    or_(DataSet.created_at > created_at, and_(DataSet.created_at == created_at, DataSet.id > last_id))
+                )
+            else:
+                q = q.filter(
+                    or_(DataSet.created_at < created_at, and_(DataSet.created_at == created_at, DataSet.id < last_id))
+                )
+
+        if oldest_first:
+            q = q.order_by(DataSet.created_at.asc(), DataSet.id.asc())
+        else:
+            q = q.order_by(DataSet.created_at.desc(), DataSet.id.desc())
+
+        # Todo lo que pintan las tarjetas, en dos o tres consultas por página
+        q = q.options(
+            selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+            selectinload(DataSet.feature_models).selectinload(FeatureModel.files),
+        )
+        return q.limit(limit + 1).all()
+
+    def get_latest_by_ids(self, ids):
+        """Latest datasets among ``ids`` with everything a result card needs, in the order of ``ids``."""
+        if not ids:
+            return []
+        found = {
+            dataset.id: dataset
+            for dataset in self.model.query.filter(DataSet.id.in_(ids), DataSet.is_latest.is_(True)).options(
+                selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+                selectinload(DataSet.feature_models).selectinload(FeatureModel.files),
+            )
+        }
+        return [found[dataset_id] for dataset_id in ids if dataset_id in found]
+
+    def count_latest(self, query="", publication_type="any", tags=None, start_date=None, end_date=None, **kwargs):
+        q = self._filtered_query(query, publication_type, tags, start_date, end_date, latest_only=True)
+        return q.with_entities(func.count(func.distinct(DataSet.id))).order_by(None).scalar()
+
+    def facet_groups(self, query="", publication_type="any", tags=None, start_date=None, end_date=None, **kwargs):
+        """
+        Single grouped aggregate behind the explore facets: one row per
+        ``(publication_type, tags, year)`` with the number of latest datasets in it.
+        """
+        q = self._filtered_query(query, publication_type, tags, start_date, end_date, latest_only=True)
+        year = extract("year", DataSet.created_at)
+        return (
+            q.with_entities(DSMetaData.publication_type, DSMetaData.tags, year, func.count(func.distinct(DataSet.id)))
+            .group_by(DSMetaData.publication_type, DSMetaData.tags, year)
+            .order_by(None)
+            .all()
+        )
+
+    def popular_tags(self, limit=50):
+        """``(tag, number of latest datasets)`` pairs, most used first, straight from the tag index."""
+        count = func.count(DataSet.id)
+        return (
+            self.session.query(Tag.name, count)
+            .join(ds_meta_data_tag, ds_meta_data_tag.c.tag_id == Tag.id)
+            .join(DataSet, DataSet.ds_meta_data_id == ds_meta_data_tag.c.ds_meta_data_id)
+            .filter(DataSet.is_latest.is_(True))
+            .group_by(Tag.id, Tag.name)
+            .order_by(count.desc(), Tag.name)
+            .limit(limit)
+            .all()
+        )
@@ -1,10 +1,15 @@
-from flask import Blueprint, render_template, request
+from datetime import date
+
+from flask import current_app, jsonify, render_template, request
 
 from app.modules.dataset.services import AuthorService
+from core.blueprints.base_blueprint import BaseBlueprint
 
-from .services import ExploreService
+from .content_search import parse_predicate
+from .services import CONTENT_SEARCH_LIMIT, ExploreService
+from .suggest import suggest_index
 
-explore_bp = Blueprint(
+explore_bp = BaseBlueprint(
     "explore",
     __name__,
     url_prefix="/explore",
@@ -12,27 +17,140 @@ explore_bp = Blueprint(
 )
 
 
-@explore_bp.route("/", methods=["GET"])
-def index():
+def _start_suggest_index():
+    suggest_index.start(current_app._get_current_object())
+
+
+@explore_bp.record_once
+def _warm_suggest_index(state):
+    # El índice de autocompletado se construye en segundo plano desde la primera petición del proceso
+    state.app.before_request(_start_suggest_index)
+
+
+def _filters_from(args, sorting_key="sort_by"):
+    return dict(
+        query=(args.get("query") or "").strip(),
+        sorting=args.get(sorting_key) or "newest",
+        publication_type=args.get("publication_type") or "any",
+        tags=(args.get("tags") or "").strip(),
+        start_date=args.get("start_date") or None,
+        end_date=args.get("end_date") or None,
+    )
+
+
+def _dataset_summary(dataset):
+    """What a result card needs; unlike ``DataSet.to_dict`` it does not touch files or concepts."""
+    meta = dataset.ds_meta_data
+    return {
+        "id": dataset.id,
+        "title": meta.title,
+        "description": meta.description,
+        "created_at": dataset.created_at.isoformat(),
+        "publication_type": dataset.get_cleaned_publication_type(),
+        "authors": [author.to_dict() for author in AuthorService.get_unique_authors(dataset)],
+        "tags": [tag.strip() for tag in meta.tags.split(",") if tag.strip()] if meta.tags else [],
+        "url": dataset.get_uvlhub_doi(),
+        "total_size_in_human_format": dataset.get_file_total_size_for_human(),
+    }
+
+
+def _page_response(filters, cursor, limit, fmt="json"):
+    try:
+        datasets, next_cursor = ExploreService().filter_page(cursor=cursor, limit=limit, **filters)
+    except ValueError as exc:
+        return jsonify({"message": str(exc)}), 400
+
+    if fmt == "html":
+        # Fragmento listo para añadir a #results; el cursor siguiente va en una cabecera
+        html = render_template(
+            "explore/_dataset_cards.html", datasets=datasets, unique_authors=AuthorService.get_unique_authors
+        )
+        return html, 200, {"X-Next-Cursor": next_cursor or ""}
 
-    filters = dict(
-        query=request.args.get("query", "").strip(),
-        sorting=request.args.get("sort_by", "newest"),
-        publication_type=request.args.get("publication_type", "any"),
-        tags=request.args.get("tags") or "".strip(),
-        start_date=request.args.get("start_date") or None,
-        end_date=request.args.get("end_date") or None,
+    return jsonify(
+        {
+            "datasets": [_dataset_summary(dataset) for dataset in datasets],
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        }
     )
 
-    datasets = [ds for ds in ExploreService().filter(**filters) if ds.is_latest]
-    for dataset in datasets:
-        dataset.ds_meta_data.authors = AuthorService.get_unique_authors(dataset)
+
+@explore_bp.route("/", methods=["GET"])
+def index():
+    filters = _filters_from(request.args)
+    service = ExploreService()
+    facets = service.facets(**filters)
+    try:
+        datasets, next_cursor = service.filter_page(cursor=request.args.get("cursor"), **filters)
+    except ValueError:
+        datasets, next_cursor = service.filter_page(**filters)
     return render_template(
         "explore/index.html",
         datasets=datasets,
+        next_cursor=next_cursor,
+        total=facets["total"],
+        facets=facets,
+        publication_type_counts={f["value"]: f["count"] for f in facets["publication_type"]},
+        unique_authors=AuthorService.get_unique_authors,
         query=filters["query"],
         request_args=request.args,
+        filter_args={k: v for k, v in request.args.items() if k != "cursor"},
     )
 
 
-# For dinamic frontend implementation @explore_bp.route("/", methods=["POST"])
+@explore_bp.route("/", methods=["POST"])
+def search():
+    criteria = request.get_json(silent=True) or {}
+    return _page_response(_filters_from(criteria, "sorting"), criteria.get("cursor"), criteria.get("limit"))
+
+
+@explore_bp.route("/page", methods=["GET"])
+def page():
+    """Next page of results for infinite scroll, as JSON or (``format=html``) as rendered cards."""
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "html"):
+        return jsonify({"message": "format must be json or html"}), 400
+    limit = request.args.get("limit", type=int)
+    return _page_response(_filters_from(request.args), request.args.get("cursor"), limit, fmt)
+
+
+@explore_bp.route("/facets", methods=["GET"])
+def facets():
+    """Counts per publication type, tag and year for the filters in the query string."""
+    return jsonify(ExploreService().facets(**_filters_from(request.args)))
+
+
+@explore_bp.route("/tags", methods=["GET"])
+def popular_tags():
+    """Most used tags among the latest dataset versions, for tag clouds."""
+    limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+    return jsonify(ExploreService().popular_tags(limit))
+
+
+@explore_bp.route("/suggest", methods=["GET"])
+def suggest():
+    """Autocomplete for the search box, served from the in-memory prefix index."""
+    limit = request.args.get("limit", type=int)
+    if limit is not None:
+        limit = max(1, min(limit, 50))
+    q = request.args.get("q", "")
+    return jsonify({"query": q, "suggestions": ExploreService().suggest(q, limit)})
+
+
+@explore_bp.route("/content", methods=["GET"])
+def content_search():
+    """
+    Datasets whose data satisfies every ``where`` predicate, e.g.
+    ``?where=_temp_max>40&start_date=2019-01-01&end_date=2019-12-31``.
+    """
+    try:
+        predicates = [parse_predicate(text) for text in request.args.getlist("where")]
+        if not predicates:
+            raise ValueError("At least one 'where' predicate is required, e.g. where=_temp_max>40")
+        start = date.fromisoformat(request.args["start_date"]) if request.args.get("start_date") else None
+        end = date.fromisoformat(request.args["end_date"]) if request.args.get("end_date") else None
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    limit = max(1, min(request.args.get("limit", CONTENT_SEARCH_LIMIT, type=int), 500))
+    return jsonify(ExploreService().content_search(predicates, start, end, limit))
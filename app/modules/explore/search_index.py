@@ -0,0 +1,339 @@
+# app/modules/explore/search_index.py
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sortedcontainers import SortedSet
+
+from app.modules.dataset.models import PublicationType, split_tags
+from app.modules.explore.repositories import normalize_tokens
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+
+class IndexEntry(NamedTuple):
+    """What the explore filters, keyset pages and facets need of a dataset, without going to SQL."""
+
+    created_at: datetime
+    publication_type: Optional[PublicationType]
+    tags: Optional[str]
+    concept_id: Optional[int]
+    tag_names: frozenset
+
+    @classmethod
+    def create(cls, created_at, publication_type, tags, concept_id) -> "IndexEntry":
+        return cls(created_at, publication_type, tags, concept_id, frozenset(split_tags(tags)))
+
+    def to_list(self) -> list:
+        publication_type = self.publication_type.name if self.publication_type else None
+        return [self.created_at.isoformat(), publication_type, self.tags, self.concept_id]
+
+    @classmethod
+    def from_list(cls, values: list) -> "IndexEntry":
+        created_at, publication_type, tags, concept_id = values
+        return cls.create(
+            datetime.fromisoformat(created_at),
+            PublicationType[publication_type] if publication_type else None,
+            tags,
+            concept_id,
+        )
+
+
+def document_tokens(dataset) -> Set[str]:
+    """Tokens indexed for a dataset: title, description, tags, author names and affiliations."""
+    meta = dataset.ds_meta_data
+    texts = [meta.title, meta.description, meta.tags]
+    for author in meta.authors:
+        texts.append(author.name)
+        texts.append(author.affiliation)
+    tokens = set()
+    for text in texts:
+        tokens.update(normalize_tokens(text))
+    return tokens
+
+
+def document_entry(dataset) -> IndexEntry:
+    meta = dataset.ds_meta_data
+    return IndexEntry.create(dataset.created_at, meta.publication_type, meta.tags, dataset.ds_concept_id)
+
+
+class SearchIndex:
+    """
+    Inverted index over the latest dataset versions: token -> posting set of dataset ids.
+
+    A query word matches every indexed token it is a prefix of (looked up in a
+    sorted vocabulary), and the result is the intersection over all query words,
+    smallest posting list first. Each dataset also keeps an ``IndexEntry`` so the
+    other explore filters, the ``(created_at, id)`` order and the facets of a text
+    search are resolved here and SQL only loads the rows of one page.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[int]] = {}
+        self.documents: Dict[int, frozenset] = {}
+        self.entries: Dict[int, IndexEntry] = {}
+        # Concepto -> la versión indexada (solo se indexa la última de cada concepto)
+        self.concepts: Dict[int, int] = {}
+        self.vocabulary = SortedSet()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, doc_id: int):
+        return doc_id in self.documents
+
+    def add(self, doc_id: int, tokens: Iterable[str], entry: Optional[IndexEntry] = None) -> None:
+        """Add or replace a dataset; one with the same concept as an indexed version replaces it."""
+        if entry is not None and entry.concept_id is not None:
+            previous = self.concepts.get(entry.concept_id)
+            if previous is not None and previous != doc_id:
+                self.remove(previous)
+            self.concepts[entry.concept_id] = doc_id
+        if entry is not None:
+            self.entries[doc_id] = entry
+        tokens = frozenset(tokens)
+        if self.documents.get(doc_id) == tokens:
+            return
+        self._remove_tokens(doc_id)
+        self.documents[doc_id] = tokens
+        for token in tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                self.vocabulary.add(token)
+            posting.add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        entry = self.entries.pop(doc_id, None)
+        if entry is not None and entry.concept_id is not None and self.concepts.get(entry.concept_id) == doc_id:
+            del self.concepts[entry.concept_id]
+        self._remove_tokens(doc_id)
+
+    def _remove_tokens(self, doc_id: int) -> None:
+        for token in self.documents.pop(doc_id, ()):
+            posting = self.postings[token]
+            posting.discard(doc_id)
+            if not posting:
+                del self.postings[token]
+                self.vocabulary.discard(token)
+
+    def _matching(self, word: str) -> Set[int]:
+        matches = set()
+        for token in self.vocabulary.irange(word, word + "\uffff"):
+            matches |= self.postings[token]
+        return matches
+
+    def search(self, words: List[str]) -> Set[int]:
+        if not words:
+            return set(self.documents)
+        candidates = sorted((self._matching(word) for word in set(words)), key=len)
+        result = candidates[0]
+        for posting in candidates[1:]:
+            if not result:
+                break
+            result &= posting
+        return result
+
+    def select(
+        self,
+        words: List[str],
+        publication_type: Optional[str] = None,
+        tags: Iterable[str] = (),
+        since: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+    ) -> Dict[int, IndexEntry]:
+        """Entries of the datasets matching ``words`` and the explore filters (same semantics as the SQL ones)."""
+        member = None
+        if publication_type and publication_type != "any":
+            member = next((m for m in PublicationType if m.value.lower() == publication_type.lower()), None)
+        required = set(tags)
+        selected = {}
+        for doc_id in self.search(words):
+            entry = self.entries.get(doc_id)
+            if entry is None:
+                continue
+            if member is not None and entry.publication_type != member:
+                continue
+            if since is not None and entry.created_at < since:
+                continue
+            if before is not None and entry.created_at >= before:
+                continue
+            if required and not required <= entry.tag_names:
+                continue
+            selected[doc_id] = entry
+        return selected
+
+    def to_snapshot(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "documents": {str(k): sorted(v) for k, v in self.documents.items()},
+            "entries": {str(k): entry.to_list() for k, entry in self.entries.items()},
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "SearchIndex":
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported search index snapshot")
+        index = cls()
+        entries = data.get("entries", {})
+        for doc_id, tokens in data["documents"].items():
+            entry = IndexEntry.from_list(entries[doc_id]) if doc_id in entries else None
+            index.add(int(doc_id), tokens, entry)
+        return index
+
+
+class SearchIndexManager:
+    """
+    Process-wide search index over the explore catalogue.
+
+    The index is built from the database on first use, or loaded from a snapshot
+    file when one matches the current catalogue. Publishing and editing datasets
+    update it incrementally; changes made by other worker processes are picked up
+    by comparing a cheap catalogue stamp at most every ``SEARCH_INDEX_REFRESH_SECONDS``.
+    """
+
+    def __init__(self):
+        self._index: Optional[SearchIndex] = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    def _config(self, key, default=None):
+        from flask import current_app
+
+        return current_app.config.get(key, default)
+
+    def _snapshot_path(self) -> Optional[str]:
+        path = self._config("SEARCH_INDEX_SNAPSHOT")
+        if path is None:
+            path = os.path.join(os.getenv("WORKING_DIR", ""), "uploads", "search_index.json")
+        return path or None
+
+    def _repository(self):
+        from app.modules.explore.repositories import ExploreRepository
+
+        return ExploreRepository()
+
+    def get(self) -> SearchIndex:
+        with self._lock:
+            if self._index is None:
+                self._load_or_build()
+            elif time.monotonic() - self._checked_at >= self._config("SEARCH_INDEX_REFRESH_SECONDS", 5):
+                self.sync()
+            return self._index
+
+    def search(self, query: str) -> Set[int]:
+        words = normalize_tokens(query)
+        with self._lock:
+            return self.get().search(words)
+
+    def select(self, query: str, **filters) -> Dict[int, IndexEntry]:
+        words = normalize_tokens(query)
+        with self._lock:
+            return self.get().select(words, **filters)
+
+    def _index_document(self, index: SearchIndex, dataset) -> None:
+        if dataset.is_latest:
+            index.add(dataset.id, document_tokens(dataset), document_entry(dataset))
+        else:
+            index.remove(dataset.id)
+
+    def rebuild(self) -> SearchIndex:
+        with self._lock:
+            repository = self._repository()
+            index = SearchIndex()
+            for dataset in repository.iter_index_documents(latest_only=True):
+                index.add(dataset.id, document_tokens(dataset), document_entry(dataset))
+            self._index = index
+            self._stamp = repository.index_stamp()
+            self._checked_at = time.monotonic()
+            self.save_snapshot()
+            logger.info(f"Search index built with {len(index)} datasets")
+            return index
+
+    def sync(self) -> None:
+        """Catch up with changes made outside this process, falling back to a rebuild on deletions."""
+        with self._lock:
+            repository = self._repository()
+            stamp = repository.index_stamp()
+            self._checked_at = time.monotonic()
+            if stamp == self._stamp:
+                return
+            if (
+                self._stamp is None
+                or stamp["first_created_at"] != self._stamp["first_created_at"]
+                or stamp["count"] < self._stamp["count"]
+                or stamp["max_id"] < self._stamp["max_id"]
+            ):
+                # Deletions (or a recreated database) cannot be replayed incrementally
+                self.rebuild()
+                return
+
+            for dataset in repository.iter_index_documents(
+                after_id=self._stamp["max_id"], edited_after=self._stamp["max_edit_id"]
+            ):
+                self._index_document(self._index, dataset)
+            self._stamp = stamp
+            if len(self._index) != stamp["count"]:
+                self.rebuild()
+
+    def index_dataset(self, dataset) -> None:
+        """Add or refresh one dataset after it is published or its metadata is edited."""
+        with self._lock:
+            if self._index is None:
+                return
+            self._index_document(self._index, dataset)
+
+    def reindex_metadata(self, ds_meta_data_id: int) -> None:
+        with self._lock:
+            if self._index is None:
+                return
+            for dataset in self._repository().iter_index_documents(ds_meta_data_id=ds_meta_data_id):
+                self._index_document(self._index, dataset)
+
+    def remove_dataset(self, dataset_id: int) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(dataset_id)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._index = None
+            self._stamp = None
+
+    def save_snapshot(self) -> None:
+        path = self._snapshot_path()
+        if not path or self._index is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w") as fh:
+                json.dump({"stamp": self._stamp, **self._index.to_snapshot()}, fh)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning(f"Could not write search index snapshot {path}: {exc}")
+
+    def _load_or_build(self) -> None:
+        path = self._snapshot_path()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as fh:
+                    data = json.load(fh)
+                self._index = SearchIndex.from_snapshot(data)
+                self._stamp = data.get("stamp")
+                self.sync()
+                return
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                logger.warning(f"Ignoring search index snapshot {path}: {exc}")
+        self.rebuild()
+
+
+search_index = SearchIndexManager()
@@ -1,10 +1,259 @@
+import base64
+import binascii
+import heapq
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from app.modules.dataset.columnar import ColumnarFile
+from app.modules.dataset.dateindex import DateIndex
+from app.modules.dataset.models import split_tags
+from app.modules.explore.content_search import Predicate, scan_column
+from app.modules.explore.facets import build_facets, facets_cache, facets_key
 from app.modules.explore.repositories import ExploreRepository
+from app.modules.explore.search_index import IndexEntry, search_index
+from app.modules.explore.suggest import DEFAULT_LIMIT as DEFAULT_SUGGEST_LIMIT
+from app.modules.explore.suggest import suggest_index
 from core.services.BaseService import BaseService
 
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 100
+CONTENT_SEARCH_LIMIT = 50
+
+
+def encode_cursor(dataset) -> str:
+    """Opaque cursor for the keyset ``(created_at, id)`` of the last dataset of a page."""
+    raw = f"{dataset.created_at.isoformat()}|{dataset.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, dataset_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(dataset_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
 
 class ExploreService(BaseService):
     def __init__(self):
         super().__init__(ExploreRepository())
 
+    def _indexed(self, filters: dict) -> Optional[Dict[int, IndexEntry]]:
+        """
+        Matches of a text search resolved entirely by the inverted index (text, publication
+        type, tags and dates), or None when there is no text query or the index is disabled.
+        """
+        query = filters.get("query")
+        if not (query and current_app.config.get("SEARCH_INDEX_ENABLED", True)):
+            return None
+        tags = filters.get("tags")
+        since = self.repository._parse_date(filters.get("start_date"))
+        until = self.repository._parse_date(filters.get("end_date"))
+        return search_index.select(
+            query,
+            publication_type=filters.get("publication_type"),
+            tags=split_tags(tags) if isinstance(tags, (str, list)) else (),
+            since=since,
+            before=until + timedelta(days=1) if until else None,
+        )
+
     def filter(self, **filters):
-        return self.repository.filter(**filters)
+        matches = self._indexed(filters)
+        if matches is None:
+            return self.repository.filter(**filters)
+        ordered = sorted(
+            matches, key=lambda doc_id: (matches[doc_id].created_at, doc_id), reverse=filters.get("sorting") != "oldest"
+        )
+        return self.repository.get_latest_by_ids(ordered)
+
+    def filter_page(
+        self, cursor: Optional[str] = None, limit: Optional[int] = None, **filters
+    ) -> Tuple[List, Optional[str]]:
+        """
+        Return one page of the latest dataset versions and the cursor of the next page
+        (None on the last page). Raises ValueError for a malformed cursor.
+        """
+        if limit is None:
+            limit = current_app.config.get("EXPLORE_PAGE_SIZE", 20)
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+
+        matches = self._indexed(filters)
+        if matches is None:
+            rows = self.repository.filter_page(limit, after=after, **filters)
+        else:
+            # Página por clave (created_at, id) en memoria: a SQL solo van los ids de la página
+            keys = ((entry.created_at, doc_id) for doc_id, entry in matches.items())
+            if filters.get("sorting") == "oldest":
+                page = heapq.nsmallest(limit + 1, (key for key in keys if after is None or key > after))
+            else:
+                page = heapq.nlargest(limit + 1, (key for key in keys if after is None or key < after))
+            rows = self.repository.get_latest_by_ids([doc_id for _, doc_id in page])
+        datasets = rows[:limit]
+        next_cursor = encode_cursor(datasets[-1]) if len(rows) > limit else None
+        return datasets, next_cursor
+
+    def count(self, **filters) -> int:
+        matches = self._indexed(filters)
+        if matches is not None:
+            return len(matches)
+        return self.repository.count_latest(**filters)
+
+    def facets(self, **filters) -> dict:
+        """Per publication type, tag and year counts of the latest datasets matching the filters."""
+        key = facets_key(**filters)
+        ttl = current_app.config.get("EXPLORE_FACETS_TTL", 60)
+        facets = facets_cache.get(key, ttl=ttl) if ttl > 0 else None
+        if facets is None:
+            matches = self._indexed(filters)
+            if matches is None:
+                groups = self.repository.facet_groups(**filters)
+            else:
+                groups = Counter(
+                    (entry.publication_type, entry.tags, entry.created_at.year) for entry in matches.values()
+                )
+                groups = [(*group, count) for group, count in groups.items()]
+            facets = build_facets(groups)
+            if ttl > 0:
+                facets_cache.put(key, facets)
+        return facets
+
+    def content_search(
+        self,
+        predicates: List[Predicate],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: int = CONTENT_SEARCH_LIMIT,
+    ) -> dict:
+        """
+        Latest datasets with data satisfying every predicate (each one by at least one row)
+        inside the optional date range.
+
+        1. Pruning: the per-month (or, without dates, per-file) min / max stored for every CSV
+           column discard the columns that cannot match, in one indexed query per predicate.
+        2. Verification: only the surviving columns are scanned, straight from their mapped
+           columnar sidecars and restricted to the date range.
+        """
+        from app.modules.dataset.services import DataSetService
+        from app.modules.hubfile.repositories import (
+            HubfileColumnStatsRepository,
+            HubfileMonthStatsRepository,
+            HubfileRepository,
+        )
+
+        candidates = []
+        for predicate in predicates:
+            if start_date or end_date:
+                rows = HubfileMonthStatsRepository().candidate_columns(
+                    predicate.column, predicate.op, predicate.value, start_date, end_date
+                )
+            else:
+                rows = HubfileColumnStatsRepository().candidate_columns(predicate.column, predicate.op, predicate.value)
+            candidates.append(rows)
+
+        files = {
+            hubfile.id: (hubfile, dataset)
+            for hubfile, dataset in HubfileRepository().get_latest_with_datasets(
+                {file_id for rows in candidates for file_id, _ in rows}
+            )
+        }
+        surviving = None
+        for rows in candidates:
+            dataset_ids = {files[file_id][1].id for file_id, _ in rows if file_id in files}
+            surviving = dataset_ids if surviving is None else surviving & dataset_ids
+
+        checks: Dict[int, List[Tuple[int, str]]] = {}
+        for position, rows in enumerate(candidates):
+            for file_id, column in rows:
+                if file_id in files and files[file_id][1].id in (surviving or ()):
+                    checks.setdefault(file_id, []).append((position, column))
+
+        store = DataSetService().get_columnar_store()
+        matches: Dict[int, list] = {}
+        satisfied: Dict[int, set] = {}
+        for file_id in sorted(checks):
+            hubfile, dataset = files[file_id]
+            path = os.path.join(
+                os.getenv("WORKING_DIR", ""),
+                "uploads",
+                f"user_{dataset.user_id}",
+                f"dataset_{dataset.id}",
+                hubfile.name,
+            )
+            if not store.has(hubfile.checksum) and not os.path.exists(path):
+                logger.warning(f"Skipping content search on missing file {path}")
+                continue
+            with DateIndex(store.ensure_index(path, hubfile.checksum)) as index:
+                dates_sorted = index.header["sorted"]
+            with ColumnarFile(store.ensure(path, hubfile.checksum)) as columnar:
+                for position, column in checks[file_id]:
+                    if column not in columnar.columns:
+                        continue
+                    predicate = predicates[position]
+                    count, first_date = scan_column(columnar, column, predicate, start_date, end_date, dates_sorted)
+                    if count:
+                        satisfied.setdefault(dataset.id, set()).add(position)
+                        matches.setdefault(dataset.id, []).append(
+                            {
+                                "file_id": hubfile.id,
+                                "file": hubfile.name,
+                                "column": column,
+                                "predicate": repr(predicate),
+                                "rows": count,
+                                "first_date": first_date.isoformat() if first_date else None,
+                            }
+                        )
+
+        datasets = {dataset.id: dataset for _, dataset in files.values()}
+        found = [datasets[i] for i, hit in satisfied.items() if len(hit) == len(predicates)]
+        found.sort(key=lambda ds: (ds.created_at, ds.id), reverse=True)
+        return {
+            "predicates": [repr(p) for p in predicates],
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None,
+            "candidate_files": len(files),
+            "scanned_files": len(checks),
+            "total": len(found),
+            "datasets": [
+                {
+                    "id": ds.id,
+                    "title": ds.ds_meta_data.title,
+                    "url": ds.get_uvlhub_doi(),
+                    "matches": matches[ds.id],
+                }
+                for ds in found[:limit]
+            ],
+        }
+
+    def popular_tags(self, limit: int = 50) -> list:
+        return [{"name": name, "count": count} for name, count in self.repository.popular_tags(limit)]
+
+    def suggest(self, prefix: str, limit: Optional[int] = None) -> list:
+        if limit is None:
+            limit = current_app.config.get("SUGGEST_LIMIT", DEFAULT_SUGGEST_LIMIT)
+        return suggest_index.suggest(prefix, limit)
+
+    @staticmethod
+    def index_dataset(dataset):
+        search_index.index_dataset(dataset)
+        suggest_index.add_dataset(dataset)
+        facets_cache.clear()
+
+    @staticmethod
+    def reindex_metadata(ds_meta_data_id: int):
+        search_index.reindex_metadata(ds_meta_data_id)
+        suggest_index.reindex_metadata(ds_meta_data_id)
+        facets_cache.clear()
+
+    @staticmethod
+    def remove_dataset(dataset_id: int):
+        search_index.remove_dataset(dataset_id)
+        suggest_index.remove_dataset(dataset_id)
+        facets_cache.clear()
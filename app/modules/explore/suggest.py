@@ -0,0 +1,268 @@
+# app/modules/explore/suggest.py
+import heapq
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+from app.modules.explore.repositories import normalize_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 8
+# Very short prefixes can match thousands of keys; their top-k is memoised until the next change
+MEMO_SIZE = 2048
+
+Entry = Tuple[str, str]  # (kind, display text)
+
+
+def normalize_suggestion(text: str) -> str:
+    return " ".join(normalize_tokens(text))
+
+
+def dataset_suggestions(dataset) -> List[Entry]:
+    """Completable texts of a dataset: its title, author names and affiliations, and tags."""
+    meta = dataset.ds_meta_data
+    entries = [("title", meta.title)]
+    for author in meta.authors:
+        entries.append(("author", author.name))
+        if author.affiliation:
+            entries.append(("affiliation", author.affiliation))
+    entries.extend(("tag", tag.name) for tag in meta.normalized_tags)
+    return [(kind, text.strip()) for kind, text in dict.fromkeys(entries) if text and text.strip()]
+
+
+class SuggestIndex:
+    """
+    Sorted prefix index for autocompletion.
+
+    Every suggestion is stored under its normalised text and under each later word
+    ("lluvia en madrid" is also found by "madrid"), in one ``SortedList`` of
+    ``(key, kind, text)``; a prefix is the contiguous range ``[prefix, prefix + U+FFFF)``.
+    Each suggestion's weight is the sum over the datasets it appears in of
+    ``1 + views + downloads``, and the best ``limit`` of a range are returned.
+    """
+
+    def __init__(self):
+        self.keys = SortedList()
+        self.weights: Dict[Entry, float] = {}
+        self.contributions: Dict[int, Tuple[List[Entry], float]] = {}
+        self._memo: Dict[Tuple[str, int], List[dict]] = {}
+
+    def __len__(self):
+        return len(self.weights)
+
+    def _keys_for(self, entry: Entry):
+        kind, text = entry
+        words = normalize_suggestion(text).split()
+        return {(" ".join(words[i:]), kind, text) for i in range(len(words))}
+
+    def _adjust(self, entry: Entry, delta: float) -> None:
+        weight = self.weights.get(entry, 0.0) + delta
+        if weight > 0:
+            if entry not in self.weights:
+                self.keys.update(self._keys_for(entry))
+            self.weights[entry] = weight
+        elif entry in self.weights:
+            del self.weights[entry]
+            for key in self._keys_for(entry):
+                self.keys.discard(key)
+
+    def add_dataset(self, dataset_id: int, entries: List[Entry], engagement: Optional[float] = None) -> None:
+        """Add or replace a dataset; without ``engagement`` a re-added dataset keeps its weight."""
+        previous = self.contributions.get(dataset_id)
+        if engagement is None:
+            weight = previous[1] if previous else 1.0
+        else:
+            weight = 1.0 + engagement
+        self.remove_dataset(dataset_id)
+        self.contributions[dataset_id] = (entries, weight)
+        for entry in entries:
+            self._adjust(entry, weight)
+        self._memo.clear()
+
+    def remove_dataset(self, dataset_id: int) -> None:
+        previous = self.contributions.pop(dataset_id, None)
+        if previous is None:
+            return
+        entries, weight = previous
+        for entry in entries:
+            self._adjust(entry, -weight)
+        self._memo.clear()
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        key = normalize_suggestion(prefix)
+        if not key:
+            return []
+        memo_key = (key, limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        matches = {}
+        for _, kind, text in self.keys.irange((key,), (key + "\uffff",)):
+            matches[(kind, text)] = self.weights[(kind, text)]
+        best = heapq.nlargest(limit, matches.items(), key=lambda item: (item[1], -len(item[0][1])))
+        result = [{"text": text, "type": kind, "weight": weight} for (kind, text), weight in best]
+
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[memo_key] = result
+        return result
+
+
+class SuggestIndexManager:
+    """
+    Process-wide autocomplete index, updated incrementally when a dataset is published
+    and rebuilt from scratch every ``SUGGEST_REBUILD_SECONDS`` so view / download
+    weights and changes made by other worker processes are picked up.
+
+    With ``SUGGEST_ASYNC`` (the default) a daemon thread, started on the first request
+    the process serves, builds and rebuilds the index; requests keep using the previous
+    one until the new one is swapped in, and get no suggestions before the first build.
+    Without it (tests) the index is built inline on first use and when it is stale.
+    """
+
+    def __init__(self):
+        self._index: Optional[SuggestIndex] = None
+        self._built_at = 0.0
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        # Cambios incrementales llegados mientras se construye un índice nuevo; se reaplican antes del cambio
+        self._updates: Optional[List[Callable[[SuggestIndex], None]]] = None
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def _repository(self):
+        from app.modules.explore.repositories import ExploreRepository
+
+        return ExploreRepository()
+
+    def start(self, app) -> None:
+        """Starts the rebuild thread of this process (a forked worker starts its own)."""
+        if not app.config.get("SUGGEST_ASYNC", True):
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._app = app
+            self._thread = threading.Thread(target=self._run, name="suggest-index", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        from app import db
+
+        while True:
+            max_age = self._app.config.get("SUGGEST_REBUILD_SECONDS", 600)
+            with self._app.app_context():
+                try:
+                    self.rebuild()
+                except Exception as exc:
+                    logger.exception(f"Suggest index rebuild failed: {exc}")
+                    max_age = min(max_age, 60) if max_age else 60
+                finally:
+                    db.session.remove()
+            if not max_age:
+                return
+            time.sleep(max_age)
+
+    def get(self) -> SuggestIndex:
+        from flask import current_app
+
+        with self._lock:
+            if current_app.config.get("SUGGEST_ASYNC", True):
+                self.start(current_app._get_current_object())
+                return self._index if self._index is not None else SuggestIndex()
+            max_age = current_app.config.get("SUGGEST_REBUILD_SECONDS", 600)
+            if self._index is None or (max_age and time.monotonic() - self._built_at >= max_age):
+                self.rebuild()
+            return self._index
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        with self._lock:
+            return self.get().suggest(prefix, limit)
+
+    def rebuild(self) -> SuggestIndex:
+        """Builds a new index from the database without blocking lookups, then swaps it in."""
+        with self._rebuild_lock:
+            with self._lock:
+                self._updates = []
+            try:
+                repository = self._repository()
+                engagement = repository.engagement_counts()
+                index = SuggestIndex()
+                for dataset in repository.iter_suggest_documents():
+                    index.add_dataset(dataset.id, dataset_suggestions(dataset), engagement.get(dataset.id, 0))
+            except Exception:
+                with self._lock:
+                    self._updates = None
+                raise
+            with self._lock:
+                for update in self._updates:
+                    update(index)
+                self._updates = None
+                self._index = index
+                self._built_at = time.monotonic()
+            logger.info(f"Suggest index built with {len(index)} suggestions")
+            return index
+
+    def _apply(self, update: Callable[[SuggestIndex], None]) -> None:
+        with self._lock:
+            if self._index is not None:
+                update(self._index)
+            if self._updates is not None:
+                self._updates.append(update)
+
+    def _tracking(self) -> bool:
+        with self._lock:
+            return self._index is not None or self._updates is not None
+
+    def add_dataset(self, dataset) -> None:
+        if not self._tracking():
+            return
+        dataset_id = dataset.id
+        entries = dataset_suggestions(dataset)
+        version_ids = []
+        if dataset.ds_concept_id is not None:
+            version_ids = [v for v in self._repository().version_ids(dataset.ds_concept_id) if v != dataset_id]
+
+        def update(index: SuggestIndex) -> None:
+            engagement = None
+            # Sólo se sugiere la última versión de cada concepto, que hereda su peso
+            for version_id in version_ids:
+                previous = index.contributions.get(version_id)
+                if previous is not None:
+                    engagement = max(engagement or 0.0, previous[1] - 1.0)
+                    index.remove_dataset(version_id)
+            index.add_dataset(dataset_id, entries, engagement)
+
+        self._apply(update)
+
+    def reindex_metadata(self, ds_meta_data_id: int) -> None:
+        if not self._tracking():
+            return
+        documents = [
+            (dataset.id, dataset_suggestions(dataset))
+            for dataset in self._repository().iter_suggest_documents(ds_meta_data_id=ds_meta_data_id)
+        ]
+
+        def update(index: SuggestIndex) -> None:
+            for dataset_id, entries in documents:
+                index.add_dataset(dataset_id, entries)
+
+        self._apply(update)
+
+    def remove_dataset(self, dataset_id: int) -> None:
+        self._apply(lambda index: index.remove_dataset(dataset_id))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._index = None
+
+
+suggest_index = SuggestIndexManager()
@@ -0,0 +1,156 @@
+"""
+Tests for the content-predicate search (zone-map pruning + columnar verification).
+"""
+
+import hashlib
+import os
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.columnar import ColumnarFile, write_sidecar
+from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+from app.modules.explore.content_search import parse_predicate, scan_column
+from app.modules.explore.services import ExploreService
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
+from app.modules.hubfile.services import HubfileStatsService
+
+
+def _csv(rows):
+    return ("DATE,BASEL_temp_max,BASEL_humidity\n" + "\n".join(",".join(map(str, r)) for r in rows) + "\n").encode()
+
+
+def _dataset_with_csv(user, working_dir, title, content, is_latest=True):
+    meta = DSMetaData(title=title, description="Content search", publication_type=PublicationType.NONE)
+    db.session.add(meta)
+    db.session.flush()
+    dataset = DataSet(user_id=user.id, ds_meta_data_id=meta.id, is_latest=is_latest)
+    db.session.add(dataset)
+    db.session.flush()
+    fm_meta = FMMetaData(
+        filename="data.csv", title=title, description="Content search", publication_type=PublicationType.NONE
+    )
+    db.session.add(fm_meta)
+    db.session.flush()
+    fm = FeatureModel(data_set_id=dataset.id, fm_meta_data_id=fm_meta.id)
+    db.session.add(fm)
+    db.session.flush()
+
+    folder = working_dir / "uploads" / f"user_{user.id}" / f"dataset_{dataset.id}"
+    folder.mkdir(parents=True)
+    (folder / "data.csv").write_bytes(content)
+    hubfile = Hubfile(
+        name="data.csv", checksum=hashlib.sha256(content).hexdigest(), size=len(content), feature_model_id=fm.id
+    )
+    db.session.add(hubfile)
+    db.session.commit()
+    HubfileStatsService().compute_for_hubfile(hubfile)
+    return dataset
+
+
+@pytest.fixture(scope="module")
+def content_datasets(test_client, tmp_path_factory):
+    working_dir = tmp_path_factory.mktemp("content_search")
+    with patch.dict(os.environ, {"WORKING_DIR": str(working_dir)}):
+        user = User.query.filter_by(email="test@example.com").first()
+        hot = _dataset_with_csv(
+            user,
+            working_dir,
+            "Hot summer",
+            _csv([("2019-06-30", 30.5, 40), ("2019-07-10", 41.2, 12), ("2019-07-11", 40.5, 15), ("2020-01-01", 5, 80)]),
+        )
+        mild = _dataset_with_csv(
+            user, working_dir, "Mild summer", _csv([("2019-07-10", 35.0, 50), ("2019-08-01", 39.9, "NA")])
+        )
+        earlier = _dataset_with_csv(
+            user, working_dir, "Hot 2018", _csv([("2018-07-10", 42.0, 10), ("2019-07-10", 20.0, 60)])
+        )
+        old_version = _dataset_with_csv(
+            user, working_dir, "Old version", _csv([("2019-07-10", 45.0, 5)]), is_latest=False
+        )
+        yield {"hot": hot, "mild": mild, "earlier": earlier, "old_version": old_version}
+
+
+def test_parse_predicate():
+    predicate = parse_predicate(" _temp_max >= 40.5 ")
+    assert (predicate.column, predicate.op, predicate.value) == ("_temp_max", ">=", 40.5)
+    assert parse_predicate("BASEL_humidity==-1e1").op == "="
+    for text in ("temp", "_temp_max > hot", "a;b>1", ""):
+        with pytest.raises(ValueError):
+            parse_predicate(text)
+
+
+def test_scan_column_handles_unsorted_dates_and_missing_values(tmp_path):
+    csv_path = tmp_path / "unsorted.csv"
+    csv_path.write_text("DATE,X_temp_max\n2019-07-02,41\n2019-07-01,NA\n2018-07-01,45\n2019-07-03,40\n")
+    write_sidecar(str(csv_path), str(tmp_path / "unsorted.wcol"))
+    with ColumnarFile(str(tmp_path / "unsorted.wcol")) as columnar:
+        predicate = parse_predicate("X_temp_max>=40")
+        assert scan_column(columnar, "X_temp_max", predicate) == (3, date(2019, 7, 2))
+        assert scan_column(columnar, "X_temp_max", predicate, date(2019, 1, 1), date(2019, 12, 31)) == (
+            2,
+            date(2019, 7, 2),
+        )
+        assert scan_column(columnar, "X_temp_max", parse_predicate("X_temp_max!=41")) == (2, date(2018, 7, 1))
+
+
+def test_content_search_prunes_and_verifies(test_client, content_datasets):
+    with test_client.application.test_request_context():
+        result = ExploreService().content_search(
+            [parse_predicate("_temp_max>40")], start_date=date(2019, 1, 1), end_date=date(2019, 12, 31)
+        )
+    assert [d["id"] for d in result["datasets"]] == [content_datasets["hot"].id]
+    assert result["datasets"][0]["matches"][0]["rows"] == 2
+    assert result["datasets"][0]["matches"][0]["first_date"] == "2019-07-10"
+    # The mild file never reaches 40 and the 2018 heat is outside the range: neither is scanned
+    assert result["scanned_files"] == 1
+
+
+def test_content_search_without_dates_uses_file_zone_maps(test_client, content_datasets):
+    with test_client.application.test_request_context():
+        result = ExploreService().content_search([parse_predicate("_temp_max>40")])
+    ids = {d["id"] for d in result["datasets"]}
+    assert ids == {content_datasets["hot"].id, content_datasets["earlier"].id}
+
+
+def test_content_search_requires_every_predicate(test_client, content_datasets):
+    with test_client.application.test_request_context():
+        result = ExploreService().content_search([parse_predicate("_temp_max>40"), parse_predicate("_humidity<11")])
+    assert [d["id"] for d in result["datasets"]] == [content_datasets["earlier"].id]
+
+
+def test_content_search_endpoint(test_client, content_datasets):
+    response = test_client.get("/explore/content?where=BASEL_temp_max>41&start_date=2019-07-01&end_date=2019-07-31")
+    assert response.status_code == 200
+    assert [d["title"] for d in response.get_json()["datasets"]] == ["Hot summer"]
+
+    assert test_client.get("/explore/content").status_code == 400
+    assert test_client.get("/explore/content?where=_temp_max>40&start_date=2019-13-01").status_code == 400
+
+
+def test_scan_column_matches_decimals_not_representable_in_float32(tmp_path):
+    csv_path = tmp_path / "decimal.csv"
+    csv_path.write_text("DATE,X_temp_max\n2019-07-01,40.1\n2019-07-02,40.2\n")
+    write_sidecar(str(csv_path), str(tmp_path / "decimal.wcol"))
+    with ColumnarFile(str(tmp_path / "decimal.wcol")) as columnar:
+        assert scan_column(columnar, "X_temp_max", parse_predicate("X_temp_max=40.1")) == (1, date(2019, 7, 1))
+        assert scan_column(columnar, "X_temp_max", parse_predicate("X_temp_max>=40.1")) == (2, date(2019, 7, 1))
+        assert scan_column(columnar, "X_temp_max", parse_predicate("X_temp_max<40.1")) == (0, None)
+
+
+def test_content_search_zone_maps_admit_float32_decimals(test_client, content_datasets, tmp_path):
+    with patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+        user = User.query.filter_by(email="test@example.com").first()
+        decimal = _dataset_with_csv(user, tmp_path, "Decimal humidity", _csv([("2021-03-03", 10, 40.1)]))
+        with test_client.application.test_request_context():
+            for text in ("_humidity=40.1", "_humidity>=40.1", "_humidity<=40.1"):
+                result = ExploreService().content_search(
+                    [parse_predicate(text)], start_date=date(2021, 1, 1), end_date=date(2021, 12, 31)
+                )
+                assert [d["id"] for d in result["datasets"]] == [decimal.id], text
+            result = ExploreService().content_search([parse_predicate("_humidity>40.1")], start_date=date(2021, 1, 1))
+            assert result["datasets"] == []
@@ -0,0 +1,96 @@
+"""
+Tests for the explore facet counts and their cache.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+from app.modules.explore.facets import build_facets, facets_cache, facets_key
+from app.modules.explore.services import ExploreService
+from core.caching.ttl_cache import TTLCache
+
+TAG = "facetmarker"
+
+
+@pytest.fixture(scope="module")
+def facet_datasets(test_client):
+    user = create_user("explore_facets@example.com")
+
+    specs = [
+        (PublicationType.NATIONAL, f"{TAG}, Rain", datetime(2023, 5, 1), True),
+        (PublicationType.NATIONAL, f"{TAG}, rain, wind", datetime(2024, 1, 1), True),
+        (PublicationType.REGIONAL, f"{TAG}", datetime(2024, 6, 1), True),
+        (PublicationType.REGIONAL, f"{TAG}, wind", datetime(2024, 7, 1), False),
+    ]
+    for publication_type, tags, created_at, is_latest in specs:
+        create_dataset(
+            user, "Facet dataset", "Facets", publication_type, tags=tags, created_at=created_at, is_latest=is_latest
+        )
+    db.session.commit()
+    facets_cache.clear()
+    yield
+    facets_cache.clear()
+
+
+def test_build_facets_folds_groups():
+    groups = [
+        (PublicationType.NATIONAL, "Rain, wind", 2024, 2),
+        (PublicationType.NATIONAL, "rain", 2023, 1),
+        (PublicationType.OTHER, None, 2024, 1),
+    ]
+    facets = build_facets(groups)
+    assert facets["total"] == 4
+    assert facets["publication_type"][0] == {"value": "national", "label": "National", "count": 3}
+    assert facets["tags"] == [{"value": "Rain", "count": 3}, {"value": "wind", "count": 2}]
+    assert facets["years"] == [{"value": 2024, "count": 3}, {"value": 2023, "count": 1}]
+
+
+def test_facets_key_is_normalised():
+    assert facets_key(query="Lluvia  Madrid", tags="b, A") == facets_key(query="madrid lluvia", tags="a,b", sorting="x")
+    assert facets_key(query="a") != facets_key(query="a", publication_type="national")
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(ttl=60)
+    cache.put("k", 1)
+    assert cache.get("k") == 1
+    assert cache.get("k", ttl=0) is None
+    assert len(cache) == 0
+
+
+def test_facets_count_latest_versions(test_client, facet_datasets):
+    with test_client.application.test_request_context():
+        facets = ExploreService().facets(tags=TAG)
+    assert facets["total"] == 3
+    assert {f["value"]: f["count"] for f in facets["publication_type"]} == {"national": 2, "regional": 1}
+    assert {t["value"].lower(): t["count"] for t in facets["tags"]} == {TAG: 3, "rain": 2, "wind": 1}
+    assert facets["years"] == [{"value": 2024, "count": 2}, {"value": 2023, "count": 1}]
+
+
+def test_facets_are_cached_until_a_dataset_is_published(test_client, facet_datasets):
+    with test_client.application.test_request_context():
+        service = ExploreService()
+        first = service.facets(tags=TAG)
+        meta = DSMetaData(title="Late", description="Facets", publication_type=PublicationType.OTHER, tags=TAG)
+        db.session.add(meta)
+        db.session.flush()
+        dataset = DataSet(user_id=1, ds_meta_data_id=meta.id, created_at=datetime(2025, 1, 1))
+        db.session.add(dataset)
+        db.session.commit()
+
+        assert service.facets(tags=TAG) is first
+        ExploreService.index_dataset(dataset)
+        assert service.facets(tags=TAG)["total"] == first["total"] + 1
+
+
+def test_facets_endpoint(test_client, facet_datasets):
+    facets_cache.clear()
+    response = test_client.get(f"/explore/facets?tags={TAG}&publication_type=national")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 2
+    assert [f["value"] for f in data["publication_type"]] == ["national"]
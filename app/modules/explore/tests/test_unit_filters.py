@@ -218,6 +218,19 @@ def test_search_filter_by_single_tag(test_client, test_user):
     assert ds_without_tag.id not in result_ids, "Dataset without matching tag should not be in results"
 
 
+def test_search_filter_by_tag_is_exact_and_case_insensitive(test_client, test_user):
+    """Tags match as whole tags: 'rain' must not match 'rainfall', but matches 'Rain'."""
+    repo = ExploreRepository()
+
+    ds_exact = _create_dataset_with_authors(user=test_user, title="Exact tag", tags_str="Rain_exact_ghi456, wind")
+    ds_longer = _create_dataset_with_authors(user=test_user, title="Longer tag", tags_str="rain_exact_ghi456fall")
+
+    result_ids = [d.id for d in repo.filter(tags="rain_exact_ghi456")]
+
+    assert ds_exact.id in result_ids
+    assert ds_longer.id not in result_ids
+
+
 def test_search_filter_by_multiple_tags(test_client, test_user):
     """Filter with multiple tags should return datasets containing ALL specified tags (AND logic)."""
     repo = ExploreRepository()
@@ -0,0 +1,125 @@
+"""
+Tests for the keyset-paginated explore results and the infinite scroll endpoints.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.explore.services import ExploreService, decode_cursor, encode_cursor
+
+TAG = "keysetpagination"
+
+
+@pytest.fixture(scope="module")
+def paged_datasets(test_client):
+    """Seven datasets tagged with TAG: five latest (two sharing a timestamp) and two old versions."""
+    user = create_user("explore_pagination@example.com")
+
+    base = datetime(2024, 3, 1, 12, 0, 0)
+    specs = [
+        ("First", base, True),
+        ("Second", base + timedelta(days=1), True),
+        ("Third", base + timedelta(days=2), True),
+        ("Third twin", base + timedelta(days=2), True),
+        ("Fifth", base + timedelta(days=3), True),
+        ("Old version A", base + timedelta(days=4), False),
+        ("Old version B", base - timedelta(days=4), False),
+    ]
+    datasets = []
+    for title, created_at, is_latest in specs:
+        datasets.append(
+            create_dataset(
+                user, f"{title} {TAG}", "Pagination test", tags=TAG, created_at=created_at, is_latest=is_latest
+            )
+        )
+    db.session.commit()
+    return datasets
+
+
+def _walk(service, limit, **filters):
+    seen, cursor = [], None
+    while True:
+        page, cursor = service.filter_page(cursor=cursor, limit=limit, tags=TAG, **filters)
+        seen.extend(ds.ds_meta_data.title.replace(f" {TAG}", "") for ds in page)
+        if cursor is None:
+            return seen
+
+
+def test_cursor_round_trip(paged_datasets):
+    dataset = paged_datasets[0]
+    assert decode_cursor(encode_cursor(dataset)) == (dataset.created_at, dataset.id)
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_pages_cover_latest_versions_once_newest_first(test_client, paged_datasets):
+    with test_client.application.test_request_context():
+        titles = _walk(ExploreService(), limit=2)
+    assert titles == ["Fifth", "Third twin", "Third", "Second", "First"]
+
+
+def test_pages_oldest_first(test_client, paged_datasets):
+    with test_client.application.test_request_context():
+        titles = _walk(ExploreService(), limit=3, sorting="oldest")
+    assert titles == ["First", "Second", "Third", "Third twin", "Fifth"]
+
+
+def test_count_only_latest(test_client, paged_datasets):
+    with test_client.application.test_request_context():
+        assert ExploreService().count(tags=TAG) == 5
+
+
+def test_page_endpoint_json(test_client, paged_datasets):
+    response = test_client.get(f"/explore/page?tags={TAG}&limit=4")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data["datasets"]) == 4
+    assert data["has_more"] is True
+    assert data["datasets"][0]["title"] == f"Fifth {TAG}"
+    assert data["datasets"][0]["tags"] == [TAG]
+
+    response = test_client.get(f"/explore/page?tags={TAG}&limit=4&cursor={data['next_cursor']}")
+    data = response.get_json()
+    assert [d["title"] for d in data["datasets"]] == [f"First {TAG}"]
+    assert data["next_cursor"] is None
+
+
+def test_page_endpoint_html_fragment(test_client, paged_datasets):
+    response = test_client.get(f"/explore/page?tags={TAG}&limit=2&format=html")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert f"Fifth {TAG}" in body and f"Third twin {TAG}" in body
+    assert "<html" not in body
+    assert response.headers["X-Next-Cursor"]
+
+
+def test_page_endpoint_rejects_bad_input(test_client, paged_datasets):
+    assert test_client.get("/explore/page?cursor=%%%").status_code == 400
+    assert test_client.get("/explore/page?format=xml").status_code == 400
+
+
+def test_post_search_returns_page(test_client, paged_datasets):
+    response = test_client.post("/explore/", json={"tags": TAG, "sorting": "oldest", "limit": 2})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [d["title"] for d in data["datasets"]] == [f"First {TAG}", f"Second {TAG}"]
+    assert data["has_more"] is True
+
+
+def test_index_renders_first_page_and_sentinel(test_client, paged_datasets):
+    test_client.application.config["EXPLORE_PAGE_SIZE"] = 2
+    try:
+        response = test_client.get(f"/explore/?tags={TAG}")
+    finally:
+        test_client.application.config["EXPLORE_PAGE_SIZE"] = 20
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "5 datasets found" in body
+    assert f"Fifth {TAG}" in body and f"Second {TAG}" not in body
+    assert 'id="results-sentinel"' in body
@@ -0,0 +1,155 @@
+"""
+Tests for the in-process inverted index used by the explore search.
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.models import Author, DataSetConcept, PublicationType
+from app.modules.dataset.services import DSMetaDataService
+from app.modules.explore.search_index import IndexEntry, SearchIndex, search_index
+from app.modules.explore.services import ExploreService
+
+
+@pytest.fixture
+def index_user(test_client):
+    user = User.query.filter_by(email="search_index@example.com").first()
+    if not user:
+        user = create_user("search_index@example.com")
+        db.session.commit()
+    return user
+
+
+@pytest.fixture
+def fresh_index(test_client, tmp_path):
+    test_client.application.config["SEARCH_INDEX_SNAPSHOT"] = str(tmp_path / "search_index.json")
+    search_index.reset()
+    yield search_index
+    search_index.reset()
+    test_client.application.config["SEARCH_INDEX_SNAPSHOT"] = None
+
+
+def _create_dataset(user, title, description="Weather data", tags="", authors=()):
+    authors = [Author(name=name, affiliation=affiliation) for name, affiliation in authors]
+    dataset = create_dataset(user, title, description, tags=tags, authors=authors)
+    db.session.commit()
+    return dataset
+
+
+def test_search_index_intersects_prefix_postings():
+    index = SearchIndex()
+    index.add(1, ["basel", "temperature", "daily"])
+    index.add(2, ["basel", "precipitation"])
+    index.add(3, ["madrid", "temperature"])
+
+    assert index.search(["basel"]) == {1, 2}
+    assert index.search(["temp", "basel"]) == {1}
+    assert index.search(["unknown"]) == set()
+
+    index.add(1, ["madrid"])
+    assert index.search(["temp"]) == {3}
+    index.remove(3)
+    assert index.search(["madrid"]) == {1}
+    assert "temperature" not in index.vocabulary
+
+
+def test_search_index_snapshot_round_trip():
+    index = SearchIndex()
+    index.add(7, ["zurich", "wind"])
+
+    restored = SearchIndex.from_snapshot(index.to_snapshot())
+
+    assert restored.search(["zur"]) == {7}
+    assert len(restored) == 1
+
+
+def test_search_index_keeps_latest_version_and_filters_in_process():
+    index = SearchIndex()
+    old = IndexEntry.create(datetime(2024, 1, 5), PublicationType.REGIONAL, "Rain", concept_id=9)
+    index.add(1, ["basel"], old)
+    index.add(2, ["basel"], old._replace(created_at=datetime(2024, 3, 1)))
+    index.add(3, ["basel"], IndexEntry.create(datetime(2023, 6, 1), PublicationType.NATIONAL, "rain, wind", None))
+
+    assert index.search(["basel"]) == {2, 3}
+    assert set(index.select(["basel"], publication_type="national")) == {3}
+    assert set(index.select(["basel"], tags=["rain", "wind"])) == {3}
+    assert set(index.select(["basel"], since=datetime(2024, 1, 1))) == {2}
+    assert set(index.select(["basel"], before=datetime(2024, 1, 1))) == {3}
+
+    restored = SearchIndex.from_snapshot(index.to_snapshot())
+    assert restored.select(["basel"]) == index.select(["basel"])
+
+
+def test_explore_filter_uses_index_for_text_query(fresh_index, index_user):
+    matching = _create_dataset(
+        index_user, "Estación Sevilla", tags="meteo, andalucia", authors=[("Lucía Pérez", "Universidad de Sevilla")]
+    )
+    _create_dataset(index_user, "Bilbao rainfall", authors=[("Ane Etxeberria", "UPV")])
+
+    results = ExploreService().filter(query="estacion perez sevilla")
+    assert [ds.id for ds in results] == [matching.id]
+
+    # Author affiliation and tags are indexed too, with accent-insensitive tokens
+    assert matching.id in {ds.id for ds in ExploreService().filter(query="andalucía universidad")}
+    assert ExploreService().filter(query="nonexistentwordxyz") == []
+
+
+def test_index_follows_new_and_edited_datasets(fresh_index, index_user):
+    first = _create_dataset(index_user, "Granada humidity series")
+    assert first.id in fresh_index.search("granada")
+
+    # Created after the index was built (e.g. by another worker): picked up on the next refresh
+    second = _create_dataset(index_user, "Granada wind gusts")
+    assert {first.id, second.id} <= fresh_index.search("granada")
+
+    DSMetaDataService().update(second.ds_meta_data_id, title="Almeria wind gusts")
+    assert second.id not in fresh_index.search("granada")
+    assert second.id in fresh_index.search("almeria")
+
+
+def test_index_is_loaded_from_snapshot(fresh_index, index_user, tmp_path):
+    dataset = _create_dataset(index_user, "Snapshot Teruel frost")
+    fresh_index.search("teruel")
+    assert (tmp_path / "search_index.json").exists()
+
+    fresh_index.reset()
+    assert dataset.id in fresh_index.search("teruel")
+
+
+def test_text_search_pages_and_counts_from_the_index(fresh_index, index_user):
+    created = [_create_dataset(index_user, f"Pamplona snow {i}", tags="nieve") for i in range(3)]
+    service = ExploreService()
+    fetched = []
+    get_latest_by_ids = service.repository.get_latest_by_ids
+
+    def record(ids):
+        fetched.append(list(ids))
+        return get_latest_by_ids(ids)
+
+    with patch.object(service.repository, "get_latest_by_ids", side_effect=record):
+        first, cursor = service.filter_page(limit=2, query="pamplona")
+        second, last = service.filter_page(cursor=cursor, limit=2, query="pamplona")
+
+    assert [d.id for d in first + second] == [d.id for d in reversed(created)]
+    assert last is None
+    # A SQL solo llegan los ids de la página (más uno para saber si hay otra)
+    assert all(len(ids) <= 3 for ids in fetched)
+    assert service.count(query="pamplona", tags="nieve") == 3
+    assert service.facets(query="pamplona snow")["tags"] == [{"value": "nieve", "count": 3}]
+
+    # Una versión nueva sustituye a la anterior en el índice
+    concept = DataSetConcept(conceptual_doi="10.1234/pamplona")
+    db.session.add(concept)
+    db.session.flush()
+    created[0].ds_concept_id = concept.id
+    created[0].is_latest = False
+    newer = _create_dataset(index_user, "Pamplona snow v2")
+    newer.ds_concept_id = concept.id
+    db.session.commit()
+    assert created[0].id not in fresh_index.search("pamplona")
+    assert newer.id in fresh_index.search("pamplona")
@@ -0,0 +1,152 @@
+"""
+Tests for the autocomplete prefix index.
+"""
+
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_dataset, create_user
+from app.modules.dataset.models import Author, DataSet, DSMetaData, DSViewRecord, PublicationType
+from app.modules.explore.repositories import ExploreRepository
+from app.modules.explore.services import ExploreService
+from app.modules.explore.suggest import SuggestIndex, suggest_index
+
+
+def test_prefix_matches_any_word_and_ranks_by_weight():
+    index = SuggestIndex()
+    index.add_dataset(1, [("title", "Lluvia en Madrid"), ("author", "Ana Pérez")], engagement=0)
+    index.add_dataset(2, [("title", "Madrid temperatures"), ("tag", "madrid")], engagement=5)
+
+    texts = [s["text"] for s in index.suggest("madr")]
+    assert texts[:2] == ["madrid", "Madrid temperatures"]
+    assert "Lluvia en Madrid" in texts
+    assert [s["type"] for s in index.suggest("pere")] == ["author"]
+    assert index.suggest("") == []
+
+
+def test_weights_are_shared_and_removed_with_datasets():
+    index = SuggestIndex()
+    index.add_dataset(1, [("tag", "rain")], engagement=2)
+    index.add_dataset(2, [("tag", "rain")], engagement=0)
+    assert index.suggest("ra")[0]["weight"] == 4.0
+
+    index.remove_dataset(1)
+    assert index.suggest("ra")[0]["weight"] == 1.0
+    index.remove_dataset(2)
+    assert index.suggest("ra") == []
+    assert len(index.keys) == 0
+
+
+def test_readding_keeps_weight_and_refreshes_texts():
+    index = SuggestIndex()
+    index.add_dataset(1, [("title", "Old title")], engagement=3)
+    assert index.suggest("old")
+    index.add_dataset(1, [("title", "New title")])
+    assert index.suggest("old") == []
+    assert index.suggest("new")[0]["weight"] == 4.0
+
+
+def test_suggest_is_fast_on_a_large_index():
+    index = SuggestIndex()
+    for i in range(5000):
+        index.add_dataset(i, [("title", f"Station {i} weather"), ("tag", f"tag{i % 50}")], engagement=i % 7)
+    index.suggest("st")
+    started = time.perf_counter()
+    for prefix in ("sta", "station 12", "weat", "tag1"):
+        assert index.suggest(prefix)
+    assert (time.perf_counter() - started) / 4 < 0.05
+
+
+@pytest.fixture(scope="module")
+def suggest_dataset(test_client):
+    user = create_user("suggest@example.com")
+    dataset = create_dataset(
+        user,
+        "Zaragoza wind atlas",
+        "Suggest",
+        PublicationType.REGIONAL,
+        authors=[Author(name="Zoe Zamora", affiliation="Universidad de Zaragoza")],
+        tags="zonda-winds",
+    )
+    db.session.add(DSViewRecord(dataset_id=dataset.id, view_cookie="c1"))
+    db.session.commit()
+    suggest_index.reset()
+    yield dataset
+    suggest_index.reset()
+
+
+def test_suggest_endpoint(test_client, suggest_dataset):
+    response = test_client.get("/explore/suggest?q=zaragoza")
+    assert response.status_code == 200
+    suggestions = response.get_json()["suggestions"]
+    assert {(s["type"], s["text"]) for s in suggestions} == {
+        ("title", "Zaragoza wind atlas"),
+        ("affiliation", "Universidad de Zaragoza"),
+    }
+    assert all(s["weight"] == 2.0 for s in suggestions)
+
+    response = test_client.get("/explore/suggest?q=zon")
+    assert response.get_json()["suggestions"][0] == {"text": "zonda-winds", "type": "tag", "weight": 2.0}
+
+
+def test_suggest_endpoint_limit_defaults_to_config(test_client, suggest_dataset):
+    with patch.dict(test_client.application.config, {"SUGGEST_LIMIT": 1}):
+        assert len(test_client.get("/explore/suggest?q=zaragoza").get_json()["suggestions"]) == 1
+        assert len(test_client.get("/explore/suggest?q=zaragoza&limit=5").get_json()["suggestions"]) == 2
+
+
+def test_published_dataset_is_added_incrementally(test_client, suggest_dataset):
+    with test_client.application.test_request_context():
+        service = ExploreService()
+        assert service.suggest("zaragoza")
+        meta = DSMetaData(title="Zaragoza rainfall", description="New", publication_type=PublicationType.OTHER)
+        db.session.add(meta)
+        db.session.flush()
+        dataset = DataSet(user_id=suggest_dataset.user_id, ds_meta_data_id=meta.id, created_at=datetime.utcnow())
+        db.session.add(dataset)
+        db.session.commit()
+
+        ExploreService.index_dataset(dataset)
+        assert "Zaragoza rainfall" in [s["text"] for s in service.suggest("zaragoza r")]
+
+
+def test_async_index_is_built_off_request(test_client, suggest_dataset):
+    config = test_client.application.config
+    suggest_index.reset()
+    config["SUGGEST_ASYNC"] = True
+    try:
+        with patch.object(suggest_index, "start") as start:
+            with patch.object(suggest_index, "rebuild", wraps=suggest_index.rebuild) as rebuild:
+                response = test_client.get("/explore/suggest?q=zaragoza")
+                assert response.get_json()["suggestions"] == []
+                assert start.called
+                assert not rebuild.called
+
+            with test_client.application.app_context():
+                suggest_index.rebuild()
+            response = test_client.get("/explore/suggest?q=zaragoza")
+            assert "Zaragoza wind atlas" in [s["text"] for s in response.get_json()["suggestions"]]
+    finally:
+        config["SUGGEST_ASYNC"] = False
+        suggest_index.reset()
+
+
+def test_changes_during_a_rebuild_are_replayed(test_client, suggest_dataset):
+    iter_documents = ExploreRepository.iter_suggest_documents
+
+    def iter_while_removed(repository, *args, **kwargs):
+        for dataset in iter_documents(repository, *args, **kwargs):
+            yield dataset
+        suggest_index.remove_dataset(suggest_dataset.id)
+
+    with test_client.application.test_request_context():
+        suggest_index.rebuild()
+        with patch.object(ExploreRepository, "iter_suggest_documents", iter_while_removed):
+            suggest_index.rebuild()
+
+        assert "Zaragoza wind atlas" not in [s["text"] for s in suggest_index.suggest("zaragoza")]
+    suggest_index.reset()
@@ -14,6 +14,13 @@ class Hubfile(db.Model):
     checksum = db.Column(db.String(120), nullable=False)
     size = db.Column(db.Integer, nullable=False)
     feature_model_id = db.Column(db.Integer, db.ForeignKey("feature_model.id"), nullable=False)
+    # CSV con filas sin validar en la subida (False) hasta que el resto se valida en segundo plano (True);
+    # None para ficheros sin validación de filas
+    rows_validated = db.Column(db.Boolean, nullable=True)
+    row_errors = db.Column(db.Text, nullable=True)
+    column_stats = db.relationship("HubfileColumnStats", backref="file", lazy=True, cascade="all, delete")
+    month_stats = db.relationship("HubfileMonthStats", backref="file", lazy=True, cascade="all, delete")
+    stations = db.relationship("HubfileStation", backref="file", lazy=True, cascade="all, delete")
 
     def get_formatted_size(self):
         from app.modules.dataset.services import SizeService
@@ -76,3 +83,96 @@ class HubfileDownloadRecord(db.Model):
             f"date={self.download_date} "
             f"cookie={self.download_cookie}>"
         )
+
+
+class HubfileColumnStats(db.Model):
+    """Zone map of one CSV column over the whole file."""
+
+    __tablename__ = "file_column_stats"
+    __table_args__ = (db.UniqueConstraint("file_id", "column_name", name="uq_file_column_stats"),)
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey("file.id"), nullable=False, index=True)
+    column_name = db.Column(db.String(120), nullable=False)
+    # Columna requerida a la que corresponde (p.ej. '_temp_max'), si la hay
+    field = db.Column(db.String(50), nullable=True, index=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    null_count = db.Column(db.Integer, nullable=False, default=0)
+    min_value = db.Column(db.Float, nullable=True)
+    max_value = db.Column(db.Float, nullable=True)
+    mean = db.Column(db.Float, nullable=True)
+    sum_squares = db.Column(db.Float, nullable=True)
+
+    def to_dict(self):
+        return {
+            "column": self.column_name,
+            "field": self.field,
+            "count": self.count,
+            "null_count": self.null_count,
+            "min": self.min_value,
+            "max": self.max_value,
+            "mean": self.mean,
+            "sum_squares": self.sum_squares,
+        }
+
+    def __repr__(self):
+        return f"<FileColumnStats file_id={self.file_id} column={self.column_name}>"
+
+
+class HubfileMonthStats(db.Model):
+    """Zone map of one CSV column for one calendar month."""
+
+    __tablename__ = "file_month_stats"
+    __table_args__ = (
+        db.UniqueConstraint("file_id", "column_name", "year", "month", name="uq_file_month_stats"),
+        db.Index("ix_file_month_stats_field_period", "field", "year", "month"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey("file.id"), nullable=False, index=True)
+    column_name = db.Column(db.String(120), nullable=False)
+    field = db.Column(db.String(50), nullable=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    null_count = db.Column(db.Integer, nullable=False, default=0)
+    min_value = db.Column(db.Float, nullable=True)
+    max_value = db.Column(db.Float, nullable=True)
+    mean = db.Column(db.Float, nullable=True)
+    sum_squares = db.Column(db.Float, nullable=True)
+
+    def to_dict(self):
+        return {
+            "column": self.column_name,
+            "field": self.field,
+            "year": self.year,
+            "month": self.month,
+            "count": self.count,
+            "null_count": self.null_count,
+            "min": self.min_value,
+            "max": self.max_value,
+            "mean": self.mean,
+            "sum_squares": self.sum_squares,
+        }
+
+    def __repr__(self):
+        return f"<FileMonthStats file_id={self.file_id} column={self.column_name} {self.year}-{self.month:02d}>"
+
+
+class HubfileStation(db.Model):
+    """One station-qualified measurement column of a CSV (e.g. 'BASEL_precipitation')."""
+
+    __tablename__ = "file_station"
+    __table_args__ = (
+        db.UniqueConstraint("file_id", "column_name", name="uq_file_station"),
+        db.Index("ix_file_station_station_field", "station", "field"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey("file.id"), nullable=False, index=True)
+    station = db.Column(db.String(120), nullable=False)
+    field = db.Column(db.String(50), nullable=False)
+    column_name = db.Column(db.String(120), nullable=False)
+
+    def to_dict(self):
+        return {"station": self.station, "field": self.field, "column": self.column_name}
+
+    def __repr__(self):
+        return f"<FileStation file_id={self.file_id} station={self.station} field={self.field}>"
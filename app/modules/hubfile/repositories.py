@@ -1,13 +1,41 @@
-from sqlalchemy import func
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import selectinload
 
 from app import db
 from app.modules.auth.models import User
+from app.modules.dataset.columnar import to_float32
 from app.modules.dataset.models import DataSet
+from app.modules.dataset.validator import normalize_field
 from app.modules.featuremodel.models import FeatureModel
-from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord, HubfileViewRecord
+from app.modules.hubfile.models import (
+    Hubfile,
+    HubfileColumnStats,
+    HubfileDownloadRecord,
+    HubfileMonthStats,
+    HubfileStation,
+    HubfileViewRecord,
+)
 from core.repositories.BaseRepository import BaseRepository
 
 
+def _zone_may_match(model, op: str, value: float):
+    """SQL condition under which a zone with ``model.min_value`` / ``max_value`` can hold ``value op`` rows."""
+    # Las zonas se calculan sobre valores float32: la constante se redondea igual
+    value = to_float32(value)
+    if op in (">", ">="):
+        return model.max_value > value if op == ">" else model.max_value >= value
+    if op in ("<", "<="):
+        return model.min_value < value if op == "<" else model.min_value <= value
+    if op == "=":
+        return and_(model.min_value <= value, model.max_value >= value)
+    return or_(model.min_value != value, model.max_value != value)
+
+
+def _column_filter(model, column: str):
+    field = normalize_field(column)
+    return model.field == field if field is not None else model.column_name == column
+
+
 class HubfileRepository(BaseRepository):
     def __init__(self):
         super().__init__(Hubfile)
@@ -25,6 +53,19 @@ class HubfileRepository(BaseRepository):
     def get_dataset_by_hubfile(self, hubfile: Hubfile) -> DataSet:
         return db.session.query(DataSet).join(FeatureModel).join(Hubfile).filter(Hubfile.id == hubfile.id).first()
 
+    def get_latest_with_datasets(self, file_ids):
+        """``(Hubfile, DataSet)`` pairs for the given files that belong to the latest dataset versions."""
+        if not file_ids:
+            return []
+        return (
+            db.session.query(Hubfile, DataSet)
+            .join(FeatureModel, Hubfile.feature_model_id == FeatureModel.id)
+            .join(DataSet, FeatureModel.data_set_id == DataSet.id)
+            .filter(Hubfile.id.in_(list(file_ids)), DataSet.is_latest.is_(True))
+            .options(selectinload(DataSet.ds_meta_data))
+            .all()
+        )
+
 
 class HubfileViewRecordRepository(BaseRepository):
     def __init__(self):
@@ -42,3 +83,106 @@ class HubfileDownloadRecordRepository(BaseRepository):
     def total_hubfile_downloads(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
+
+
+class HubfileColumnStatsRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(HubfileColumnStats)
+
+    def get_by_file(self, file_id: int):
+        return self.model.query.filter_by(file_id=file_id).order_by(self.model.id).all()
+
+    def delete_for_file(self, file_id: int) -> None:
+        self.model.query.filter_by(file_id=file_id).delete(synchronize_session=False)
+
+    def candidate_columns(self, column: str, op: str, value: float):
+        """``(file_id, column_name)`` whose whole-file min / max admit the predicate."""
+        return (
+            db.session.query(self.model.file_id, self.model.column_name)
+            .filter(_column_filter(self.model, column), _zone_may_match(self.model, op, value))
+            .distinct()
+            .all()
+        )
+
+    def find_computed_file_id(self, checksum: str, exclude_file_id: int):
+        """Return the id of another file with the same content whose stats are already computed."""
+        return (
+            db.session.query(Hubfile.id)
+            .join(self.model, self.model.file_id == Hubfile.id)
+            .filter(Hubfile.checksum == checksum, Hubfile.id != exclude_file_id)
+            .limit(1)
+            .scalar()
+        )
+
+
+class HubfileMonthStatsRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(HubfileMonthStats)
+
+    def get_by_file(self, file_id: int):
+        return (
+            self.model.query.filter_by(file_id=file_id)
+            .order_by(self.model.column_name, self.model.year, self.model.month)
+            .all()
+        )
+
+    def candidate_columns(self, column: str, op: str, value: float, start=None, end=None):
+        """
+        ``(file_id, column_name)`` with at least one month in ``[start, end]`` whose min / max
+        admit the predicate; served by ix_file_month_stats_field_period for required tokens.
+        """
+        q = db.session.query(self.model.file_id, self.model.column_name).filter(
+            _column_filter(self.model, column), _zone_may_match(self.model, op, value)
+        )
+        if start is not None:
+            q = q.filter(
+                or_(self.model.year > start.year, and_(self.model.year == start.year, self.model.month >= start.month))
+            )
+        if end is not None:
+            q = q.filter(
+                or_(self.model.year < end.year, and_(self.model.year == end.year, self.model.month <= end.month))
+            )
+        return q.distinct().all()
+
+    def delete_for_file(self, file_id: int) -> None:
+        self.model.query.filter_by(file_id=file_id).delete(synchronize_session=False)
+
+
+class HubfileStationRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(HubfileStation)
+
+    def get_by_file(self, file_id: int):
+        return self.model.query.filter_by(file_id=file_id).order_by(self.model.station, self.model.field).all()
+
+    def delete_for_file(self, file_id: int) -> None:
+        self.model.query.filter_by(file_id=file_id).delete(synchronize_session=False)
+
+    def _datasets_query(self, latest_only: bool):
+        q = (
+            db.session.query(DataSet.id)
+            .join(FeatureModel, FeatureModel.data_set_id == DataSet.id)
+            .join(Hubfile, Hubfile.feature_model_id == FeatureModel.id)
+            .join(self.model, self.model.file_id == Hubfile.id)
+        )
+        if latest_only:
+            q = q.filter(DataSet.is_latest.is_(True))
+        return q
+
+    def find_dataset_ids(self, station: str, field: str = None, latest_only: bool = True):
+        """Ids of the datasets with a column for ``station`` (and ``field``), via ix_file_station_station_field."""
+        q = self._datasets_query(latest_only).filter(self.model.station == station)
+        if field is not None:
+            q = q.filter(self.model.field == field)
+        return [row.id for row in q.distinct().order_by(DataSet.id)]
+
+    def catalogue(self, latest_only: bool = True):
+        """``(station, field, number of datasets)`` for every station variable."""
+        datasets = func.count(func.distinct(DataSet.id))
+        return (
+            self._datasets_query(latest_only)
+            .with_entities(self.model.station, self.model.field, datasets)
+            .group_by(self.model.station, self.model.field)
+            .order_by(self.model.station, self.model.field)
+            .all()
+        )
@@ -1,14 +1,17 @@
+import csv
+import io
+import json
+import math
 import os
 import uuid
-from datetime import datetime, timezone
 
-from flask import current_app, jsonify, make_response, request, send_from_directory
+from flask import Response, current_app, jsonify, make_response, request, send_from_directory, stream_with_context
 from flask_login import current_user
 
-from app import db
+from app.modules.dataset.ingestion import FILE_DOWNLOAD, FILE_VIEW, record_buffer
+from app.modules.dataset.validator import MISSING_VALUES, parse_date
 from app.modules.hubfile import hubfile_bp
-from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
-from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService
+from app.modules.hubfile.services import HubfileService
 
 
 @hubfile_bp.route("/file/download/<int:file_id>", methods=["GET"])
@@ -25,19 +28,10 @@ def download_file(file_id):
     if not user_cookie:
         user_cookie = str(uuid.uuid4())
 
-    # Check if the download record already exists for this cookie
-    existing_record = HubfileDownloadRecord.query.filter_by(
-        user_id=current_user.id if current_user.is_authenticated else None, file_id=file_id, download_cookie=user_cookie
-    ).first()
-
-    if not existing_record:
-        # Record the download in your database
-        HubfileDownloadRecordService().create(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            file_id=file_id,
-            download_date=datetime.now(timezone.utc),
-            download_cookie=user_cookie,
-        )
+    # Record the download (queued; de-duplicated and written by the ingestion thread)
+    record_buffer.submit(
+        FILE_DOWNLOAD, current_user.id if current_user.is_authenticated else None, file_id, user_cookie
+    )
 
     # Save the cookie to the user's browser
     resp = make_response(send_from_directory(directory=file_path, path=filename, as_attachment=True))
@@ -64,23 +58,10 @@ def view_file(file_id):
             if not user_cookie:
                 user_cookie = str(uuid.uuid4())
 
-            # Check if the view record already exists for this cookie
-            existing_record = HubfileViewRecord.query.filter_by(
-                user_id=current_user.id if current_user.is_authenticated else None,
-                file_id=file_id,
-                view_cookie=user_cookie,
-            ).first()
-
-            if not existing_record:
-                # Register file view
-                new_view_record = HubfileViewRecord(
-                    user_id=current_user.id if current_user.is_authenticated else None,
-                    file_id=file_id,
-                    view_date=datetime.now(),
-                    view_cookie=user_cookie,
-                )
-                db.session.add(new_view_record)
-                db.session.commit()
+            # Register file view (queued; de-duplicated and written by the ingestion thread)
+            record_buffer.submit(
+                FILE_VIEW, current_user.id if current_user.is_authenticated else None, file_id, user_cookie
+            )
 
             # Prepare response
             response = jsonify({"success": True, "content": content})
@@ -93,3 +74,98 @@ def view_file(file_id):
             return jsonify({"success": False, "error": "File not found"}), 404
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
+
+
+DATA_FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_value(raw: str):
+    value = raw.strip()
+    if value.lower() in MISSING_VALUES:
+        return None
+    # float() también acepta "1_000", "inf" y "1e999"; JSON no tiene Infinity ni NaN
+    if "_" in value:
+        return value
+    try:
+        parsed = float(value)
+    except ValueError:
+        return value
+    return parsed if math.isfinite(parsed) else None
+
+
+def _json_row(row, date_position):
+    values = [_json_value(cell) for cell in row]
+    if date_position is not None:
+        parsed = parse_date(row[date_position])
+        values[date_position] = parsed.isoformat() if parsed else row[date_position]
+    return values
+
+
+def _iter_csv(headers, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _iter_ndjson(headers, rows, date_position):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, _json_row(row, date_position)))) + "\n"
+
+
+def _iter_json(file_id, headers, rows, date_position):
+    yield '{"file_id": %d, "columns": %s, "data": [' % (file_id, json.dumps(headers))
+    separator = ""
+    for row in rows:
+        yield separator + json.dumps(_json_row(row, date_position))
+        separator = ", "
+    yield "]}"
+
+
+@hubfile_bp.route("/file/<int:file_id>/data", methods=["GET"])
+def file_data(file_id):
+    """
+    Streams a date range and a column projection of a CSV:
+    ``?start=YYYY-MM-DD&end=YYYY-MM-DD&columns=_temp_max,BASEL_humidity&format=csv|json|ndjson``
+    """
+    file = HubfileService().get_or_404(file_id)
+
+    data_format = request.args.get("format", "json").lower()
+    if data_format not in DATA_FORMATS:
+        return jsonify({"success": False, "error": f"Unsupported format '{data_format}'"}), 400
+
+    bounds = {}
+    for arg in ("start", "end"):
+        raw = request.args.get(arg)
+        bounds[arg] = parse_date(raw) if raw else None
+        if raw and bounds[arg] is None:
+            return jsonify({"success": False, "error": f"Invalid {arg} date '{raw}'"}), 400
+
+    columns = [c.strip() for c in request.args.get("columns", "").split(",") if c.strip()] or None
+
+    try:
+        headers, date_column, rows = HubfileService().get_data_slice(file, bounds["start"], bounds["end"], columns)
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "File not found"}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    date_position = headers.index(date_column) if date_column in headers else None
+    if data_format == "csv":
+        body = _iter_csv(headers, rows)
+    elif data_format == "ndjson":
+        body = _iter_ndjson(headers, rows, date_position)
+    else:
+        body = _iter_json(file.id, headers, rows, date_position)
+
+    return Response(stream_with_context(body), mimetype=DATA_FORMATS[data_format])
@@ -1,15 +1,27 @@
+import logging
 import os
+from datetime import date
+from typing import Iterator, List, Optional, Tuple
 
 from app.modules.auth.models import User
+from app.modules.dataset.columnar import ColumnarFile, _field_map
+from app.modules.dataset.dateindex import DateIndex
 from app.modules.dataset.models import DataSet
-from app.modules.hubfile.models import Hubfile
+from app.modules.dataset.validator import _read_csv_headers_try, extract_station_columns, normalize_field
+from app.modules.hubfile.models import Hubfile, HubfileColumnStats, HubfileMonthStats, HubfileStation
 from app.modules.hubfile.repositories import (
+    HubfileColumnStatsRepository,
     HubfileDownloadRecordRepository,
+    HubfileMonthStatsRepository,
     HubfileRepository,
+    HubfileStationRepository,
     HubfileViewRecordRepository,
 )
+from app.modules.hubfile.zonemaps import compute_zone_maps
 from core.services.BaseService import BaseService
 
+logger = logging.getLogger(__name__)
+
 
 class HubfileService(BaseService):
     def __init__(self):
@@ -34,6 +46,67 @@ class HubfileService(BaseService):
 
         return path
 
+    def get_date_index(self, hubfile: Hubfile) -> DateIndex:
+        """Open the date index of a CSV, building it first for files stored before indexes existed."""
+        from app.modules.dataset.services import DataSetService
+
+        path = self.get_path_by_hubfile(hubfile)
+        if not path.lower().endswith(".csv"):
+            raise ValueError("Only CSV files can be queried")
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return DateIndex(DataSetService().get_columnar_store().ensure_index(path, hubfile.checksum))
+
+    def get_data_slice(
+        self,
+        hubfile: Hubfile,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        columns: Optional[List[str]] = None,
+    ) -> Tuple[List[str], Optional[str], Iterator[List[str]]]:
+        """
+        Returns the selected headers, the date column and an iterator over the matching rows
+        projected to those headers. The date column always comes first; ``columns`` accepts
+        CSV header names or required tokens such as ``_temp_max``. Only the byte range
+        covering the dates is read.
+        """
+        index = self.get_date_index(hubfile)
+        try:
+            headers = index.headers
+            if (start or end) and index.date_column is None:
+                raise ValueError(f"'{hubfile.name}' has no date column")
+
+            if columns:
+                fields = {token: i for i, token in _field_map(headers).items()}
+                selected = []
+                for column in columns:
+                    if column in headers:
+                        selected.append(headers.index(column))
+                    elif column in fields:
+                        selected.append(fields[column])
+                    else:
+                        raise ValueError(f"Unknown column '{column}'")
+                if index.date_column is not None:
+                    date_pos = headers.index(index.date_column)
+                    selected = [date_pos] + [i for i in selected if i != date_pos]
+            else:
+                selected = list(range(len(headers)))
+            rows = index.row_range(start, end)
+        except Exception:
+            index.close()
+            raise
+
+        path = self.get_path_by_hubfile(hubfile)
+
+        def iter_projected():
+            try:
+                for row in index.iter_rows(path, rows):
+                    yield [row[i] if i < len(row) else "" for i in selected]
+            finally:
+                index.close()
+
+        return [headers[i] for i in selected], index.date_column, iter_projected()
+
     def total_hubfile_views(self) -> int:
         return self.hubfile_view_record_repository.total_hubfile_views()
 
@@ -45,3 +118,146 @@ class HubfileService(BaseService):
 class HubfileDownloadRecordService(BaseService):
     def __init__(self):
         super().__init__(HubfileDownloadRecordRepository())
+
+
+class HubfileStatsService(BaseService):
+    """Per-column and per-month zone maps (min, max, mean, count, nulls, sum of squares) of CSV files."""
+
+    STAT_COLUMNS = ("count", "null_count", "min_value", "max_value", "mean", "sum_squares")
+
+    def __init__(self):
+        super().__init__(HubfileColumnStatsRepository())
+        self.month_stats_repository = HubfileMonthStatsRepository()
+
+    def get_column_stats(self, hubfile: Hubfile):
+        return self.repository.get_by_file(hubfile.id)
+
+    def get_month_stats(self, hubfile: Hubfile):
+        return self.month_stats_repository.get_by_file(hubfile.id)
+
+    def compute_for_hubfile(self, hubfile: Hubfile) -> bool:
+        """
+        (Re)compute the zone maps of one file. Files are immutable, so when another
+        Hubfile with the same checksum already has statistics they are copied instead.
+        Returns False for files that are not CSVs or whose data cannot be read.
+        """
+        if not hubfile.name.lower().endswith(".csv"):
+            return False
+
+        self.repository.delete_for_file(hubfile.id)
+        self.month_stats_repository.delete_for_file(hubfile.id)
+
+        donor_id = self.repository.find_computed_file_id(hubfile.checksum, hubfile.id)
+        if donor_id is not None:
+            for stats in self.repository.get_by_file(donor_id):
+                self.repository.session.add(self._clone(stats, hubfile.id))
+            for stats in self.month_stats_repository.get_by_file(donor_id):
+                self.repository.session.add(self._clone(stats, hubfile.id))
+            self.repository.session.commit()
+            return True
+
+        from app.modules.dataset.services import DataSetService
+
+        path = HubfileService().get_path_by_hubfile(hubfile)
+        if not os.path.exists(path):
+            logger.warning(f"Cannot compute statistics, file not found: {path}")
+            self.repository.session.rollback()
+            return False
+
+        with ColumnarFile(DataSetService().get_columnar_store().ensure(path, hubfile.checksum)) as columnar:
+            fields = {column["name"]: column["field"] for column in columnar.header["columns"]}
+            column_stats, month_stats = compute_zone_maps(columnar)
+
+        self.repository.session.add_all(
+            HubfileColumnStats(file_id=hubfile.id, column_name=name, field=fields.get(name), **stats)
+            for name, stats in column_stats.items()
+        )
+        self.repository.session.add_all(
+            HubfileMonthStats(
+                file_id=hubfile.id, column_name=name, field=fields.get(name), year=year, month=month, **stats
+            )
+            for (name, year, month), stats in month_stats.items()
+        )
+        self.repository.session.commit()
+        return True
+
+    def compute_for_dataset(self, dataset: DataSet) -> int:
+        """Compute the zone maps of every CSV in a dataset. Returns the number of files processed."""
+        computed = 0
+        for hubfile in dataset.files():
+            try:
+                if self.compute_for_hubfile(hubfile):
+                    computed += 1
+            except Exception as exc:
+                self.repository.session.rollback()
+                logger.exception(f"Failed computing statistics for file {hubfile.id}: {exc}")
+        return computed
+
+    def _clone(self, stats, file_id: int):
+        values = {column: getattr(stats, column) for column in self.STAT_COLUMNS}
+        if isinstance(stats, HubfileMonthStats):
+            return HubfileMonthStats(
+                file_id=file_id,
+                column_name=stats.column_name,
+                field=stats.field,
+                year=stats.year,
+                month=stats.month,
+                **values,
+            )
+        return HubfileColumnStats(file_id=file_id, column_name=stats.column_name, field=stats.field, **values)
+
+
+class HubfileStationService(BaseService):
+    """Catalogue of the stations (and their variables) found in the CSV headers of each file."""
+
+    def __init__(self):
+        super().__init__(HubfileStationRepository())
+
+    def get_stations(self, hubfile: Hubfile):
+        return self.repository.get_by_file(hubfile.id)
+
+    def catalogue_hubfile(self, hubfile: Hubfile) -> int:
+        """(Re)build the station rows of one CSV from its header line. Returns how many were stored."""
+        if not hubfile.name.lower().endswith(".csv"):
+            return 0
+        path = HubfileService().get_path_by_hubfile(hubfile)
+        if not os.path.exists(path):
+            logger.warning(f"Cannot catalogue stations, file not found: {path}")
+            return 0
+
+        self.repository.delete_for_file(hubfile.id)
+        rows = [
+            HubfileStation(file_id=hubfile.id, station=station, field=field, column_name=column)
+            for station, field, column in extract_station_columns(_read_csv_headers_try(path))
+        ]
+        self.repository.session.add_all(rows)
+        self.repository.session.commit()
+        return len(rows)
+
+    def catalogue_dataset(self, dataset: DataSet) -> int:
+        stored = 0
+        for hubfile in dataset.files():
+            try:
+                stored += self.catalogue_hubfile(hubfile)
+            except Exception as exc:
+                self.repository.session.rollback()
+                logger.exception(f"Failed cataloguing stations of file {hubfile.id}: {exc}")
+        return stored
+
+    def find_datasets(self, station: str, variable: Optional[str] = None, latest_only: bool = True) -> List[DataSet]:
+        """Datasets with data for ``station`` (and ``variable``, e.g. 'precipitation'), answered from the index."""
+        field = None
+        if variable:
+            field = normalize_field(variable)
+            if field is None:
+                raise ValueError(f"Unknown variable '{variable}'")
+        ids = self.repository.find_dataset_ids(station.strip().upper(), field, latest_only)
+        if not ids:
+            return []
+        return DataSet.query.filter(DataSet.id.in_(ids)).order_by(DataSet.id).all()
+
+    def catalogue(self, latest_only: bool = True) -> List[dict]:
+        stations = {}
+        for station, field, datasets in self.repository.catalogue(latest_only):
+            stations.setdefault(station, {})[field] = datasets
+        return [{"station": station, "variables": variables} for station, variables in stations.items()]
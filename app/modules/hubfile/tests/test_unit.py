@@ -1,5 +1,21 @@
+import hashlib
+import json
+import os
+from unittest.mock import patch
+
 import pytest
 
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.columnar import ColumnarFile, write_sidecar
+from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+from app.modules.dataset.validator import extract_station_columns
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile
+from app.modules.hubfile.routes import _json_value
+from app.modules.hubfile.services import HubfileService, HubfileStationService, HubfileStatsService
+from app.modules.hubfile.zonemaps import compute_zone_maps
+
 
 @pytest.fixture(scope="module")
 def test_client(test_client):
@@ -22,3 +38,182 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+@pytest.fixture
+def weather_file(test_client, tmp_path):
+    """A CSV Hubfile stored under a temporary WORKING_DIR."""
+    user = User.query.filter_by(email="test@example.com").first()
+    ds_meta = DSMetaData(title="Weather", description="Daily data", publication_type=PublicationType.NONE)
+    db.session.add(ds_meta)
+    db.session.flush()
+    dataset = DataSet(user_id=user.id, ds_meta_data_id=ds_meta.id)
+    db.session.add(dataset)
+    db.session.flush()
+    fm_meta = FMMetaData(
+        filename="weather.csv", title="Weather", description="Daily data", publication_type=PublicationType.NONE
+    )
+    db.session.add(fm_meta)
+    db.session.flush()
+    fm = FeatureModel(data_set_id=dataset.id, fm_meta_data_id=fm_meta.id)
+    db.session.add(fm)
+    db.session.flush()
+
+    lines = ["DATE,BASEL_temp_max,BASEL_humidity"]
+    lines += [f"2010-01-{day:02d},{day}.5,{'NA' if day == 3 else 60 + day}" for day in range(1, 11)]
+    content = ("\n".join(lines) + "\n").encode()
+    dataset_dir = tmp_path / "uploads" / f"user_{user.id}" / f"dataset_{dataset.id}"
+    dataset_dir.mkdir(parents=True)
+    (dataset_dir / "weather.csv").write_bytes(content)
+
+    hubfile = Hubfile(
+        name="weather.csv", checksum=hashlib.sha256(content).hexdigest(), size=len(content), feature_model_id=fm.id
+    )
+    db.session.add(hubfile)
+    db.session.commit()
+
+    with patch.dict(os.environ, {"WORKING_DIR": str(tmp_path)}):
+        yield hubfile
+
+
+def test_file_data_csv_range_and_projection(test_client, weather_file):
+    response = test_client.get(
+        f"/file/{weather_file.id}/data?start=2010-01-02&end=2010-01-04&columns=_temp_max&format=csv"
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.data.decode().splitlines() == [
+        "DATE,BASEL_temp_max",
+        "2010-01-02,2.5",
+        "2010-01-03,3.5",
+        "2010-01-04,4.5",
+    ]
+
+
+def test_file_data_ndjson_converts_values(test_client, weather_file):
+    response = test_client.get(f"/file/{weather_file.id}/data?start=20100103&end=2010-01-03&format=ndjson")
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert records == [{"DATE": "2010-01-03", "BASEL_temp_max": 3.5, "BASEL_humidity": None}]
+
+
+def test_file_data_json_defaults_to_whole_file(test_client, weather_file):
+    response = test_client.get(f"/file/{weather_file.id}/data?columns=BASEL_humidity")
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["columns"] == ["DATE", "BASEL_humidity"]
+    assert len(payload["data"]) == 10
+    assert payload["data"][0] == ["2010-01-01", 61.0]
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        (" 2.5 ", 2.5),
+        ("NA", None),
+        ("inf", None),
+        ("-Infinity", None),
+        ("1e999", None),
+        ("nan", None),
+        ("1_000", "1_000"),
+    ],
+)
+def test_json_value_keeps_the_output_valid_json(raw, expected):
+    assert _json_value(raw) == expected
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["format=xml", "start=yesterday", "columns=_not_a_column"],
+)
+def test_file_data_rejects_invalid_parameters(test_client, weather_file, query):
+    response = test_client.get(f"/file/{weather_file.id}/data?{query}")
+
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_compute_zone_maps_per_column_and_month(tmp_path):
+    csv_file = tmp_path / "zones.csv"
+    csv_file.write_text(
+        "DATE,BASEL_temp_max,STATION\n2010-01-30,1,a\n2010-01-31,3,b\n2010-02-01,NA,c\n2010-02-02,-2,d\n",
+        encoding="utf-8",
+    )
+    write_sidecar(str(csv_file), str(tmp_path / "zones.wcol"))
+
+    with ColumnarFile(str(tmp_path / "zones.wcol")) as columnar:
+        column_stats, month_stats = compute_zone_maps(columnar)
+
+    assert set(column_stats) == {"BASEL_temp_max"}
+    overall = column_stats["BASEL_temp_max"]
+    assert overall["count"] == 3 and overall["null_count"] == 1
+    assert overall["min_value"] == -2.0 and overall["max_value"] == 3.0
+    assert overall["mean"] == pytest.approx(2 / 3)
+    assert overall["sum_squares"] == pytest.approx(14.0)
+
+    assert month_stats[("BASEL_temp_max", 2010, 1)]["mean"] == 2.0
+    february = month_stats[("BASEL_temp_max", 2010, 2)]
+    assert february["count"] == 1 and february["null_count"] == 1 and february["max_value"] == -2.0
+
+
+def test_stats_service_persists_and_reuses_zone_maps(test_client, weather_file):
+    service = HubfileStatsService()
+
+    assert service.compute_for_hubfile(weather_file) is True
+
+    column_stats = {stats.column_name: stats for stats in service.get_column_stats(weather_file)}
+    assert column_stats["BASEL_temp_max"].field == "_temp_max"
+    assert column_stats["BASEL_temp_max"].max_value == 10.5
+    assert column_stats["BASEL_humidity"].null_count == 1
+    month_stats = service.get_month_stats(weather_file)
+    assert {(stats.column_name, stats.year, stats.month) for stats in month_stats} == {
+        ("BASEL_humidity", 2010, 1),
+        ("BASEL_temp_max", 2010, 1),
+    }
+
+    # A second Hubfile with the same content copies the stored statistics
+    copy = Hubfile(
+        name=weather_file.name, checksum=weather_file.checksum, size=weather_file.size, feature_model_id=1_000_000
+    )
+    db.session.add(copy)
+    db.session.flush()
+    with patch.object(HubfileService, "get_path_by_hubfile", side_effect=AssertionError("should not read the file")):
+        assert service.compute_for_hubfile(copy) is True
+    assert {stats.to_dict()["max"] for stats in service.get_column_stats(copy)} == {10.5, 70.0}
+
+
+def test_extract_station_columns_from_headers():
+    headers = ["DATE", "MONTH", "BASEL_temp_mean", "de_bilt_precipitation", "wind_speed_OSLO", "temp_max", "x"]
+    assert extract_station_columns(headers) == [
+        ("BASEL", "_temp_mean", "BASEL_temp_mean"),
+        ("DE_BILT", "_precipitation", "de_bilt_precipitation"),
+        ("OSLO", "_wind_speed", "wind_speed_OSLO"),
+    ]
+
+
+def test_station_catalogue_finds_datasets_by_station_and_variable(test_client, weather_file):
+    service = HubfileStationService()
+    assert service.catalogue_hubfile(weather_file) == 2
+    assert {(s.station, s.field) for s in service.get_stations(weather_file)} == {
+        ("BASEL", "_temp_max"),
+        ("BASEL", "_humidity"),
+    }
+
+    dataset_id = weather_file.feature_model.data_set_id
+    assert [ds.id for ds in service.find_datasets("basel", "humidity")] == [dataset_id]
+    assert dataset_id not in [ds.id for ds in service.find_datasets("BASEL", "precipitation")]
+    assert dataset_id not in [ds.id for ds in service.find_datasets("OSLO")]
+
+    response = test_client.get("/dataset/stations?station=Basel&variable=_temp_max")
+    assert response.status_code == 200
+    assert dataset_id in [ds["id"] for ds in response.get_json()["datasets"]]
+
+    catalogue = {
+        entry["station"]: entry["variables"] for entry in test_client.get("/dataset/stations").get_json()["stations"]
+    }
+    assert catalogue["BASEL"]["_humidity"] >= 1
+
+    assert test_client.get("/dataset/stations?station=BASEL&variable=snow").status_code == 400
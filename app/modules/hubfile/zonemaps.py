@@ -0,0 +1,96 @@
+# app/modules/hubfile/zonemaps.py
+import math
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from app.modules.dataset.columnar import MISSING_DATE, ColumnarFile, from_epoch_days
+
+MonthKey = Tuple[int, int]
+
+
+class StatsAccumulator:
+    """Running min / max / sum / sum of squares for one column (and one month)."""
+
+    __slots__ = ("count", "null_count", "total", "sum_squares", "min_value", "max_value")
+
+    def __init__(self):
+        self.count = 0
+        self.null_count = 0
+        self.total = 0.0
+        self.sum_squares = 0.0
+        self.min_value = math.inf
+        self.max_value = -math.inf
+
+    def add(self, value: float) -> None:
+        if value != value:  # NaN
+            self.null_count += 1
+            return
+        self.count += 1
+        self.total += value
+        self.sum_squares += value * value
+        if value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+    def to_dict(self) -> dict:
+        has_values = self.count > 0
+        return {
+            "count": self.count,
+            "null_count": self.null_count,
+            "min_value": self.min_value if has_values else None,
+            "max_value": self.max_value if has_values else None,
+            "mean": self.total / self.count if has_values else None,
+            "sum_squares": self.sum_squares if has_values else None,
+        }
+
+
+def month_keys(days) -> List[Optional[MonthKey]]:
+    """Map every epoch day of the date column to its ``(year, month)``; None for missing dates."""
+    keys = []
+    cache: Dict[int, Optional[MonthKey]] = {}
+    for day in days:
+        key = cache.get(day)
+        if key is None and day not in cache:
+            parsed: Optional[date] = from_epoch_days(day) if day != MISSING_DATE else None
+            key = (parsed.year, parsed.month) if parsed else None
+            cache[day] = key
+        keys.append(key)
+    return keys
+
+
+def compute_zone_maps(columnar: ColumnarFile) -> Tuple[Dict[str, dict], Dict[Tuple[str, int, int], dict]]:
+    """
+    Compute per-column and per-column-per-month statistics from a columnar sidecar.
+    Each measurement column is scanned once straight from the mapped file; columns
+    without a single numeric value (e.g. station names) are skipped.
+    Returns ``({column: stats}, {(column, year, month): stats})``.
+    """
+    dates = columnar.dates()
+    keys = month_keys(dates) if dates is not None else None
+
+    column_stats = {}
+    month_stats = {}
+    for name in columnar.columns:
+        if name == columnar.date_column:
+            continue
+        values = columnar.column(name)
+        overall = StatsAccumulator()
+        if keys is None:
+            for value in values:
+                overall.add(value)
+        else:
+            monthly: Dict[Optional[MonthKey], StatsAccumulator] = {}
+            for key, value in zip(keys, values):
+                overall.add(value)
+                acc = monthly.get(key)
+                if acc is None:
+                    acc = monthly[key] = StatsAccumulator()
+                acc.add(value)
+            if overall.count:
+                for key, acc in monthly.items():
+                    if key is not None:
+                        month_stats[(name, key[0], key[1])] = acc.to_dict()
+        if overall.count:
+            column_stats[name] = overall.to_dict()
+    return column_stats, month_stats
@@ -0,0 +1,105 @@
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+
+from app import db
+from app.modules.dataset.models import DataSet, DSDownloadRecord, DSMetaData, DSViewRecord
+from app.modules.featuremodel.models import FeatureModel
+from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
+
+DATASETS = "datasets"
+FEATURE_MODELS = "feature_models"
+DATASET_VIEWS = "dataset_views"
+DATASET_DOWNLOADS = "dataset_downloads"
+FILE_VIEWS = "file_views"
+FILE_DOWNLOADS = "file_downloads"
+
+COUNTER_NAMES = (DATASETS, FEATURE_MODELS, DATASET_VIEWS, DATASET_DOWNLOADS, FILE_VIEWS, FILE_DOWNLOADS)
+
+# Filas que suman uno a un contador por el mero hecho de existir
+_RECORD_COUNTERS = {
+    FeatureModel: FEATURE_MODELS,
+    DSViewRecord: DATASET_VIEWS,
+    DSDownloadRecord: DATASET_DOWNLOADS,
+    HubfileViewRecord: FILE_VIEWS,
+    HubfileDownloadRecord: FILE_DOWNLOADS,
+}
+
+
+class PlatformCounter(db.Model):
+    """Exact platform-wide totals shown on the home page, one row per counter name."""
+
+    __tablename__ = "platform_counter"
+
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"PlatformCounter<{self.name}={self.value}>"
+
+
+def _is_synchronized(session, dataset: DataSet) -> bool:
+    meta = dataset.ds_meta_data
+    if meta is None and dataset.ds_meta_data_id is not None:
+        # Dataset pendiente creado solo con la clave ajena: la relación aún no está cargada
+        meta = session.get(DSMetaData, dataset.ds_meta_data_id)
+    return meta is not None and meta.dataset_doi is not None
+
+
+def counter_deltas(session) -> Counter:
+    """
+    Change of every counter implied by the pending inserts, deletes and DOI updates of
+    ``session``. Bulk statements (``query.delete()``, ``insert()``) are not seen here and
+    must update the counters themselves (``PlatformCounterRepository.increment``).
+    """
+    deltas = Counter()
+    with session.no_autoflush:
+        for sign, objects in ((1, session.new), (-1, session.deleted)):
+            for obj in objects:
+                name = _RECORD_COUNTERS.get(type(obj))
+                if name is not None:
+                    deltas[name] += sign
+                elif isinstance(obj, DataSet) and _is_synchronized(session, obj):
+                    deltas[DATASETS] += sign
+        for obj in session.dirty:
+            if not isinstance(obj, DSMetaData):
+                continue
+            history = attributes.get_history(obj, "dataset_doi")
+            if not history.has_changes() or obj.data_set is None or obj.data_set in session.new:
+                continue
+            if history.deleted:
+                was_synchronized = history.deleted[0] is not None
+            else:
+                # El valor anterior no estaba cargado: la fila de la BD aún lo conserva
+                previous = session.query(DSMetaData.dataset_doi).filter(DSMetaData.id == obj.id).scalar()
+                was_synchronized = previous is not None
+            if was_synchronized != (obj.dataset_doi is not None):
+                deltas[DATASETS] += 1 if obj.dataset_doi is not None else -1
+    return Counter({name: delta for name, delta in deltas.items() if delta})
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_counter_deltas(session, flush_context, instances):
+    deltas = counter_deltas(session)
+    if deltas:
+        session.info.setdefault("platform_counter_deltas", Counter()).update(deltas)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_counter_deltas(session, flush_context):
+    """Applies the deltas in the same transaction as the rows that caused them."""
+    deltas = session.info.pop("platform_counter_deltas", None)
+    if not deltas:
+        return
+    from app.modules.public.repositories import PlatformCounterRepository
+
+    repository = PlatformCounterRepository()
+    connection = session.connection()
+    for name, delta in deltas.items():
+        repository.increment(name, delta, connection=connection)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_counter_deltas(session):
+    session.info.pop("platform_counter_deltas", None)
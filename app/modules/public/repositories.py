@@ -0,0 +1,95 @@
+from sqlalchemy import desc, func, insert, select, update
+from sqlalchemy.orm import selectinload
+
+from app.modules.auth.models import User
+from app.modules.dataset.ingestion import RECORD_TABLES
+from app.modules.dataset.models import DataSet, DSMetaData, RecordDailyRollup, RecordRollupState
+from app.modules.featuremodel.models import FeatureModel
+from app.modules.public.models import (
+    COUNTER_NAMES,
+    DATASETS,
+    FEATURE_MODELS,
+    PlatformCounter,
+)
+from core.repositories.BaseRepository import BaseRepository
+
+LATEST_DATASETS_LIMIT = 5
+
+
+def _exact_count_query(name: str):
+    """``SELECT COUNT(*)`` equivalent to the counter ``name``, used to seed and rebuild it."""
+    if name == DATASETS:
+        return (
+            select(func.count())
+            .select_from(DataSet)
+            .join(DSMetaData, DataSet.ds_meta_data_id == DSMetaData.id)
+            .where(DSMetaData.dataset_doi.isnot(None))
+        )
+    if name == FEATURE_MODELS:
+        return select(func.count()).select_from(FeatureModel)
+
+    # Los registros ya agregados pueden haberse purgado: se cuentan desde los rollups diarios
+    kind, table = next((kind, table) for kind, table in RECORD_TABLES.items() if table.counter == name)
+    high_water_mark = (
+        select(func.coalesce(func.max(RecordRollupState.last_record_id), 0))
+        .where(RecordRollupState.kind == kind)
+        .scalar_subquery()
+    )
+    rolled_up = (
+        select(func.coalesce(func.sum(RecordDailyRollup.count), 0))
+        .where(RecordDailyRollup.kind == kind)
+        .scalar_subquery()
+    )
+    pending = select(func.count()).select_from(table.model).where(table.model.id > high_water_mark).scalar_subquery()
+    return select(rolled_up + pending)
+
+
+class PlatformCounterRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(PlatformCounter)
+
+    def values(self) -> dict:
+        return {row.name: row.value for row in self.session.query(self.model.name, self.model.value)}
+
+    def exact(self, name: str) -> int:
+        return int(self.session.execute(_exact_count_query(name)).scalar() or 0)
+
+    def increment(self, name: str, delta: int, connection=None) -> None:
+        """
+        Adds ``delta`` to the counter in the current transaction. A counter without a row yet
+        (a database created without the migrations) is seeded with its exact count instead,
+        which already includes the rows flushed in this transaction.
+        """
+        connection = connection if connection is not None else self.session.connection()
+        table = self.model.__table__
+        result = connection.execute(update(table).where(table.c.name == name).values(value=table.c.value + delta))
+        if result.rowcount == 0:
+            exact = connection.execute(_exact_count_query(name)).scalar() or 0
+            connection.execute(insert(table).values(name=name, value=exact))
+
+    def rebuild(self) -> dict:
+        """Recomputes every counter from the source tables and commits."""
+        values = {name: self.exact(name) for name in COUNTER_NAMES}
+        for name, value in values.items():
+            counter = self.session.get(self.model, name)
+            if counter is None:
+                self.session.add(self.model(name=name, value=value))
+            else:
+                counter.value = value
+        self.session.commit()
+        return values
+
+    def latest_synchronized(self, limit: int = LATEST_DATASETS_LIMIT):
+        """Latest synchronized datasets with everything the home page shows of them."""
+        return (
+            DataSet.query.join(DSMetaData)
+            .filter(DSMetaData.dataset_doi.isnot(None))
+            .options(
+                selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+                selectinload(DataSet.feature_models).selectinload(FeatureModel.files),
+                selectinload(DataSet.user).selectinload(User.profile),
+            )
+            .order_by(desc(DataSet.id))
+            .limit(limit)
+            .all()
+        )
@@ -2,43 +2,37 @@ import logging
 
 from flask import render_template
 
-from app.modules.dataset.services import AuthorService, DataSetService
-from app.modules.featuremodel.services import FeatureModelService
 from app.modules.public import public_bp
+from app.modules.public.models import (
+    DATASET_DOWNLOADS,
+    DATASET_VIEWS,
+    DATASETS,
+    FEATURE_MODELS,
+    FILE_DOWNLOADS,
+    FILE_VIEWS,
+)
+from app.modules.public.services import PlatformCountersService
 
 logger = logging.getLogger(__name__)
 
+counters_service = PlatformCountersService()
+
 
 @public_bp.route("/")
 def index():
     logger.info("Access index")
-    dataset_service = DataSetService()
-    feature_model_service = FeatureModelService()
-
-    # Statistics: total datasets and feature models
-    datasets_counter = dataset_service.count_synchronized_datasets()
-    feature_models_counter = feature_model_service.count_feature_models()
-
-    # Statistics: total downloads
-    total_dataset_downloads = dataset_service.total_dataset_downloads()
-    total_feature_model_downloads = feature_model_service.total_feature_model_downloads()
-
-    # Statistics: total views
-    total_dataset_views = dataset_service.total_dataset_views()
-    total_feature_model_views = feature_model_service.total_feature_model_views()
 
-    # Get latest versions of the latest synchronized datasets
-    datasets_to_show = [ds for ds in dataset_service.latest_synchronized() if ds.is_latest]
-    for ds in datasets_to_show:
-        ds.ds_meta_data.authors = AuthorService.get_unique_authors(ds)
+    # Contadores y últimos datasets desde la instantánea en memoria del proceso
+    snapshot = counters_service.snapshot()
+    counters = snapshot.counters
 
     return render_template(
         "public/index.html",
-        datasets=datasets_to_show,
-        datasets_counter=datasets_counter,
-        feature_models_counter=feature_models_counter,
-        total_dataset_downloads=total_dataset_downloads,
-        total_feature_model_downloads=total_feature_model_downloads,
-        total_dataset_views=total_dataset_views,
-        total_feature_model_views=total_feature_model_views,
+        datasets=snapshot.latest_datasets,
+        datasets_counter=counters[DATASETS],
+        feature_models_counter=counters[FEATURE_MODELS],
+        total_dataset_downloads=counters[DATASET_DOWNLOADS],
+        total_feature_model_downloads=counters[FILE_DOWNLOADS],
+        total_dataset_views=counters[DATASET_VIEWS],
+        total_feature_model_views=counters[FILE_VIEWS],
     )
@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+
+from app.modules.dataset.services import AuthorService, SizeService
+from app.modules.public.models import COUNTER_NAMES
+from app.modules.public.repositories import PlatformCounterRepository
+from core.caching.ttl_cache import TTLCache
+from core.services.BaseService import BaseService
+
+COUNTERS_REFRESH_SECONDS = 5
+
+
+class LatestDataset(NamedTuple):
+    """What the home page shows of a dataset, detached from the session."""
+
+    id: int
+    title: str
+    description: str
+    publication_type: str
+    created_at: datetime
+    user_id: int
+    uploader: str
+    authors: Tuple[dict, ...]
+    tags: Tuple[str, ...]
+    url: str
+    size: str
+
+
+class PlatformSnapshot(NamedTuple):
+    counters: dict
+    latest_datasets: List[LatestDataset]
+
+
+# Una sola entrada: la instantánea que se comparte entre todas las peticiones del proceso
+snapshot_cache = TTLCache(ttl=COUNTERS_REFRESH_SECONDS, maxsize=1)
+
+
+class PlatformCountersService(BaseService):
+    """
+    Platform totals kept in ``platform_counter`` (updated in the same transaction as the rows
+    they count) and a process-local snapshot of them and of the latest datasets, reloaded at
+    most every ``COUNTERS_REFRESH_SECONDS`` so the home page renders from memory.
+    """
+
+    def __init__(self):
+        super().__init__(PlatformCounterRepository())
+
+    @staticmethod
+    def invalidate() -> None:
+        snapshot_cache.clear()
+
+    def counters(self) -> dict:
+        values = self.repository.values()
+        return {name: values[name] if name in values else self.repository.exact(name) for name in COUNTER_NAMES}
+
+    def rebuild(self) -> dict:
+        values = self.repository.rebuild()
+        self.invalidate()
+        return values
+
+    def latest_datasets(self) -> List[LatestDataset]:
+        size_service = SizeService()
+        latest = []
+        for dataset in self.repository.latest_synchronized():
+            if not dataset.is_latest:
+                continue
+            meta = dataset.ds_meta_data
+            profile = dataset.user.profile if dataset.user is not None else None
+            latest.append(
+                LatestDataset(
+                    id=dataset.id,
+                    title=meta.title,
+                    description=meta.description,
+                    publication_type=dataset.get_cleaned_publication_type(),
+                    created_at=dataset.created_at,
+                    user_id=dataset.user_id,
+                    uploader=f"{profile.surname}, {profile.name}" if profile is not None else "",
+                    authors=tuple(author.to_dict() for author in AuthorService.get_unique_authors(dataset)),
+                    tags=tuple(tag.strip() for tag in meta.tags.split(",")) if meta.tags else (),
+                    url=dataset.get_uvlhub_doi(),
+                    size=size_service.get_human_readable_size(dataset.get_file_total_size()),
+                )
+            )
+        return latest
+
+    def snapshot(self) -> PlatformSnapshot:
+        ttl = current_app.config.get("COUNTERS_REFRESH_SECONDS", COUNTERS_REFRESH_SECONDS)
+        snapshot: Optional[PlatformSnapshot] = snapshot_cache.get("snapshot", ttl=ttl) if ttl > 0 else None
+        if snapshot is None:
+            snapshot = PlatformSnapshot(counters=self.counters(), latest_datasets=self.latest_datasets())
+            if ttl > 0:
+                snapshot_cache.put("snapshot", snapshot)
+        return snapshot
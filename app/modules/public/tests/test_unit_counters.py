@@ -0,0 +1,149 @@
+"""
+Tests for the materialized platform counters and the home page snapshot.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.conftest import create_user
+from app.modules.dataset.models import DataSet, DSDownloadRecord, DSMetaData, DSViewRecord, PublicationType
+from app.modules.featuremodel.models import FeatureModel, FMMetaData
+from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord, HubfileViewRecord
+from app.modules.profile.models import UserProfile
+from app.modules.public.models import COUNTER_NAMES, DATASETS, PlatformCounter
+from app.modules.public.repositories import PlatformCounterRepository
+from app.modules.public.services import PlatformCountersService, snapshot_cache
+
+
+def _exact():
+    repository = PlatformCounterRepository()
+    return {name: repository.exact(name) for name in COUNTER_NAMES}
+
+
+def _stored():
+    return {counter.name: counter.value for counter in PlatformCounter.query.all()}
+
+
+def _dataset(user, title, doi):
+    meta = DSMetaData(
+        title=title, description="Counters", publication_type=PublicationType.OTHER, dataset_doi=doi, tags="a, b"
+    )
+    db.session.add(meta)
+    db.session.flush()
+    dataset = DataSet(user_id=user.id, ds_meta_data_id=meta.id)
+    db.session.add(dataset)
+    db.session.flush()
+    fm_meta = FMMetaData(filename="c.csv", title="c", description="c", publication_type=PublicationType.NONE)
+    db.session.add(fm_meta)
+    db.session.flush()
+    fm = FeatureModel(data_set_id=dataset.id, fm_meta_data_id=fm_meta.id)
+    db.session.add(fm)
+    db.session.flush()
+    hubfile = Hubfile(name=f"{title}.csv", checksum="x", size=2048, feature_model_id=fm.id)
+    db.session.add(hubfile)
+    db.session.flush()
+    return dataset, hubfile
+
+
+@pytest.fixture(scope="module")
+def counters_user(test_client):
+    user = create_user("counters@example.com")
+    db.session.add(UserProfile(user_id=user.id, name="Ada", surname="Counter"))
+    db.session.commit()
+    return user
+
+
+def test_counters_follow_inserts_and_deletes(test_client, counters_user):
+    dataset, hubfile = _dataset(counters_user, "Counted", "10.1234/counted")
+    db.session.add_all(
+        [
+            DSViewRecord(dataset_id=dataset.id, view_cookie="c1"),
+            DSViewRecord(dataset_id=dataset.id, view_cookie="c2"),
+            DSDownloadRecord(dataset_id=dataset.id, download_cookie="c1"),
+            HubfileViewRecord(file_id=hubfile.id, view_cookie="c1"),
+            HubfileDownloadRecord(file_id=hubfile.id, download_cookie="c1"),
+        ]
+    )
+    db.session.commit()
+    assert _stored() == _exact()
+    assert _exact()["dataset_views"] == 2
+
+    db.session.delete(DSViewRecord.query.filter_by(view_cookie="c2").one())
+    db.session.commit()
+    assert _stored() == _exact()
+
+
+def test_doi_changes_move_the_dataset_counter(test_client, counters_user):
+    dataset, _ = _dataset(counters_user, "Unsynchronized", None)
+    db.session.commit()
+    before = _stored()[DATASETS]
+
+    dataset.ds_meta_data.dataset_doi = "10.1234/now-synchronized"
+    db.session.commit()
+    assert _stored()[DATASETS] == before + 1
+
+    # Sin el valor anterior cargado en memoria también se detecta el cambio
+    db.session.expire(dataset.ds_meta_data)
+    dataset.ds_meta_data.dataset_doi = None
+    db.session.commit()
+    assert _stored()[DATASETS] == before
+    assert _stored() == _exact()
+
+
+def test_rollback_discards_the_increment(test_client, counters_user):
+    before = _stored()
+    dataset = DataSet.query.join(DSMetaData).filter(DSMetaData.title == "Counted").one()
+    db.session.add(DSViewRecord(dataset_id=dataset.id, view_cookie="rolled-back"))
+    db.session.flush()
+    assert _stored()["dataset_views"] == before["dataset_views"] + 1
+    db.session.rollback()
+    assert _stored() == before
+
+    db.session.add(DSViewRecord(dataset_id=dataset.id, view_cookie="kept"))
+    db.session.commit()
+    assert _stored()["dataset_views"] == before["dataset_views"] + 1
+
+
+def test_rebuild_repairs_drift(test_client, counters_user):
+    db.session.get(PlatformCounter, DATASETS).value = 999
+    db.session.commit()
+    with test_client.application.test_request_context():
+        assert PlatformCountersService().rebuild() == _exact()
+    assert _stored() == _exact()
+
+
+def test_snapshot_is_reused_until_invalidated(test_client, counters_user):
+    service = PlatformCountersService()
+    test_client.application.config["COUNTERS_REFRESH_SECONDS"] = 60
+    snapshot_cache.clear()
+    try:
+        with patch.object(PlatformCounterRepository, "values", wraps=service.repository.values) as values:
+            first = service.snapshot()
+            assert service.snapshot() is first
+            assert values.call_count == 1
+            PlatformCountersService.invalidate()
+            assert service.snapshot() is not first
+            assert values.call_count == 2
+    finally:
+        test_client.application.config["COUNTERS_REFRESH_SECONDS"] = 0
+        snapshot_cache.clear()
+
+    latest = {dataset.title: dataset for dataset in first.latest_datasets}
+    assert "Unsynchronized" not in latest
+    counted = latest["Counted"]
+    assert counted.uploader == "Counter, Ada"
+    assert counted.tags == ("a", "b")
+    assert counted.size == "2.0 KB"
+    assert counted.url.endswith("/doi/10.1234/counted")
+
+
+def test_index_renders_the_snapshot(test_client, counters_user):
+    response = test_client.get("/")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    exact = _exact()
+    assert f"{exact[DATASETS]} datasets" in body
+    assert f"{exact['dataset_views']} datasets viewed" in body
+    assert "Counted" in body and "Counter, Ada" in body
@@ -0,0 +1,44 @@
+import threading
+import time
+from typing import Hashable
+
+
+class TTLCache:
+    """
+    Thread-safe, per-process mapping whose entries expire ``ttl`` seconds after being stored.
+
+    Callers clear it when they change the cached data themselves; the TTL only bounds
+    how long changes made by other worker processes can go unnoticed.
+    """
+
+    def __init__(self, ttl: float = 60, maxsize: int = 512):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at >= ttl:
+                del self._data[key]
+                return None
+            return value
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                # Se descarta la entrada más antigua (los dict conservan el orden de inserción)
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic(), value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -33,6 +33,63 @@ class Config:
     TEMPLATES_AUTO_RELOAD = True
     UPLOAD_FOLDER = "uploads"
 
+    # Caché de ZIPs de descarga de datasets (por defecto en uploads/archive_cache)
+    ARCHIVE_CACHE_DIR = os.getenv("ARCHIVE_CACHE_DIR")
+    ARCHIVE_CACHE_MAX_BYTES = int(os.getenv("ARCHIVE_CACHE_MAX_BYTES", str(2 * 1024**3)))
+
+    # Cálculo de estadísticas (zone maps) de los CSV en segundo plano tras crear un dataset
+    STATS_ASYNC = os.getenv("STATS_ASYNC", "True").lower() == "true"
+    # Filas de cada CSV que se validan dentro de la petición de subida (0 = todas)
+    CSV_VALIDATION_MAX_ROWS = int(os.getenv("CSV_VALIDATION_MAX_ROWS", "200000"))
+    # Subidas por partes: tamaño máximo de un fichero y bytes reservados a la vez por usuario
+    UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024**3)))
+    UPLOAD_MAX_PENDING_BYTES = int(os.getenv("UPLOAD_MAX_PENDING_BYTES", str(10 * 1024**3)))
+    # Segundos sin recibir partes tras los que se descarta una sesión de subida
+    UPLOAD_SESSION_TTL_SECONDS = float(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+
+    # Índice invertido de explore (por defecto se guarda en uploads/search_index.json)
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "True").lower() == "true"
+    SEARCH_INDEX_SNAPSHOT = os.getenv("SEARCH_INDEX_SNAPSHOT")
+    SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "5"))
+    # Resultados por página en explore (scroll infinito)
+    EXPLORE_PAGE_SIZE = int(os.getenv("EXPLORE_PAGE_SIZE", "20"))
+    # Segundos que se reutilizan los contadores de facetas (0 desactiva la caché)
+    EXPLORE_FACETS_TTL = float(os.getenv("EXPLORE_FACETS_TTL", "60"))
+    # Autocompletado: se reconstruye entero cada N segundos para refrescar visitas y descargas
+    SUGGEST_REBUILD_SECONDS = float(os.getenv("SUGGEST_REBUILD_SECONDS", "600"))
+    # Autocompletado: construcción y reconstrucción en un hilo, sin bloquear las peticiones
+    SUGGEST_ASYNC = os.getenv("SUGGEST_ASYNC", "True").lower() == "true"
+    # Autocompletado: sugerencias devueltas cuando la petición no indica ?limit=
+    SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "8"))
+    # API REST genérica: elementos por página (paginación por cursor) y lote de lectura en NDJSON
+    API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+    API_STREAM_BATCH_SIZE = int(os.getenv("API_STREAM_BATCH_SIZE", "500"))
+    # Harvesting de metadatos: registros por página (token de reanudación) y por lote en NDJSON
+    HARVEST_PAGE_SIZE = int(os.getenv("HARVEST_PAGE_SIZE", "100"))
+    # Segundos que se reutiliza la resolución de una DOI de /doi/<doi>/ (0 desactiva la caché)
+    DOI_CACHE_TTL = float(os.getenv("DOI_CACHE_TTL", "60"))
+    # Segundos entre recargas de la instantánea de contadores y últimos datasets de la portada
+    COUNTERS_REFRESH_SECONDS = float(os.getenv("COUNTERS_REFRESH_SECONDS", "5"))
+    # Registros de visitas y descargas: se encolan y un hilo los inserta por lotes (spool en uploads/record_spool)
+    RECORDS_ASYNC = os.getenv("RECORDS_ASYNC", "True").lower() == "true"
+    RECORDS_SPOOL_DIR = os.getenv("RECORDS_SPOOL_DIR")
+    RECORDS_QUEUE_SIZE = int(os.getenv("RECORDS_QUEUE_SIZE", "10000"))
+    RECORDS_BATCH_SIZE = int(os.getenv("RECORDS_BATCH_SIZE", "500"))
+    RECORDS_FLUSH_SECONDS = float(os.getenv("RECORDS_FLUSH_SECONDS", "2"))
+    # Rollups diarios de visitas y descargas: cada cuánto se agregan los registros nuevos y por lotes de cuántos ids
+    ROLLUP_INTERVAL_SECONDS = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "300"))
+    ROLLUP_BATCH_ROWS = int(os.getenv("ROLLUP_BATCH_ROWS", "50000"))
+    # Segundos que debe tener el id máximo observado antes de agregar hasta él (inserciones concurrentes)
+    ROLLUP_SETTLE_SECONDS = float(os.getenv("ROLLUP_SETTLE_SECONDS", "120"))
+    # Trending: días tras los que la actividad de un día cuenta la mitad
+    TRENDING_HALF_LIFE_DAYS = float(os.getenv("TRENDING_HALF_LIFE_DAYS", "3"))
+    # Segundos que se reutiliza el ranking de trending si no hay antes un nuevo rollup (0 desactiva la caché)
+    TRENDING_CACHE_TTL = float(os.getenv("TRENDING_CACHE_TTL", "60"))
+    # Días que se conservan los registros ya agregados en rollups (0 = sin purga); limita también la deduplicación
+    RECORDS_RETENTION_DAYS = int(os.getenv("RECORDS_RETENTION_DAYS", "0"))
+    # Cada cuánto se borran los blobs de uploads/blobs que ya no enlaza ningún dataset
+    BLOB_GC_INTERVAL_SECONDS = float(os.getenv("BLOB_GC_INTERVAL_SECONDS", "3600"))
+
     # Configuración de correo (usa variables de entorno del .env)
     MAIL_SERVER = os.getenv("MAIL_SERVER", "localhost")
     MAIL_PORT = int(os.getenv("MAIL_PORT", "587"))
@@ -58,6 +115,15 @@ class TestingConfig(Config):
         f"{os.getenv('MARIADB_TEST_DATABASE', 'default_db')}"
     )
     WTF_CSRF_ENABLED = False
+    STATS_ASYNC = False
+    SEARCH_INDEX_REFRESH_SECONDS = 0
+    DOI_CACHE_TTL = 0
+    TRENDING_CACHE_TTL = 0
+    COUNTERS_REFRESH_SECONDS = 0
+    RECORDS_ASYNC = False
+    ROLLUP_INTERVAL_SECONDS = 0
+    ROLLUP_SETTLE_SECONDS = 0
+    SUGGEST_ASYNC = False
 
 
 class ProductionConfig(Config):
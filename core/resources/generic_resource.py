@@ -1,9 +1,18 @@
+import base64
+import binascii
 from datetime import datetime
+from typing import List, Optional
 
-from flask import request
+from flask import Response, current_app, request, stream_with_context
 from flask_restful import Resource
 
 from app import db
+from core.serialisers.serializer import encode_json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+DEFAULT_STREAM_BATCH_SIZE = 500
+NDJSON_MIMETYPE = "application/x-ndjson"
 
 
 def convert_value(value):
@@ -12,21 +21,131 @@ def convert_value(value):
     return value
 
 
+def encode_cursor(last_id) -> str:
+    """Opaque cursor for the primary key of the last item of a page."""
+    return base64.urlsafe_b64encode(str(last_id).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _split_param(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
 class GenericResource(Resource):
+    """
+    REST resource over a model. Collections are paginated by primary key
+    (``?limit=&cursor=``), can be projected with ``?fields=`` and ``?include=`` (relations)
+    and streamed whole as NDJSON (``?format=ndjson`` or ``Accept: application/x-ndjson``).
+
+    Only the relations of the requested fields (the serializer's ``eager_loads``) are loaded,
+    once per page or stream batch, and items go through the serializer's batch mode.
+    """
+
     def __init__(self, model, serializer):
         self.model = model
         self.model_name = model.__name__
         self.serializer = serializer
+        self.primary_key = model.__mapper__.primary_key[0]
+
+    def _selected_fields(self, args) -> List[str]:
+        fields = list(self.serializer.serialization_fields)
+        relations = self.serializer.related_serializers
+        requested = _split_param(args.get("fields"))
+        included = _split_param(args.get("include"))
+        if not requested and not included:
+            return fields
+
+        unknown = [key for key in requested if key not in fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        unknown = [key for key in included if key not in relations]
+        if unknown:
+            raise ValueError(f"Unknown relations: {', '.join(unknown)}")
+
+        selected = set(requested) if requested else {key for key in fields if key not in relations}
+        selected.update(included)
+        return [key for key in fields if key in selected]
+
+    def _options(self, selected: List[str]) -> list:
+        return self.serializer.loader_options(self.model, selected)
+
+    def _page_size(self, args) -> int:
+        default = current_app.config.get("API_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+        try:
+            limit = int(args.get("limit", default))
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        return max(1, min(limit, MAX_PAGE_SIZE))
+
+    def _wants_ndjson(self, args) -> bool:
+        output = args.get("format")
+        if output not in (None, "json", "ndjson"):
+            raise ValueError("format must be 'json' or 'ndjson'")
+        if output is not None:
+            return output == "ndjson"
+        return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
 
     def get(self, id=None):
-        if id:
-            item = self.model.query.get(id)
-            if not item:
-                return {"message": f"{self.model_name} not found"}, 404
-            return self.serializer.serialize(item), 200
-        else:
-            items = self.model.query.all()
-            return {"items": [self.serializer.serialize(i) for i in items]}, 200
+        args = request.args
+        try:
+            selected = self._selected_fields(args)
+            if id:
+                return self._get_one(id, selected)
+            after = decode_cursor(args["cursor"]) if args.get("cursor") else None
+            stream = self._wants_ndjson(args)
+            limit = self._page_size(args) if (not stream or "limit" in args) else None
+        except ValueError as exc:
+            return {"message": str(exc)}, 400
+
+        query = self.model.query.options(*self._options(selected)).order_by(self.primary_key)
+        if after is not None:
+            query = query.filter(self.primary_key > after)
+        if stream:
+            return self._stream(query if limit is None else query.limit(limit), selected)
+
+        items = query.limit(limit + 1).all()
+        has_more = len(items) > limit
+        items = items[:limit]
+        body = {
+            "items": self.serializer.serialize_many(items, selected),
+            "next_cursor": encode_cursor(self.primary_key_of(items[-1])) if has_more else None,
+            "has_more": has_more,
+        }
+        return Response(encode_json(body), status=200, mimetype="application/json")
+
+    def _get_one(self, id, selected: List[str]):
+        item = db.session.get(self.model, id, options=self._options(selected))
+        if not item:
+            return {"message": f"{self.model_name} not found"}, 404
+        return self.serializer.serialize(item, selected), 200
+
+    def _stream(self, query, selected: List[str]) -> Response:
+        """One JSON object per line; rows are fetched (and their relations loaded) in batches."""
+        batch_size = current_app.config.get("API_STREAM_BATCH_SIZE", DEFAULT_STREAM_BATCH_SIZE)
+
+        def encode(batch):
+            return b"".join(encode_json(data) + b"\n" for data in self.serializer.serialize_many(batch, selected))
+
+        def generate():
+            batch = []
+            for item in query.yield_per(batch_size):
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    yield encode(batch)
+                    batch = []
+            if batch:
+                yield encode(batch)
+
+        return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+    def primary_key_of(self, item):
+        return getattr(item, self.primary_key.key)
 
     def post(self):
         data = request.get_json()
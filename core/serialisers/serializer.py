@@ -1,4 +1,15 @@
+import json
+import threading
 from datetime import datetime
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import selectinload
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - msgspec es opcional, se usa json
+    msgspec = None
 
 
 def convert_value(value):
@@ -7,14 +18,81 @@ def convert_value(value):
     return value
 
 
+def loader_options(model, paths: Iterable[str]) -> list:
+    """``selectinload`` options for dotted relationship paths such as ``'feature_models.files'``."""
+    options = []
+    for path in dict.fromkeys(paths):
+        option, target = None, model
+        for name in path.split("."):
+            attribute = getattr(target, name)
+            option = selectinload(attribute) if option is None else option.selectinload(attribute)
+            target = attribute.property.mapper.class_
+        options.append(option)
+    return options
+
+
+if msgspec is not None:
+    _encoder = msgspec.json.Encoder()
+
+    def encode_json(data) -> bytes:
+        return _encoder.encode(data)
+
+else:  # pragma: no cover
+
+    def encode_json(data) -> bytes:
+        return json.dumps(data, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def _getter(model, attr_name: str):
+    """
+    Accessor for one field of ``model`` resolved once: methods are called unbound, plain
+    attributes read with ``attrgetter``, and only datetime columns go through ``convert_value``.
+    """
+    class_attr = getattr(model, attr_name, None)
+    column = getattr(getattr(model, "__mapper__", None), "columns", {}).get(attr_name)
+    if column is not None:
+        read = attrgetter(attr_name)
+        if _is_datetime(column.type):
+            return lambda instance: convert_value(read(instance))
+        return read
+    if callable(class_attr) and not isinstance(class_attr, property):
+        return lambda instance: convert_value(class_attr(instance))
+
+    # Propiedades, relaciones o atributos desconocidos: mismo comportamiento que serialize()
+    def read_any(instance):
+        value = getattr(instance, attr_name, None)
+        return convert_value(value() if callable(value) else value)
+
+    return read_any
+
+
+def _is_datetime(column_type) -> bool:
+    try:
+        return issubclass(column_type.python_type, datetime)
+    except NotImplementedError:
+        return False
+
+
 class Serializer:
-    def __init__(self, serialization_fields, related_serializers=None):
+    """
+    Maps output keys to model attributes or methods (``serialization_fields``), with nested
+    serializers for related objects. ``eager_loads`` maps keys to the relationship paths
+    they read, so batch serialization can load them in one query per relation.
+    """
+
+    def __init__(self, serialization_fields, related_serializers=None, eager_loads=None):
         self.serialization_fields = serialization_fields
         self.related_serializers = related_serializers or {}
+        self.eager_loads = eager_loads or {}
+        self._plans: Dict[Tuple[type, Optional[Tuple[str, ...]]], list] = {}
+        self._lock = threading.Lock()
 
-    def serialize(self, instance):
+    def serialize(self, instance, fields=None):
+        """Serialize ``instance``; ``fields`` restricts the output to those keys (all of them by default)."""
         serialized_data = {}
         for key, attr_name in self.serialization_fields.items():
+            if fields is not None and key not in fields:
+                continue
             if key in self.related_serializers:
                 related_data = getattr(instance, attr_name)()
                 if isinstance(related_data, list):
@@ -29,3 +107,53 @@ class Serializer:
                     attr = attr()
                 serialized_data[key] = convert_value(attr)
         return serialized_data
+
+    def plan(self, model, fields=None) -> list:
+        """``(key, accessor, related serializer)`` per selected field, compiled once per model and field set."""
+        cache_key = (model, tuple(fields) if fields is not None else None)
+        plan = self._plans.get(cache_key)
+        if plan is None:
+            with self._lock:
+                plan = [
+                    (key, _getter(model, attr_name), self.related_serializers.get(key))
+                    for key, attr_name in self.serialization_fields.items()
+                    if fields is None or key in fields
+                ]
+                self._plans[cache_key] = plan
+        return plan
+
+    def loader_options(self, model, fields=None) -> list:
+        selected = self.serialization_fields if fields is None else fields
+        return loader_options(model, [path for key in selected for path in self.eager_loads.get(key, ())])
+
+    def serialize_many(self, items, fields=None) -> List[dict]:
+        """
+        Batch ``serialize``: the same output, through the compiled plan of each model. ``items``
+        may be a query, in which case the relations of the selected fields are eager-loaded first.
+        """
+        if hasattr(items, "options") and hasattr(items, "column_descriptions"):
+            model = items.column_descriptions[0]["entity"]
+            items = items.options(*self.loader_options(model, fields)).all()
+        results = []
+        plans = {}
+        for instance in items:
+            model = type(instance)
+            plan = plans.get(model)
+            if plan is None:
+                plan = plans[model] = self.plan(model, fields)
+            data = {}
+            for key, accessor, related in plan:
+                if related is None:
+                    data[key] = accessor(instance)
+                    continue
+                value = accessor(instance)
+                if isinstance(value, list):
+                    data[key] = related.serialize_many(value)
+                else:
+                    data[key] = related.serialize_many([value])[0] if value is not None else None
+            results.append(data)
+        return results
+
+    def encode_many(self, items, fields=None) -> bytes:
+        """JSON bytes of ``serialize_many`` (encoded with msgspec when it is installed)."""
+        return encode_json(self.serialize_many(items, fields))
@@ -0,0 +1,72 @@
+"""file column and monthly statistics (zone maps)
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 10:12:31.184210
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "file_column_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("column_name", sa.String(length=120), nullable=False),
+        sa.Column("field", sa.String(length=50), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("null_count", sa.Integer(), nullable=False),
+        sa.Column("min_value", sa.Float(), nullable=True),
+        sa.Column("max_value", sa.Float(), nullable=True),
+        sa.Column("mean", sa.Float(), nullable=True),
+        sa.Column("sum_squares", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["file_id"],
+            ["file.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("file_id", "column_name", name="uq_file_column_stats"),
+    )
+    op.create_index("ix_file_column_stats_file_id", "file_column_stats", ["file_id"])
+    op.create_index("ix_file_column_stats_field", "file_column_stats", ["field"])
+    op.create_table(
+        "file_month_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("column_name", sa.String(length=120), nullable=False),
+        sa.Column("field", sa.String(length=50), nullable=True),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("null_count", sa.Integer(), nullable=False),
+        sa.Column("min_value", sa.Float(), nullable=True),
+        sa.Column("max_value", sa.Float(), nullable=True),
+        sa.Column("mean", sa.Float(), nullable=True),
+        sa.Column("sum_squares", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["file_id"],
+            ["file.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("file_id", "column_name", "year", "month", name="uq_file_month_stats"),
+    )
+    op.create_index("ix_file_month_stats_file_id", "file_month_stats", ["file_id"])
+    op.create_index("ix_file_month_stats_field_period", "file_month_stats", ["field", "year", "month"])
+
+
+def downgrade():
+    op.drop_index("ix_file_month_stats_field_period", table_name="file_month_stats")
+    op.drop_index("ix_file_month_stats_file_id", table_name="file_month_stats")
+    op.drop_table("file_month_stats")
+    op.drop_index("ix_file_column_stats_field", table_name="file_column_stats")
+    op.drop_index("ix_file_column_stats_file_id", table_name="file_column_stats")
+    op.drop_table("file_column_stats")
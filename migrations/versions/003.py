@@ -0,0 +1,23 @@
+"""keyset pagination index for explore
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 11:02:47.530118
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_data_set_latest_created", "data_set", ["is_latest", "created_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_data_set_latest_created", table_name="data_set")
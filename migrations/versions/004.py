@@ -0,0 +1,69 @@
+"""normalized dataset tags
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 11:48:05.913422
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+TAG_MAX_LENGTH = 120
+
+
+def _split_tags(value):
+    names = []
+    for part in (value or "").split(","):
+        name = " ".join(part.split()).lower()[:TAG_MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def upgrade():
+    tag = op.create_table(
+        "tag",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=TAG_MAX_LENGTH), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    ds_meta_data_tag = op.create_table(
+        "ds_meta_data_tag",
+        sa.Column("ds_meta_data_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["ds_meta_data_id"],
+            ["ds_meta_data.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["tag_id"],
+            ["tag.id"],
+        ),
+        sa.PrimaryKeyConstraint("ds_meta_data_id", "tag_id"),
+    )
+    op.create_index("ix_ds_meta_data_tag_tag_id", "ds_meta_data_tag", ["tag_id", "ds_meta_data_id"])
+
+    # Backfill from the comma separated strings
+    bind = op.get_bind()
+    ds_meta_data = sa.table("ds_meta_data", sa.column("id", sa.Integer), sa.column("tags", sa.String))
+    rows = bind.execute(sa.select(ds_meta_data.c.id, ds_meta_data.c.tags).where(ds_meta_data.c.tags.isnot(None)))
+    links = [(meta_id, name) for meta_id, tags in rows for name in _split_tags(tags)]
+    names = sorted({name for _, name in links})
+    if names:
+        op.bulk_insert(tag, [{"name": name} for name in names])
+        ids = dict(bind.execute(sa.select(tag.c.name, tag.c.id)).fetchall())
+        op.bulk_insert(ds_meta_data_tag, [{"ds_meta_data_id": m, "tag_id": ids[name]} for m, name in links])
+
+
+def downgrade():
+    op.drop_index("ix_ds_meta_data_tag_tag_id", table_name="ds_meta_data_tag")
+    op.drop_table("ds_meta_data_tag")
+    op.drop_table("tag")
@@ -0,0 +1,41 @@
+"""station catalogue from CSV headers
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 12:31:40.277106
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "file_station",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("station", sa.String(length=120), nullable=False),
+        sa.Column("field", sa.String(length=50), nullable=False),
+        sa.Column("column_name", sa.String(length=120), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["file_id"],
+            ["file.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("file_id", "column_name", name="uq_file_station"),
+    )
+    op.create_index("ix_file_station_file_id", "file_station", ["file_id"])
+    op.create_index("ix_file_station_station_field", "file_station", ["station", "field"])
+
+
+def downgrade():
+    op.drop_index("ix_file_station_station_field", table_name="file_station")
+    op.drop_index("ix_file_station_file_id", table_name="file_station")
+    op.drop_table("file_station")
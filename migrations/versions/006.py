@@ -0,0 +1,53 @@
+"""dataset similarity signatures and LSH buckets
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 15:02:11.408533
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las firmas se calculan al publicar (o en la primera visita de los datasets existentes)
+    op.create_table(
+        "ds_signature",
+        sa.Column("data_set_id", sa.Integer(), nullable=False),
+        sa.Column("signature", sa.LargeBinary(), nullable=False),
+        sa.Column("feature_count", sa.Integer(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["data_set_id"],
+            ["data_set.id"],
+        ),
+        sa.PrimaryKeyConstraint("data_set_id"),
+    )
+    op.create_table(
+        "ds_signature_bucket",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("data_set_id", sa.Integer(), nullable=False),
+        sa.Column("band", sa.SmallInteger(), nullable=False),
+        sa.Column("bucket", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["data_set_id"],
+            ["ds_signature.data_set_id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ds_signature_bucket_data_set_id", "ds_signature_bucket", ["data_set_id"])
+    op.create_index("ix_ds_signature_bucket_band_bucket", "ds_signature_bucket", ["band", "bucket"])
+
+
+def downgrade():
+    op.drop_index("ix_ds_signature_bucket_band_bucket", table_name="ds_signature_bucket")
+    op.drop_index("ix_ds_signature_bucket_data_set_id", table_name="ds_signature_bucket")
+    op.drop_table("ds_signature_bucket")
+    op.drop_table("ds_signature")
@@ -0,0 +1,34 @@
+"""last modification timestamp of dataset metadata for harvesting
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 16:20:47.113902
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("ds_meta_data", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    # Los registros existentes toman como última modificación la fecha de publicación de su dataset
+    op.execute(
+        """
+        UPDATE ds_meta_data SET updated_at = (
+            SELECT MAX(data_set.created_at) FROM data_set WHERE data_set.ds_meta_data_id = ds_meta_data.id
+        )
+        """
+    )
+    op.create_index("ix_ds_meta_data_updated_at", "ds_meta_data", ["updated_at"])
+
+
+def downgrade():
+    op.drop_index("ix_ds_meta_data_updated_at", table_name="ds_meta_data")
+    op.drop_column("ds_meta_data", "updated_at")
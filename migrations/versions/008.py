@@ -0,0 +1,43 @@
+"""materialized platform counters for the home page
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 18:05:12.402517
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "platform_counter",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    # Los contadores parten de los totales exactos (no de max(id))
+    op.execute(
+        """
+        INSERT INTO platform_counter (name, value)
+        SELECT 'datasets', COUNT(*) FROM data_set
+            JOIN ds_meta_data ON data_set.ds_meta_data_id = ds_meta_data.id
+            WHERE ds_meta_data.dataset_doi IS NOT NULL
+        UNION ALL SELECT 'feature_models', COUNT(*) FROM feature_model
+        UNION ALL SELECT 'dataset_views', COUNT(*) FROM ds_view_record
+        UNION ALL SELECT 'dataset_downloads', COUNT(*) FROM ds_download_record
+        UNION ALL SELECT 'file_views', COUNT(*) FROM file_view_record
+        UNION ALL SELECT 'file_downloads', COUNT(*) FROM file_download_record
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("platform_counter")
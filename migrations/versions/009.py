@@ -0,0 +1,51 @@
+"""daily rollups of view and download records
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 19:42:37.918244
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "record_daily_rollup",
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("object_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("kind", "object_id", "day"),
+    )
+    op.create_index("ix_record_daily_rollup_kind_day", "record_daily_rollup", ["kind", "day", "object_id"])
+    state = op.create_table(
+        "record_rollup_state",
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("last_record_id", sa.Integer(), nullable=False),
+        sa.Column("observed_record_id", sa.Integer(), nullable=False),
+        sa.Column("observed_at", sa.DateTime(), nullable=True),
+        sa.Column("rolled_up_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("kind"),
+    )
+    # Una fila por tabla de registros a cero: la primera ejecución agrega todos los existentes
+    op.bulk_insert(
+        state,
+        [
+            {"kind": kind, "last_record_id": 0, "observed_record_id": 0}
+            for kind in ("dataset_view", "dataset_download", "file_view", "file_download")
+        ],
+    )
+
+
+def downgrade():
+    op.drop_table("record_rollup_state")
+    op.drop_index("ix_record_daily_rollup_kind_day", table_name="record_daily_rollup")
+    op.drop_table("record_daily_rollup")
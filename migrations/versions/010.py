@@ -0,0 +1,33 @@
+"""unique visitor sketches of view and download records
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 21:08:13.402516
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Solo se generan sketches de los registros agregados a partir de ahora: los ya agregados
+    # en record_daily_rollup no se vuelven a procesar para no duplicar sus conteos
+    op.create_table(
+        "record_daily_sketch",
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("object_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("registers", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("kind", "object_id", "day"),
+    )
+
+
+def downgrade():
+    op.drop_table("record_daily_sketch")
@@ -0,0 +1,59 @@
+"""accent-insensitive tag names
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17 23:14:52.690318
+
+"""
+
+import unicodedata
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+TAG_MAX_LENGTH = 120
+
+
+def _normalize_tag(value):
+    decomposed = unicodedata.normalize("NFKD", " ".join(value.split()).lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return unicodedata.normalize("NFC", stripped)[:TAG_MAX_LENGTH]
+
+
+def upgrade():
+    # Los nombres pasan a guardarse sin acentos; los tags que la collation ya consideraba
+    # iguales ("cafe" / "café") se fusionan en el de menor id
+    bind = op.get_bind()
+    tag = sa.table("tag", sa.column("id", sa.Integer), sa.column("name", sa.String))
+    link = sa.table("ds_meta_data_tag", sa.column("ds_meta_data_id", sa.Integer), sa.column("tag_id", sa.Integer))
+
+    groups = {}
+    for tag_id, name in bind.execute(sa.select(tag.c.id, tag.c.name).order_by(tag.c.id)):
+        groups.setdefault(_normalize_tag(name), []).append((tag_id, name))
+
+    for name, rows in groups.items():
+        keep_id = rows[0][0]
+        for duplicate_id, _ in rows[1:]:
+            linked = {m for (m,) in bind.execute(sa.select(link.c.ds_meta_data_id).where(link.c.tag_id == keep_id))}
+            moved = [
+                m
+                for (m,) in bind.execute(sa.select(link.c.ds_meta_data_id).where(link.c.tag_id == duplicate_id))
+                if m not in linked
+            ]
+            bind.execute(link.delete().where(link.c.tag_id == duplicate_id))
+            if moved:
+                op.bulk_insert(link, [{"ds_meta_data_id": m, "tag_id": keep_id} for m in moved])
+            bind.execute(tag.delete().where(tag.c.id == duplicate_id))
+        if rows[0][1] != name:
+            bind.execute(tag.update().where(tag.c.id == keep_id).values(name=name))
+
+
+def downgrade():
+    # Los acentos eliminados no se pueden recuperar
+    pass
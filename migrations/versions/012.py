@@ -0,0 +1,28 @@
+"""background validation of the rows of large CSVs
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18 09:37:21.604183
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("file", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("rows_validated", sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column("row_errors", sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("file", schema=None) as batch_op:
+        batch_op.drop_column("row_errors")
+        batch_op.drop_column("rows_validated")